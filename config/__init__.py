@@ -4,6 +4,6 @@ Módulo de Configuración
 Gestión centralizada de configuraciones del sistema.
 """
 
-from .config import ConfigLLM, ConfigDataset
+from .config import ConfigLLM, ConfigDataset, ConfigModelos, ConfigInferencia, ConfigAlmacenamiento, ConfigCacheInferencia, ConfigCacheEmbeddings, ConfigTopicos, ConfigReanudacion
 
-__all__ = ['ConfigLLM', 'ConfigDataset']
+__all__ = ['ConfigLLM', 'ConfigDataset', 'ConfigModelos', 'ConfigInferencia', 'ConfigAlmacenamiento', 'ConfigCacheInferencia', 'ConfigCacheEmbeddings', 'ConfigTopicos', 'ConfigReanudacion']
@@ -105,3 +105,233 @@ class ConfigDataset:
         cls.DATA_DIR.mkdir(parents=True, exist_ok=True)
         cls.SHARED_DIR.mkdir(parents=True, exist_ok=True)
         cls.MODELS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+class ConfigModelos:
+    """
+    Modelos de las fases 02-05.
+
+    Cada modelo puede ser un nombre de HuggingFace o una ruta local; se
+    configura con variables de entorno (por ejemplo, para usar modelos
+    propios o los modelos mínimos de scripts/benchmark.py).
+    """
+    
+    # Fase 02: Análisis de sentimientos
+    SENTIMIENTOS = os.getenv('MODELO_SENTIMIENTOS', 'nlptown/bert-base-multilingual-uncased-sentiment')
+    
+    # Fase 03: Subjetividad (modelo fine-tuned local)
+    SUBJETIVIDAD = os.getenv('MODELO_SUBJETIVIDAD', 'models/subjectivity_task/best_model')
+    
+    # Fase 04: Categorías multi-etiqueta (los thresholds se leen de
+    # optimal_thresholds.json en la carpeta superior del modelo)
+    CATEGORIAS = os.getenv('MODELO_CATEGORIAS', 'models/multilabel_task/best_model')
+    
+    # Fase 05: Embeddings de SentenceTransformers para BERTopic
+    EMBEDDINGS = os.getenv('MODELO_EMBEDDINGS', 'paraphrase-multilingual-MiniLM-L12-v2')
+
+
+class ConfigInferencia:
+    """
+    Parámetros de inferencia de los modelos de las fases 02, 03 y 04 (y de
+    los embeddings de la Fase 05).
+    
+    Backends disponibles:
+    - 'pytorch': PyTorch en modo eager (por defecto)
+    - 'onnx': ONNX Runtime. Cada modelo se exporta a ONNX una sola vez y se
+      verifica contra las salidas de PyTorch antes de usarlo
+    
+    Ambos admiten la cuantización INT8 (CUANTIZACION).
+    """
+    
+    # Textos por batch del modelo de sentimientos (Fase 02)
+    BATCH_SENTIMIENTOS = max(1, int(os.getenv('INFERENCIA_BATCH_SENTIMIENTOS', '32')))
+    
+    # Textos por batch del modelo de embeddings (Fase 05)
+    BATCH_EMBEDDINGS = max(1, int(os.getenv('INFERENCIA_BATCH_EMBEDDINGS', '64')))
+    
+    BACKEND_DEFAULT = 'pytorch'
+    BACKEND = os.getenv('INFERENCIA_BACKEND', BACKEND_DEFAULT).lower()
+    
+    if BACKEND not in ['pytorch', 'onnx']:
+        raise ValueError(
+            f"INFERENCIA_BACKEND inválido: '{BACKEND}'. "
+            "Valores válidos: 'pytorch' u 'onnx'"
+        )
+    
+    # Directorio de los modelos exportados a ONNX
+    DIRECTORIO_ONNX = os.getenv('INFERENCIA_DIRECTORIO_ONNX', 'models/onnx')
+    
+    # Hilos de ONNX Runtime dentro de cada operación (0 = uno por núcleo)
+    # y entre operaciones independientes del grafo
+    HILOS_INTRA = int(os.getenv('INFERENCIA_HILOS_INTRA', '0'))
+    HILOS_INTER = int(os.getenv('INFERENCIA_HILOS_INTER', '1'))
+    
+    # Diferencia máxima permitida entre las salidas de ONNX y de PyTorch
+    TOLERANCIA_PARIDAD = float(os.getenv('INFERENCIA_TOLERANCIA_PARIDAD', '1e-3'))
+    
+    # Cuantización dinámica INT8 de las capas lineales (solo CPU). Se valida
+    # contra el modelo fp32 sobre una muestra de reseñas y se rechaza si el
+    # acuerdo de etiquetas (global o de alguna clase) queda bajo el mínimo
+    CUANTIZACION = os.getenv('INFERENCIA_CUANTIZACION', 'false').lower() == 'true'
+    CUANTIZACION_MIN_ACUERDO = float(os.getenv('INFERENCIA_CUANTIZACION_MIN_ACUERDO', '0.97'))
+    CUANTIZACION_MUESTRAS = int(os.getenv('INFERENCIA_CUANTIZACION_MUESTRAS', '1000'))
+    
+    # Directorio de los modelos cuantizados con PyTorch (con ONNX se guardan
+    # junto al modelo exportado)
+    DIRECTORIO_INT8 = os.getenv('INFERENCIA_DIRECTORIO_INT8', 'models/int8')
+
+
+class ConfigAlmacenamiento:
+    """
+    Configuración del almacén del dataset.
+    
+    Formatos disponibles:
+    - 'parquet': Parquet columnar con compresión (por defecto)
+    - 'arrow': Arrow IPC (Feather v2) con compresión
+    - 'csv': Comportamiento clásico, reescribe data/dataset.csv completo
+    
+    En los formatos columnares cada fase escribe solo sus propias columnas.
+    El CSV se sigue usando como formato de importación/exportación.
+    """
+    
+    FORMATO_DEFAULT = 'parquet'
+    FORMATO = os.getenv('DATASET_FORMATO', FORMATO_DEFAULT).lower()
+    
+    if FORMATO not in ['parquet', 'arrow', 'csv']:
+        raise ValueError(
+            f"DATASET_FORMATO inválido: '{FORMATO}'. "
+            "Valores válidos: 'parquet', 'arrow' o 'csv'"
+        )
+    
+    # Códec de compresión para los formatos columnares
+    COMPRESION = os.getenv('DATASET_COMPRESION', 'zstd')
+    
+    # Exportar el dataset final a CSV al terminar el pipeline
+    EXPORTAR_CSV = os.getenv('DATASET_EXPORTAR_CSV', 'true').lower() == 'true'
+    
+    # Modo incremental: las reseñas nuevas de data/dataset.csv se agregan al
+    # almacén (sin reemplazarlo) y las fases 02-04 solo analizan las filas
+    # sin resultados
+    INCREMENTAL = os.getenv('DATASET_INCREMENTAL', 'false').lower() == 'true'
+    
+    if INCREMENTAL and FORMATO == 'csv':
+        raise ValueError(
+            "DATASET_INCREMENTAL=true requiere un formato columnar "
+            "(DATASET_FORMATO=parquet o arrow)"
+        )
+    
+    # Modo por lotes: filas por lote para datasets mayores que la memoria
+    # (0 = desactivado). Las fases 01-04 leen y escriben el dataset lote a
+    # lote; la memoria máxima depende del tamaño del lote, no del dataset.
+    TAMANO_LOTE = int(os.getenv('DATASET_TAMANO_LOTE', '0'))
+    
+    if TAMANO_LOTE and FORMATO == 'csv':
+        raise ValueError(
+            "DATASET_TAMANO_LOTE requiere un formato columnar "
+            "(DATASET_FORMATO=parquet o arrow)"
+        )
+    
+    # Tipo de las matrices de probabilidades (data/shared/*.npy):
+    # 'float16' (la mitad de espacio) o 'float32'
+    DTYPE_SCORES = os.getenv('DATASET_DTYPE_SCORES', 'float16').lower()
+    
+    if DTYPE_SCORES not in ['float16', 'float32']:
+        raise ValueError(
+            f"DATASET_DTYPE_SCORES inválido: '{DTYPE_SCORES}'. "
+            "Valores válidos: 'float16' o 'float32'"
+        )
+
+
+class ConfigCacheInferencia:
+    """
+    Configuración de la caché de inferencia de las fases 02, 03 y 04.
+    
+    Guarda la salida cruda de los modelos por (hash del texto, modelo,
+    max_length) para no repetir la inferencia de textos ya analizados.
+    """
+    
+    HABILITADA = os.getenv('CACHE_INFERENCIA', 'true').lower() == 'true'
+    
+    # Archivo SQLite de la caché (relativo al directorio de producción)
+    RUTA = os.getenv('CACHE_INFERENCIA_RUTA', 'data/cache/inferencia.sqlite')
+    
+    # Tamaño máximo del archivo; al superarlo se expulsan las entradas menos usadas
+    MAX_MB = float(os.getenv('CACHE_INFERENCIA_MAX_MB', '512'))
+
+
+class ConfigCacheEmbeddings:
+    """
+    Configuración de la caché persistente de embeddings de la Fase 05.
+    
+    Guarda el vector de cada texto (normalizado) por modelo de embeddings en
+    archivos float16 de solo-agregar con un índice SQLite, para que las
+    reseñas históricas no se vuelvan a codificar en cada ejecución.
+    """
+    
+    HABILITADA = os.getenv('CACHE_EMBEDDINGS', 'true').lower() == 'true'
+    
+    # Directorio de la caché (relativo al directorio de producción)
+    DIRECTORIO = os.getenv('CACHE_EMBEDDINGS_DIRECTORIO', 'data/cache/embeddings')
+    
+    # Tamaño objetivo al compactar (scripts/cache_embeddings.py --compactar);
+    # al superarlo durante una ejecución solo se muestra un aviso
+    MAX_MB = float(os.getenv('CACHE_EMBEDDINGS_MAX_MB', '2048'))
+
+
+class ConfigTopicos:
+    """
+    Configuración del análisis de tópicos de la Fase 05.
+    
+    Cada categoría se modela (UMAP, HDBSCAN, BERTopic y etiquetado con el
+    LLM) de forma independiente, en procesos separados que leen los
+    embeddings compartidos mapeados en memoria.
+    """
+    
+    # Procesos simultáneos (0 = automático según núcleos y memoria disponible;
+    # 1 = secuencial en el proceso principal)
+    PROCESOS = max(0, int(os.getenv('TOPICOS_PROCESOS', '0')))
+    
+    # Memoria estimada por proceso: limita los procesos a la memoria disponible
+    MEMORIA_PROCESO_MB = float(os.getenv('TOPICOS_MEMORIA_PROCESO_MB', '1500'))
+    
+    # Modelos BERTopic entrenados (uno por categoría, con sus etiquetas del LLM).
+    # Las opiniones nuevas se asignan a los tópicos existentes sin reentrenar
+    DIRECTORIO_MODELOS = os.getenv('TOPICOS_DIRECTORIO_MODELOS', 'models/topicos')
+    
+    # Reentrenar todas las categorías en la próxima ejecución
+    REENTRENAR = os.getenv('TOPICOS_REENTRENAR', 'false').lower() == 'true'
+    
+    # Deriva que provoca el reentrenamiento de una categoría:
+    # - MAX_CRECIMIENTO: crecimiento de la categoría desde el entrenamiento (0.5 = +50%)
+    # - MAX_DERIVA_OUTLIERS: aumento de la proporción de outliers (tópico -1)
+    #   entre las opiniones asignadas respecto del entrenamiento
+    MAX_CRECIMIENTO = float(os.getenv('TOPICOS_MAX_CRECIMIENTO', '0.5'))
+    MAX_DERIVA_OUTLIERS = float(os.getenv('TOPICOS_MAX_DERIVA_OUTLIERS', '0.15'))
+    
+    # Máximo de opiniones para entrenar el modelo de una categoría (0 = todas).
+    # Las categorías mayores se entrenan con una muestra estratificada y el
+    # resto de sus opiniones se asigna con el modelo entrenado
+    MAX_MUESTRA = max(0, int(os.getenv('TOPICOS_MAX_MUESTRA', '50000')))
+    
+    # Calcular la probabilidad de cada tópico por opinión (soft clustering de
+    # HDBSCAN) y guardarla en data/shared/topicos/. Es costoso y la fase solo
+    # usa el tópico asignado; bajo demanda: probabilidades_topicos()
+    PROBABILIDADES = os.getenv('TOPICOS_PROBABILIDADES', 'false').lower() == 'true'
+
+
+class ConfigReanudacion:
+    """
+    Configuración de la reanudación de fases largas (02, 03, 04 y 05).
+    
+    Guarda periódicamente el progreso parcial de la inferencia para que una
+    ejecución interrumpida continúe desde el último progreso guardado.
+    """
+    
+    HABILITADA = os.getenv('REANUDACION', 'true').lower() == 'true'
+    
+    # Directorio del progreso parcial (relativo al directorio de producción)
+    DIRECTORIO = os.getenv('REANUDACION_DIRECTORIO', 'data/reanudacion')
+    
+    # Guardar cada N lotes de inferencia o cada N segundos (lo que ocurra antes)
+    CADA_LOTES = max(1, int(os.getenv('REANUDACION_CADA_LOTES', '50')))
+    CADA_SEGUNDOS = float(os.getenv('REANUDACION_CADA_SEGUNDOS', '120'))
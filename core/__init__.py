@@ -5,6 +5,7 @@ Contiene todas las fases del pipeline de análisis de opiniones turísticas.
 """
 
 from .llm_provider import LLMProvider, get_llm, crear_chain
+from .almacen_dataset import AlmacenDataset
 from .fase_01_procesamiento_basico import ProcesadorBasico
 from .fase_02_analisis_sentimientos import AnalizadorSentimientos
 from .fase_03_analisis_subjetividad import AnalizadorSubjetividad
@@ -12,11 +13,13 @@ from .fase_04_clasificacion_categorias import ClasificadorCategorias
 from .fase_05_analisis_jerarquico_topicos import AnalizadorJerarquicoTopicos
 from .fase_06_resumen_inteligente import ResumidorInteligente
 from .fase_07_visualizaciones import GeneradorVisualizaciones
+from .pipeline import OrquestadorPipeline
 
 __all__ = [
     'LLMProvider',
     'get_llm',
     'crear_chain',
+    'AlmacenDataset',
     'ProcesadorBasico',
     'AnalizadorSentimientos',
     'AnalizadorSubjetividad',
@@ -24,4 +27,5 @@ __all__ = [
     'AnalizadorJerarquicoTopicos',
     'ResumidorInteligente',
     'GeneradorVisualizaciones',
+    'OrquestadorPipeline',
 ]
@@ -0,0 +1,728 @@
+"""
+Almacén Columnar del Dataset
+============================
+Persiste el dataset del pipeline en formato columnar (Parquet o Arrow IPC)
+con tipos preservados y compresión zstd.
+
+Cada columna derivada (Sentimiento, Subjetividad, Categorias, Topico...) vive
+en su propio archivo, de modo que cada fase escribe únicamente sus columnas
+en lugar de reescribir el dataset completo. El CSV se conserva como formato
+de importación/exportación.
+
+Para datasets mayores que la memoria, iterar_lotes() lee el dataset en lotes
+de tamaño fijo y escritor_lotes() escribe las columnas de salida lote a lote.
+
+Estructura en disco (junto a data/dataset.csv):
+    data/dataset_store/
+        _meta.json            # Columnas, archivo y huella de cada columna, nº de filas
+        base.parquet          # Columnas escritas por la Fase 01
+        Sentimiento.parquet   # Una columna por archivo para el resto de fases
+        ...
+"""
+
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from config import ConfigAlmacenamiento
+
+
+@contextmanager
+def bloqueo_archivo(ruta: Path):
+    """
+    Bloqueo exclusivo entre procesos para actualizar metadatos compartidos
+    (fases que escriben en paralelo desde procesos separados).
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class AlmacenDataset:
+    """
+    Almacén del dataset con backend intercambiable (Parquet, Arrow IPC o CSV).
+
+    En modo 'csv' reproduce el comportamiento clásico (leer y reescribir el
+    CSV completo). En los modos columnares lee solo las columnas solicitadas
+    y escribe cada columna en un archivo independiente.
+    """
+
+    EXTENSIONES = {'parquet': '.parquet', 'arrow': '.arrow'}
+    ARCHIVO_BASE = 'base'
+    ARCHIVO_META = '_meta.json'
+    ARCHIVO_BLOQUEO = '_meta.lock'
+
+    def __init__(self, ruta_csv='data/dataset.csv', formato: Optional[str] = None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            ruta_csv: Ruta al CSV del dataset (importación/exportación)
+            formato: 'parquet', 'arrow' o 'csv'. Por defecto ConfigAlmacenamiento.FORMATO
+        """
+        self.ruta_csv = Path(ruta_csv)
+        self.formato = (formato or ConfigAlmacenamiento.FORMATO).lower()
+        self.compresion = ConfigAlmacenamiento.COMPRESION
+        self.directorio = self.ruta_csv.parent / f'{self.ruta_csv.stem}_store'
+
+        if self.formato not in ('parquet', 'arrow', 'csv'):
+            raise ValueError(
+                f"Formato de almacén inválido: '{self.formato}'. "
+                "Valores válidos: 'parquet', 'arrow' o 'csv'"
+            )
+
+        if self.es_columnar and not PYARROW_AVAILABLE:
+            raise ImportError(
+                "La librería pyarrow no está disponible. "
+                "Instala con: pip install pyarrow (o usa DATASET_FORMATO=csv)"
+            )
+
+    @property
+    def es_columnar(self) -> bool:
+        """Indica si el almacén usa un formato columnar."""
+        return self.formato != 'csv'
+
+    # ========== CONSULTAS ==========
+
+    def existe(self) -> bool:
+        """Verifica si hay un dataset disponible (almacén o CSV importable)."""
+        if self.es_columnar and (self.directorio / self.ARCHIVO_META).exists():
+            return True
+        return self.ruta_csv.exists()
+
+    def columnas(self) -> List[str]:
+        """
+        Retorna las columnas disponibles sin cargar los datos.
+
+        En modo columnar solo consulta los metadatos del almacén.
+        """
+        if not self.es_columnar:
+            if not self.ruta_csv.exists():
+                return []
+            return pd.read_csv(self.ruta_csv, nrows=0).columns.tolist()
+
+        self._sincronizar_csv()
+        return list(self._leer_meta().get('columnas', {}).keys())
+
+    def num_filas(self) -> int:
+        """Retorna el número de filas del dataset."""
+        if not self.es_columnar:
+            return len(pd.read_csv(self.ruta_csv, usecols=[0])) if self.ruta_csv.exists() else 0
+
+        self._sincronizar_csv()
+        return int(self._leer_meta().get('filas', 0))
+
+    def huella(self, columnas: List[str]) -> Optional[str]:
+        """
+        Huella de contenido de un conjunto de columnas.
+
+        En modo columnar se obtiene de los metadatos (huella de cada archivo
+        calculada al escribirlo), sin leer los datos. En modo CSV se calcula
+        leyendo solo esas columnas.
+
+        Returns:
+            Hash hexadecimal, '' si no se piden columnas, o None si alguna
+            columna no existe
+        """
+        if not columnas:
+            return ''
+
+        h = hashlib.sha256()
+
+        if not self.es_columnar:
+            if not set(columnas).issubset(self.columnas()):
+                return None
+            df = self.leer(sorted(columnas))
+            h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+            return h.hexdigest()[:16]
+
+        self._sincronizar_csv()
+        meta = self._leer_meta()
+        mapa = meta.get('columnas', {})
+        huellas = meta.setdefault('huellas', {})
+
+        if not set(columnas).issubset(mapa):
+            return None
+
+        actualizada = False
+        for columna in sorted(columnas):
+            archivo = mapa[columna]
+            if archivo not in huellas:
+                # Almacenes creados antes de registrar huellas
+                huellas[archivo] = self._hash_archivo(self._ruta_archivo(archivo))
+                actualizada = True
+            h.update(f'{columna}:{huellas[archivo]};'.encode('utf-8'))
+
+        if actualizada:
+            with self._bloqueo():
+                meta_actual = self._leer_meta()
+                for archivo, huella_archivo in huellas.items():
+                    meta_actual.setdefault('huellas', {}).setdefault(archivo, huella_archivo)
+                self._guardar_meta(meta_actual)
+
+        return h.hexdigest()[:16]
+
+    # ========== LECTURA ==========
+
+    def leer(self, columnas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lee el dataset (o un subconjunto de columnas).
+
+        Args:
+            columnas: Columnas a cargar. None carga todas.
+
+        Returns:
+            DataFrame con índice posicional (RangeIndex)
+        """
+        if not self.es_columnar:
+            if columnas is None:
+                return pd.read_csv(self.ruta_csv)
+            return pd.read_csv(self.ruta_csv, usecols=columnas)[columnas]
+
+        self._sincronizar_csv()
+        meta = self._leer_meta()
+        mapa = meta.get('columnas', {})
+
+        if not mapa:
+            raise FileNotFoundError(f"Dataset no encontrado: {self.ruta_csv}")
+
+        if columnas is None:
+            columnas = list(mapa.keys())
+
+        faltantes = [c for c in columnas if c not in mapa]
+        if faltantes:
+            raise KeyError(f"Columnas no disponibles en el dataset: {faltantes}")
+
+        # Agrupar columnas por archivo para leer cada archivo una sola vez
+        por_archivo: Dict[str, List[str]] = {}
+        for columna in columnas:
+            por_archivo.setdefault(mapa[columna], []).append(columna)
+
+        partes = [
+            self._leer_archivo(archivo, cols).to_pandas()
+            for archivo, cols in por_archivo.items()
+        ]
+        df = pd.concat(partes, axis=1) if len(partes) > 1 else partes[0]
+
+        return df[columnas].reset_index(drop=True)
+
+    def iterar_lotes(self, columnas: Optional[List[str]] = None, tamano_lote: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Lee el dataset en lotes de tamaño fijo (modo por lotes).
+
+        Solo se mantiene en memoria un lote a la vez. El índice de cada lote
+        conserva la posición global de sus filas en el dataset.
+
+        Args:
+            columnas: Columnas a cargar. None carga todas.
+            tamano_lote: Filas por lote. Por defecto ConfigAlmacenamiento.TAMANO_LOTE
+
+        Yields:
+            DataFrame con las filas del lote
+        """
+        tamano_lote = int(tamano_lote or ConfigAlmacenamiento.TAMANO_LOTE or 10000)
+
+        if not self.es_columnar:
+            inicio = 0
+            for lote in pd.read_csv(self.ruta_csv, usecols=columnas, chunksize=tamano_lote):
+                lote = lote[columnas] if columnas is not None else lote
+                lote.index = pd.RangeIndex(inicio, inicio + len(lote))
+                inicio += len(lote)
+                yield lote
+            return
+
+        self._sincronizar_csv()
+        meta = self._leer_meta()
+        mapa = meta.get('columnas', {})
+
+        if not mapa:
+            raise FileNotFoundError(f"Dataset no encontrado: {self.ruta_csv}")
+
+        if columnas is None:
+            columnas = list(mapa.keys())
+
+        faltantes = [c for c in columnas if c not in mapa]
+        if faltantes:
+            raise KeyError(f"Columnas no disponibles en el dataset: {faltantes}")
+
+        por_archivo: Dict[str, List[str]] = {}
+        for columna in columnas:
+            por_archivo.setdefault(mapa[columna], []).append(columna)
+
+        lectores = [
+            self._lotes_exactos(self._iterar_archivo(archivo, cols), tamano_lote)
+            for archivo, cols in por_archivo.items()
+        ]
+
+        inicio = 0
+        for tablas in zip(*lectores):
+            partes = [tabla.to_pandas() for tabla in tablas]
+            lote = pd.concat(partes, axis=1) if len(partes) > 1 else partes[0]
+            lote = lote[columnas]
+            lote.index = pd.RangeIndex(inicio, inicio + len(lote))
+            inicio += len(lote)
+            yield lote
+
+    # ========== ESCRITURA ==========
+
+    def escribir(self, df: pd.DataFrame):
+        """
+        Reemplaza el dataset completo (usado por la Fase 01).
+
+        Descarta todas las columnas derivadas escritas previamente.
+        """
+        if not self.es_columnar:
+            df.to_csv(self.ruta_csv, index=False)
+            return
+
+        with self._bloqueo():
+            meta = self._leer_meta()
+            huella_base = self._escribir_archivo(self.ARCHIVO_BASE, df)
+
+            meta['formato'] = self.formato
+            meta['filas'] = len(df)
+            meta['columnas'] = {columna: self.ARCHIVO_BASE for columna in df.columns}
+            meta['huellas'] = {self.ARCHIVO_BASE: huella_base}
+            self._guardar_meta(meta)
+            self._limpiar_archivos_huerfanos(meta)
+
+    def escribir_columnas(self, df: pd.DataFrame):
+        """
+        Agrega o reemplaza columnas del dataset.
+
+        En modo columnar cada columna se escribe en su propio archivo,
+        sin tocar el resto del dataset.
+
+        Args:
+            df: DataFrame con las columnas a escribir (mismo número de filas)
+        """
+        if not self.es_columnar:
+            df_completo = pd.read_csv(self.ruta_csv)
+            for columna in df.columns:
+                df_completo[columna] = df[columna].values
+            df_completo.to_csv(self.ruta_csv, index=False)
+            return
+
+        with self._bloqueo():
+            meta = self._leer_meta()
+            self._validar_filas(meta, len(df))
+
+            for columna in df.columns:
+                archivo = self._nombre_archivo(columna)
+                meta.setdefault('huellas', {})[archivo] = self._escribir_archivo(archivo, df[[columna]])
+                meta['columnas'][columna] = archivo
+
+            self._podar_huellas(meta)
+            self._guardar_meta(meta)
+            self._limpiar_archivos_huerfanos(meta)
+
+    def escritor_lotes(self, columnas_base: Optional[List[str]] = None) -> 'EscritorLotes':
+        """
+        Escritor para generar columnas lote a lote (modo por lotes).
+
+        Uso:
+            with almacen.escritor_lotes() as escritor:
+                for lote in almacen.iterar_lotes(['TituloReview'], 10000):
+                    escritor.escribir_lote(resultado_del_lote)
+
+        Los archivos se escriben en temporales y se incorporan al almacén al
+        salir del bloque sin errores.
+
+        Args:
+            columnas_base: Si se indica, el escritor reemplaza el dataset
+                           completo (Fase 01): estas columnas van al archivo
+                           base y el resto a un archivo por columna. Si es
+                           None, agrega o reemplaza columnas del dataset.
+        """
+        if not self.es_columnar:
+            raise ValueError("La escritura por lotes requiere un formato columnar (parquet o arrow)")
+        return EscritorLotes(self, columnas_base)
+
+    # ========== IMPORTACIÓN / EXPORTACIÓN CSV ==========
+
+    def importar_csv(self, ruta=None):
+        """
+        Importa un CSV al almacén columnar, reemplazando su contenido.
+
+        Args:
+            ruta: CSV a importar. Por defecto el CSV del dataset.
+        """
+        ruta = Path(ruta) if ruta else self.ruta_csv
+        tamano_lote = ConfigAlmacenamiento.TAMANO_LOTE
+
+        if self.es_columnar and tamano_lote:
+            # Importación por lotes: el CSV nunca se carga completo
+            with self.escritor_lotes(columnas_base=pd.read_csv(ruta, nrows=0).columns.tolist()) as escritor:
+                for lote in pd.read_csv(ruta, chunksize=tamano_lote):
+                    escritor.escribir_lote(lote)
+        else:
+            self.escribir(pd.read_csv(ruta))
+
+        if ruta == self.ruta_csv:
+            self.registrar_csv()
+
+    def exportar_csv(self, ruta=None):
+        """
+        Exporta el dataset completo a CSV.
+
+        Args:
+            ruta: Destino. Por defecto el CSV del dataset.
+        """
+        ruta = Path(ruta) if ruta else self.ruta_csv
+
+        if not self.es_columnar:
+            if ruta != self.ruta_csv:
+                self.leer().to_csv(ruta, index=False)
+            return
+
+        tamano_lote = ConfigAlmacenamiento.TAMANO_LOTE
+        if tamano_lote:
+            # Exportación por lotes: se agrega cada lote al CSV
+            ruta_tmp = ruta.with_name(ruta.name + '.tmp')
+            primero = True
+            for lote in self.iterar_lotes(tamano_lote=tamano_lote):
+                lote.to_csv(ruta_tmp, index=False, header=primero, mode='w' if primero else 'a')
+                primero = False
+            if primero:
+                pd.DataFrame(columns=self.columnas()).to_csv(ruta_tmp, index=False)
+            os.replace(ruta_tmp, ruta)
+        else:
+            self.leer().to_csv(ruta, index=False)
+
+        if ruta == self.ruta_csv:
+            # Registrar el estado para no re-importar nuestra propia exportación
+            self.registrar_csv()
+
+    def csv_modificado(self) -> bool:
+        """Indica si el CSV cambió desde la última importación o exportación."""
+        if not self.es_columnar or not self.ruta_csv.exists():
+            return False
+        return self._leer_meta().get('csv') != self._estado_csv()
+
+    def registrar_csv(self):
+        """Marca el estado actual del CSV como ya incorporado al almacén."""
+        if not self.es_columnar or not self.ruta_csv.exists():
+            return
+        with self._bloqueo():
+            meta = self._leer_meta()
+            meta['csv'] = self._estado_csv()
+            self._guardar_meta(meta)
+
+    # ========== INTERNOS ==========
+
+    def _sincronizar_csv(self):
+        """
+        Importa el CSV si es nuevo o cambió desde la última sincronización.
+
+        En modo incremental un almacén con datos no se reemplaza: las reseñas
+        nuevas del CSV las incorpora la Fase 01.
+        """
+        if not self.ruta_csv.exists():
+            return
+
+        meta = self._leer_meta()
+        if ConfigAlmacenamiento.INCREMENTAL and meta.get('columnas'):
+            return
+
+        if meta.get('csv') != self._estado_csv():
+            print(f"   • Importando {self.ruta_csv} al almacén {self.formato}...")
+            self.importar_csv()
+
+    def _bloqueo(self):
+        return bloqueo_archivo(self.directorio / self.ARCHIVO_BLOQUEO)
+
+    def _validar_filas(self, meta: Dict, filas_nuevas: int):
+        """Verifica que las columnas a escribir tengan el número de filas del dataset."""
+        filas = meta.get('filas')
+
+        if filas is None:
+            raise FileNotFoundError(
+                f"Dataset no encontrado en {self.directorio}. "
+                "Ejecuta primero la Fase 01."
+            )
+        if filas_nuevas != filas:
+            raise ValueError(
+                f"Número de filas inconsistente: {filas_nuevas} (esperadas {filas})"
+            )
+
+    def _estado_csv(self) -> Dict:
+        """Huella barata del CSV (tamaño y fecha de modificación)."""
+        stat = self.ruta_csv.stat()
+        return {'tamano': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _ruta_archivo(self, archivo: str) -> Path:
+        return self.directorio / f'{archivo}{self.EXTENSIONES[self.formato]}'
+
+    def _nombre_archivo(self, columna: str) -> str:
+        """Nombre de archivo seguro para una columna."""
+        nombre = re.sub(r'[^\w\-]', '_', columna)
+        return f'col_{nombre}' if nombre == self.ARCHIVO_BASE else nombre
+
+    def _iterar_archivo(self, archivo: str, columnas: List[str]):
+        """Lee un archivo del almacén por record batches (sin cargarlo completo)."""
+        ruta = self._ruta_archivo(archivo)
+        if self.formato == 'parquet':
+            yield from pq.ParquetFile(ruta).iter_batches(columns=columnas)
+            return
+        with pa.memory_map(str(ruta)) as fuente:
+            lector = pa.ipc.open_file(fuente)
+            for i in range(lector.num_record_batches):
+                yield lector.get_batch(i).select(columnas)
+
+    @staticmethod
+    def _lotes_exactos(batches, tamano_lote: int):
+        """Reagrupa record batches en tablas de exactamente tamano_lote filas."""
+        pendientes = []
+        filas = 0
+        for batch in batches:
+            inicio = 0
+            while inicio < batch.num_rows:
+                toma = min(tamano_lote - filas, batch.num_rows - inicio)
+                pendientes.append(batch.slice(inicio, toma))
+                filas += toma
+                inicio += toma
+                if filas == tamano_lote:
+                    yield pa.Table.from_batches(pendientes)
+                    pendientes = []
+                    filas = 0
+        if pendientes:
+            yield pa.Table.from_batches(pendientes)
+
+    def _leer_archivo(self, archivo: str, columnas: List[str]):
+        ruta = self._ruta_archivo(archivo)
+        if self.formato == 'parquet':
+            return pq.read_table(ruta, columns=columnas)
+        return feather.read_table(ruta, columns=columnas)
+
+    def _escribir_archivo(self, archivo: str, df: pd.DataFrame) -> str:
+        """
+        Escribe un archivo de forma atómica (temporal + rename).
+
+        Returns:
+            Huella de contenido del archivo escrito
+        """
+        ruta = self._ruta_archivo(archivo)
+        ruta_tmp = ruta.with_name(ruta.name + '.tmp')
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self.formato == 'parquet':
+            pq.write_table(tabla, ruta_tmp, compression=self.compresion)
+        else:
+            feather.write_feather(tabla, ruta_tmp, compression=self.compresion)
+
+        huella = self._hash_archivo(ruta_tmp)
+        os.replace(ruta_tmp, ruta)
+        return huella
+
+    @staticmethod
+    def _hash_archivo(ruta: Path) -> str:
+        h = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloque)
+        return h.hexdigest()[:16]
+
+    def _limpiar_archivos_huerfanos(self, meta: Dict):
+        """Elimina archivos de columnas que ya no están referenciadas."""
+        en_uso = set(meta.get('columnas', {}).values())
+        extension = self.EXTENSIONES[self.formato]
+
+        for ruta in self.directorio.glob(f'*{extension}'):
+            if ruta.stem not in en_uso:
+                ruta.unlink()
+
+    @staticmethod
+    def _podar_huellas(meta: Dict):
+        """Descarta huellas de archivos que ya no están referenciados."""
+        en_uso = set(meta.get('columnas', {}).values())
+        meta['huellas'] = {
+            archivo: huella for archivo, huella in meta.get('huellas', {}).items()
+            if archivo in en_uso
+        }
+
+    def _leer_meta(self) -> Dict:
+        ruta = self.directorio / self.ARCHIVO_META
+        if not ruta.exists():
+            return {}
+        with open(ruta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Un almacén creado con otro formato se trata como vacío
+        if meta.get('formato') not in (None, self.formato):
+            return {}
+        return meta
+
+    def _guardar_meta(self, meta: Dict):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self.directorio / self.ARCHIVO_META
+        ruta_tmp = ruta.with_name(ruta.name + '.tmp')
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(ruta_tmp, ruta)
+
+
+class EscritorLotes:
+    """
+    Escribe columnas del almacén lote a lote.
+
+    Cada archivo se escribe en un temporal con un writer incremental
+    (ParquetWriter o Arrow IPC) y se incorpora al almacén al cerrar, de forma
+    atómica y bajo el bloqueo de metadatos. Si ocurre un error, los
+    temporales se descartan y el almacén queda intacto.
+    """
+
+    def __init__(self, almacen: AlmacenDataset, columnas_base: Optional[List[str]] = None):
+        """
+        Args:
+            almacen: Almacén de destino
+            columnas_base: Columnas del archivo base si el escritor reemplaza
+                           el dataset completo (None = agregar columnas)
+        """
+        self.almacen = almacen
+        self.columnas_base = list(columnas_base) if columnas_base is not None else None
+        self.filas = 0
+        self._columnas: Optional[List[str]] = None
+        self._writers: Dict[str, object] = {}
+        self._esquemas: Dict[str, 'pa.Schema'] = {}
+        self._grupos: Dict[str, List[str]] = {}
+
+    def __enter__(self):
+        self.almacen.directorio.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        try:
+            self._cerrar_writers()
+            if tipo_error is None:
+                self._confirmar()
+        finally:
+            self._descartar()
+        return False
+
+    def escribir_lote(self, df: pd.DataFrame):
+        """
+        Agrega un lote de filas.
+
+        El primer lote fija las columnas; en los siguientes, las columnas
+        ausentes se completan con valores vacíos.
+        """
+        if self._columnas is None:
+            self._columnas = list(df.columns)
+            self._grupos = self._agrupar(self._columnas)
+
+        for columna in self._columnas:
+            if columna not in df.columns:
+                df = df.assign(**{columna: None})
+
+        for archivo, cols in self._grupos.items():
+            tabla = pa.Table.from_pandas(df[cols], preserve_index=False)
+            self._writer(archivo, tabla).write_table(self._ajustar_esquema(archivo, tabla))
+
+        self.filas += len(df)
+
+    # ========== INTERNOS ==========
+
+    def _agrupar(self, columnas: List[str]) -> Dict[str, List[str]]:
+        grupos: Dict[str, List[str]] = {}
+        for columna in columnas:
+            if self.columnas_base is not None and columna in self.columnas_base:
+                archivo = self.almacen.ARCHIVO_BASE
+            else:
+                archivo = self.almacen._nombre_archivo(columna)
+            grupos.setdefault(archivo, []).append(columna)
+        return grupos
+
+    def _ruta_tmp(self, archivo: str) -> Path:
+        ruta = self.almacen._ruta_archivo(archivo)
+        return ruta.with_name(ruta.name + '.tmp')
+
+    def _writer(self, archivo: str, tabla):
+        if archivo not in self._writers:
+            # Columnas vacías en el primer lote se guardan como texto
+            esquema = pa.schema([
+                campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo
+                for campo in tabla.schema
+            ])
+            ruta_tmp = self._ruta_tmp(archivo)
+            if self.almacen.formato == 'parquet':
+                writer = pq.ParquetWriter(ruta_tmp, esquema, compression=self.almacen.compresion)
+            else:
+                opciones = pa.ipc.IpcWriteOptions(compression=self.almacen.compresion)
+                writer = pa.ipc.new_file(str(ruta_tmp), esquema, options=opciones)
+            self._writers[archivo] = writer
+            self._esquemas[archivo] = esquema
+        return self._writers[archivo]
+
+    def _ajustar_esquema(self, archivo: str, tabla):
+        esquema = self._esquemas[archivo]
+        if tabla.schema.equals(esquema, check_metadata=False):
+            return tabla
+        try:
+            return tabla.cast(esquema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(
+                f"El tipo de las columnas {tabla.column_names} cambió entre lotes: {e}. "
+                "Desactiva el modo por lotes (DATASET_TAMANO_LOTE=0) para este dataset."
+            )
+
+    def _cerrar_writers(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def _descartar(self):
+        for archivo in self._writers:
+            ruta_tmp = self._ruta_tmp(archivo)
+            if ruta_tmp.exists():
+                ruta_tmp.unlink()
+
+    def _confirmar(self):
+        if self._columnas is None:
+            return  # Ningún lote escrito
+
+        almacen = self.almacen
+        with almacen._bloqueo():
+            meta = almacen._leer_meta()
+
+            if self.columnas_base is None:
+                almacen._validar_filas(meta, self.filas)
+            else:
+                meta['formato'] = almacen.formato
+                meta['filas'] = self.filas
+                meta['columnas'] = {}
+                meta['huellas'] = {}
+
+            for archivo, cols in self._grupos.items():
+                ruta_tmp = self._ruta_tmp(archivo)
+                meta.setdefault('huellas', {})[archivo] = almacen._hash_archivo(ruta_tmp)
+                os.replace(ruta_tmp, almacen._ruta_archivo(archivo))
+                for columna in cols:
+                    meta['columnas'][columna] = archivo
+
+            almacen._podar_huellas(meta)
+            almacen._guardar_meta(meta)
+            almacen._limpiar_archivos_huerfanos(meta)
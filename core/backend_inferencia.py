@@ -0,0 +1,469 @@
+"""
+Backends de Inferencia
+======================
+Ejecución de los clasificadores de las fases 02, 03 y 04 con PyTorch o con
+ONNX Runtime (ConfigInferencia.BACKEND).
+
+Con el backend 'onnx' cada modelo se exporta una sola vez a
+models/onnx/<modelo>-<hash>/model.onnx (el hash cambia si el modelo se
+re-entrena) y se compara con las salidas de PyTorch sobre textos de
+ejemplo. Si la diferencia supera ConfigInferencia.TOLERANCIA_PARIDAD, el
+modelo se sigue ejecutando con PyTorch.
+
+Con ConfigInferencia.CUANTIZACION las capas lineales se cuantizan a INT8
+(cuantización dinámica, solo CPU) con el backend con el que se ejecuta el
+modelo fp32 (ONNX Runtime, o PyTorch si la exportación no superó la
+paridad). El modelo cuantizado se guarda en disco y, al crearlo, se comparan
+sus etiquetas con las del modelo fp32 sobre una muestra de reseñas. Los
+acuerdos medidos se guardan y se comparan en cada carga con el valor actual
+de ConfigInferencia.CUANTIZACION_MIN_ACUERDO: si el acuerdo global o el de
+alguna clase queda por debajo, el modo se rechaza y se usa el modelo fp32.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification
+
+from config import ConfigInferencia
+from .almacen_dataset import AlmacenDataset
+from .batches_longitud import inferir_por_longitud
+from .cache_inferencia import identificador_modelo_local
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Clases con menos ejemplos en la muestra no se usan para rechazar la cuantización
+SOPORTE_MINIMO_CLASE = 10
+
+
+# Textos de ejemplo para verificar la exportación (longitudes variadas)
+TEXTOS_PARIDAD = [
+    "Excelente",
+    "La comida estaba fría y el servicio fue muy lento.",
+    "Hermosa playa, agua cristalina y muy limpia. Volvería sin dudarlo.",
+    "El hotel está bien ubicado, aunque las habitaciones necesitan mantenimiento "
+    "y el desayuno es bastante básico para el precio que se paga por noche.",
+    "Visitamos el museo con un guía que nos explicó la historia de la ciudad, "
+    "los murales y la arquitectura colonial. Después comimos en un restaurante "
+    "típico del centro: mole, tamales y un café de olla delicioso. El transporte "
+    "de regreso fue caótico, pero en general fue un día increíble para toda la familia.",
+]
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Probabilidades por clase (clasificación de una etiqueta)."""
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def sigmoide(logits: np.ndarray) -> np.ndarray:
+    """Probabilidad independiente por clase (clasificación multi-etiqueta)."""
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def _a_numpy(tensor) -> np.ndarray:
+    return tensor.cpu().numpy() if hasattr(tensor, 'cpu') else np.asarray(tensor)
+
+
+class ClasificadorPyTorch:
+    """Modelo de clasificación de HuggingFace ejecutado con PyTorch."""
+
+    backend = 'pytorch'
+
+    def __init__(self, modelo: str, model=None):
+        """
+        Args:
+            modelo: Nombre de HuggingFace o ruta local del modelo
+            model: Modelo ya cargado (ej. cuantizado, que solo se ejecuta en CPU)
+        """
+        if model is None:
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            model = AutoModelForSequenceClassification.from_pretrained(modelo)
+        else:
+            self.device = torch.device('cpu')
+        self.model = model
+        self.model.to(self.device)
+        self.model.eval()
+        self.config = self.model.config
+
+    def logits(self, input_ids, attention_mask) -> np.ndarray:
+        """Logits del modelo para un batch tokenizado."""
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids.to(self.device),
+                attention_mask=attention_mask.to(self.device)
+            )
+        return outputs.logits.float().cpu().numpy()
+
+
+class ClasificadorONNX:
+    """Modelo de clasificación exportado a ONNX y ejecutado con ONNX Runtime."""
+
+    backend = 'onnx'
+
+    def __init__(self, modelo: str, ruta_onnx: Path):
+        opciones = ort.SessionOptions()
+        opciones.intra_op_num_threads = ConfigInferencia.HILOS_INTRA
+        opciones.inter_op_num_threads = ConfigInferencia.HILOS_INTER
+        opciones.execution_mode = (
+            ort.ExecutionMode.ORT_PARALLEL if ConfigInferencia.HILOS_INTER > 1
+            else ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sesion = ort.InferenceSession(
+            str(ruta_onnx), opciones, providers=['CPUExecutionProvider']
+        )
+        self.config = AutoConfig.from_pretrained(modelo)
+
+    def logits(self, input_ids, attention_mask) -> np.ndarray:
+        """Logits del modelo para un batch tokenizado."""
+        return self.sesion.run(['logits'], {
+            'input_ids': _a_numpy(input_ids).astype(np.int64),
+            'attention_mask': _a_numpy(attention_mask).astype(np.int64),
+        })[0]
+
+
+def _nombre_directorio(modelo: str) -> str:
+    """Nombre de carpeta de un modelo (cambia si el modelo se re-entrena)."""
+    nombre = re.sub(r'[^\w.-]+', '_', str(modelo)).strip('_')[-60:]
+    firma = hashlib.sha256(identificador_modelo_local(modelo).encode('utf-8')).hexdigest()[:12]
+    return f'{nombre}-{firma}'
+
+
+def ruta_onnx(modelo: str) -> Path:
+    """Ruta del modelo exportado (depende del nombre y de los archivos del modelo)."""
+    return Path(ConfigInferencia.DIRECTORIO_ONNX) / _nombre_directorio(modelo) / 'model.onnx'
+
+
+def ruta_int8(modelo: str, onnx: bool) -> Path:
+    """
+    Ruta del modelo cuantizado a INT8.
+
+    Args:
+        onnx: Si el modelo fp32 se ejecuta con ONNX Runtime (si no, PyTorch)
+    """
+    if onnx:
+        return ruta_onnx(modelo).with_name('model_int8.onnx')
+    return Path(ConfigInferencia.DIRECTORIO_INT8) / _nombre_directorio(modelo) / 'model_int8.pt'
+
+
+def verificar_paridad(clasificador_pytorch, clasificador_onnx, tokenizer, textos=None) -> float:
+    """
+    Diferencia máxima entre los logits de PyTorch y de ONNX Runtime.
+
+    Args:
+        textos: Textos de prueba (por defecto, TEXTOS_PARIDAD)
+    """
+    encoding = tokenizer(
+        list(textos or TEXTOS_PARIDAD), max_length=512, padding=True,
+        truncation=True, return_tensors='pt'
+    )
+    esperado = clasificador_pytorch.logits(encoding['input_ids'], encoding['attention_mask'])
+    obtenido = clasificador_onnx.logits(encoding['input_ids'], encoding['attention_mask'])
+    return float(np.max(np.abs(esperado - obtenido)))
+
+
+def exportar_onnx(modelo: str, tokenizer) -> Path:
+    """
+    Exporta el modelo a ONNX (si no se exportó antes) y registra la
+    verificación de paridad con PyTorch en paridad.json.
+
+    Returns:
+        Ruta del archivo .onnx
+    """
+    ruta = ruta_onnx(modelo)
+    if ruta.exists():
+        return ruta
+
+    print(f"   📦 Exportando {modelo} a ONNX (solo la primera vez)...")
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    clasificador_pytorch = ClasificadorPyTorch(modelo)
+    model = clasificador_pytorch.model.cpu()
+    model.config.return_dict = False
+
+    ejemplo = tokenizer(TEXTOS_PARIDAD[:2], padding=True, return_tensors='pt')
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (ejemplo['input_ids'], ejemplo['attention_mask']),
+            str(temporal),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'secuencia'},
+                'attention_mask': {0: 'batch', 1: 'secuencia'},
+                'logits': {0: 'batch'},
+            },
+            opset_version=14
+        )
+    model.config.return_dict = True
+    clasificador_pytorch.device = torch.device('cpu')
+
+    diferencia = verificar_paridad(clasificador_pytorch, ClasificadorONNX(modelo, temporal), tokenizer)
+    valida = diferencia <= ConfigInferencia.TOLERANCIA_PARIDAD
+    with open(ruta.parent / 'paridad.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'modelo': identificador_modelo_local(modelo),
+            'diferencia_maxima': diferencia,
+            'tolerancia': ConfigInferencia.TOLERANCIA_PARIDAD,
+            'valida': valida,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+    estado = "✅" if valida else "⚠️"
+    print(f"   {estado} Paridad ONNX/PyTorch: diferencia máxima {diferencia:.2e} "
+          f"(tolerancia {ConfigInferencia.TOLERANCIA_PARIDAD:.0e})")
+    return ruta
+
+
+def _leer_json(ruta: Path) -> Optional[Dict]:
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _usa_onnx(modelo: str) -> Optional[bool]:
+    """
+    Si el modelo fp32 se ejecuta con ONNX Runtime (True) o con PyTorch
+    (False); None si el backend es ONNX pero el modelo aún no se exportó.
+    """
+    if ConfigInferencia.BACKEND != 'onnx':
+        return False
+    paridad = _leer_json(ruta_onnx(modelo).parent / 'paridad.json')
+    return None if paridad is None else bool(paridad['valida'])
+
+
+def _leer_validacion(modelo: str, onnx: bool) -> Optional[Dict]:
+    return _leer_json(ruta_int8(modelo, onnx).with_name('validacion_int8.json'))
+
+
+def _evaluar_validacion(validacion: Dict) -> Dict:
+    """
+    Aprobación de una validación INT8 con el mínimo configurado actualmente
+    (los acuerdos medidos no dependen del mínimo: cambiarlo no requiere
+    volver a validar).
+    """
+    minimo = ConfigInferencia.CUANTIZACION_MIN_ACUERDO
+    rechazadas = [
+        nombre for nombre, clase in validacion['acuerdo_por_clase'].items()
+        if clase['soporte'] >= SOPORTE_MINIMO_CLASE and clase['acuerdo'] < minimo
+    ]
+    return {
+        **validacion,
+        'minimo': minimo,
+        'clases_bajo_minimo': rechazadas,
+        'aprobada': validacion['acuerdo_global'] >= minimo and not rechazadas,
+    }
+
+
+def validacion_pendiente(modelo: str) -> bool:
+    """
+    Indica si la cuantización está activa y el modelo aún no se validó (no
+    se sabe qué variante se ejecutará hasta cargar el clasificador).
+    """
+    if not ConfigInferencia.CUANTIZACION:
+        return False
+    onnx = _usa_onnx(modelo)
+    return onnx is None or _leer_validacion(modelo, onnx) is None
+
+
+def variante_modelo(modelo: str) -> str:
+    """
+    Sufijo del identificador del modelo para la caché de inferencia, el
+    progreso de reanudación y el manifiesto: '#int8' (o '#int8-onnx') si se
+    usa el modelo cuantizado y aprobado, '' en caso contrario.
+
+    Mientras la validación esté pendiente retorna '': las fases cargan el
+    clasificador (que valida) antes de usar el identificador.
+    """
+    if not ConfigInferencia.CUANTIZACION:
+        return ''
+    onnx = _usa_onnx(modelo)
+    if onnx is None:
+        return ''
+    validacion = _leer_validacion(modelo, onnx)
+    if validacion is None or not _evaluar_validacion(validacion)['aprobada']:
+        return ''
+    return '#int8-onnx' if onnx else '#int8'
+
+
+def muestra_validacion(muestras: int, semilla: int = 42) -> List[str]:
+    """Muestra aleatoria (reproducible) de títulos de reseñas del dataset."""
+    try:
+        textos = AlmacenDataset('data/dataset.csv').leer(['TituloReview'])['TituloReview']
+    except Exception:
+        return list(TEXTOS_PARIDAD)
+    textos = textos.dropna().astype(str)
+    textos = textos[textos.str.strip() != '']
+    if textos.empty:
+        return list(TEXTOS_PARIDAD)
+    return textos.sample(n=min(muestras, len(textos)), random_state=semilla).tolist()
+
+
+def _decidir_argmax(logits: np.ndarray) -> np.ndarray:
+    """Etiqueta de mayor puntuación como matriz booleana (n_textos, n_clases)."""
+    return np.eye(logits.shape[1], dtype=bool)[logits.argmax(axis=1)]
+
+
+def validar_cuantizacion(referencia, cuantizado, tokenizer, max_length: int,
+                         decidir: Callable, nombres: List[str], textos: List[str]) -> Dict:
+    """
+    Compara las etiquetas del modelo cuantizado con las del modelo fp32.
+
+    Args:
+        referencia, cuantizado: Clasificadores fp32 e INT8
+        decidir: Función logits -> matriz booleana (n_textos, n_clases) de
+                 etiquetas asignadas (argmax, o thresholds en multi-etiqueta)
+        nombres: Nombre de cada clase
+        textos: Muestra de validación
+
+    Returns:
+        Reporte con el acuerdo global (textos con exactamente las mismas
+        etiquetas), el acuerdo por clase (textos donde ambos modelos
+        coinciden, entre los que alguno asigna la clase) y si se aprueba
+    """
+    esperado = decidir(inferir_por_longitud(
+        textos, tokenizer, max_length, 32, referencia.logits, mostrar_progreso=False
+    ))
+    obtenido = decidir(inferir_por_longitud(
+        textos, tokenizer, max_length, 32, cuantizado.logits, mostrar_progreso=False
+    ))
+
+    acuerdo_global = float(np.mean((esperado == obtenido).all(axis=1)))
+    por_clase = {}
+    for j, nombre in enumerate(nombres):
+        alguno = esperado[:, j] | obtenido[:, j]
+        por_clase[nombre] = {
+            'soporte': int(esperado[:, j].sum()),
+            'acuerdo': float(np.mean(esperado[alguno, j] == obtenido[alguno, j])) if alguno.any() else 1.0,
+        }
+
+    return _evaluar_validacion({
+        'muestras': len(textos),
+        'acuerdo_global': acuerdo_global,
+        'acuerdo_por_clase': por_clase,
+    })
+
+
+def _imprimir_validacion(modelo: str, validacion: Dict):
+    estado = "✅" if validacion['aprobada'] else "❌"
+    print(f"   {estado} Validación INT8 de {modelo}: acuerdo global "
+          f"{validacion['acuerdo_global']:.2%} (mínimo {validacion['minimo']:.2%}, "
+          f"{validacion['muestras']} reseñas)")
+    for nombre, clase in validacion['acuerdo_por_clase'].items():
+        marca = " ⚠️" if nombre in validacion['clases_bajo_minimo'] else ""
+        print(f"      • {nombre}: {clase['acuerdo']:.2%} (soporte {clase['soporte']}){marca}")
+
+
+def _cargar_fp32(modelo: str, tokenizer):
+    """Clasificador sin cuantizar con el backend configurado."""
+    if ConfigInferencia.BACKEND != 'onnx':
+        return ClasificadorPyTorch(modelo)
+
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError(
+            "INFERENCIA_BACKEND=onnx requiere onnxruntime. "
+            "Instala con: pip install onnxruntime"
+        )
+
+    ruta = exportar_onnx(modelo, tokenizer)
+    with open(ruta.parent / 'paridad.json', 'r', encoding='utf-8') as f:
+        paridad = json.load(f)
+    if not paridad['valida']:
+        print(f"   ⚠️  {modelo}: la exportación ONNX no supera la verificación de paridad "
+              f"({paridad['diferencia_maxima']:.2e}); usando PyTorch")
+        return ClasificadorPyTorch(modelo)
+
+    return ClasificadorONNX(modelo, ruta)
+
+
+def _cuantizar(modelo: str, clasificador):
+    """
+    Carga (o crea y guarda) la versión INT8 de un clasificador fp32:
+    quantize_dynamic de PyTorch sobre las capas Linear, o de ONNX Runtime
+    sobre el grafo exportado (según el tipo del clasificador, no del backend
+    configurado: si la paridad ONNX falla el fp32 se ejecuta con PyTorch).
+    """
+    onnx = isinstance(clasificador, ClasificadorONNX)
+    ruta = ruta_int8(modelo, onnx)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    if onnx:
+        if not ruta.exists():
+            temporal = ruta.with_name('model_int8.tmp.onnx')
+            quantize_dynamic(str(ruta_onnx(modelo)), str(temporal), weight_type=QuantType.QInt8)
+            os.replace(temporal, ruta)
+        return ClasificadorONNX(modelo, ruta)
+
+    if ruta.exists():
+        model = torch.load(ruta, weights_only=False)
+    else:
+        fp32 = AutoModelForSequenceClassification.from_pretrained(modelo)
+        fp32.eval()
+        model = torch.quantization.quantize_dynamic(fp32, {torch.nn.Linear}, dtype=torch.qint8)
+        temporal = ruta.with_name(ruta.name + '.tmp')
+        torch.save(model, temporal)
+        os.replace(temporal, ruta)
+    return ClasificadorPyTorch(modelo, model=model)
+
+
+def cargar_clasificador(modelo: str, tokenizer, max_length: int = 512,
+                        decidir: Optional[Callable] = None, nombres: Optional[List[str]] = None):
+    """
+    Carga un clasificador con el backend configurado (ConfigInferencia.BACKEND),
+    cuantizado a INT8 si ConfigInferencia.CUANTIZACION y la validación lo aprueba.
+
+    Args:
+        modelo: Nombre de HuggingFace o ruta local del modelo
+        tokenizer: Tokenizador del modelo (para exportar y validar)
+        max_length: Longitud máxima de los textos en la validación INT8
+        decidir: Función logits -> matriz booleana de etiquetas asignadas, para
+                 la validación INT8 (por defecto, la clase de mayor puntuación)
+        nombres: Nombre de cada clase en el reporte (por defecto, id2label del modelo)
+
+    Returns:
+        Objeto con .logits(input_ids, attention_mask) -> np.ndarray y .config
+    """
+    clasificador = _cargar_fp32(modelo, tokenizer)
+    if not ConfigInferencia.CUANTIZACION:
+        return clasificador
+
+    onnx = isinstance(clasificador, ClasificadorONNX)
+    validacion = _leer_validacion(modelo, onnx)
+    if validacion is not None and not _evaluar_validacion(validacion)['aprobada']:
+        print(f"   ⚠️  {modelo}: la cuantización INT8 no supera el acuerdo mínimo "
+              f"({ConfigInferencia.CUANTIZACION_MIN_ACUERDO:.2%}); usando fp32")
+        return clasificador
+
+    nuevo = not ruta_int8(modelo, onnx).exists()
+    cuantizado = _cuantizar(modelo, clasificador)
+    if validacion is None or nuevo:
+        config = clasificador.config
+        nombres = nombres or [config.id2label[i] for i in range(len(config.id2label))]
+        validacion = validar_cuantizacion(
+            clasificador, cuantizado, tokenizer, max_length, decidir or _decidir_argmax,
+            nombres, muestra_validacion(ConfigInferencia.CUANTIZACION_MUESTRAS)
+        )
+        validacion['modelo'] = identificador_modelo_local(modelo)
+        with open(ruta_int8(modelo, onnx).with_name('validacion_int8.json'), 'w', encoding='utf-8') as f:
+            json.dump(validacion, f, ensure_ascii=False, indent=2)
+        _imprimir_validacion(modelo, validacion)
+        if not validacion['aprobada']:
+            print("   ⚠️  Cuantización INT8 rechazada; usando el modelo fp32")
+            return clasificador
+
+    return cuantizado
@@ -0,0 +1,92 @@
+"""
+Batches por Longitud
+====================
+Inferencia por batches agrupados por longitud, compartida por las fases
+02, 03 y 04.
+
+Los textos se tokenizan una sola vez sin relleno, se ordenan por número de
+tokens y cada batch se rellena solo hasta su texto más largo: un título de
+cinco palabras ya no cuesta lo mismo que una reseña de 128 tokens. Las
+salidas se devuelven en el orden original de los textos.
+"""
+
+from typing import Callable, List
+
+import numpy as np
+from tqdm import tqdm
+
+from .metricas import medir_paso
+
+
+def orden_por_longitud(longitudes) -> np.ndarray:
+    """
+    Posiciones de los textos ordenadas de mayor a menor longitud (estable).
+    Los batches más largos van primero: si no caben en memoria, falla al inicio.
+    """
+    return np.argsort(-np.asarray(longitudes), kind='stable')
+
+
+def inferir_por_longitud(
+    textos: List[str],
+    tokenizer,
+    max_length: int,
+    batch_size: int,
+    inferir_batch: Callable,
+    progreso=None,
+    mostrar_progreso: bool = True
+) -> np.ndarray:
+    """
+    Ejecuta el modelo sobre los textos en batches agrupados por longitud.
+
+    Args:
+        textos: Textos a analizar
+        tokenizer: Tokenizador de HuggingFace del modelo
+        max_length: Número máximo de tokens por texto (se trunca)
+        batch_size: Textos por batch
+        inferir_batch: Función (input_ids, attention_mask) -> np.ndarray con
+                       la salida del modelo de cada texto del batch
+        progreso: ProgresoInferencia de la fase (opcional). El progreso se
+                  guarda en el orden por longitud, que es determinista para
+                  los mismos textos y tokenizador
+        mostrar_progreso: Mostrar barra de progreso
+
+    Returns:
+        np.ndarray (n_textos, n_salidas) en el orden original de los textos
+    """
+    if not textos:
+        return np.empty((0, 0), dtype=np.float32)
+
+    with medir_paso('tokenizacion'):
+        encoding = tokenizer(list(textos), max_length=max_length, truncation=True)
+        input_ids = encoding['input_ids']
+        orden = orden_por_longitud([len(ids) for ids in input_ids])
+
+    # Continuar después de los textos ya guardados en el progreso
+    hechos = progreso.filas if progreso is not None else 0
+    inicios = range(hechos, len(orden), batch_size)
+    if mostrar_progreso:
+        inicios = tqdm(inicios, desc="   Progreso")
+
+    salidas = []
+    for inicio in inicios:
+        posiciones = orden[inicio:inicio + batch_size]
+        with medir_paso('tokenizacion'):
+            # Relleno solo hasta el texto más largo del batch
+            batch = tokenizer.pad(
+                {'input_ids': [input_ids[i] for i in posiciones]},
+                padding='longest',
+                return_tensors='pt'
+            )
+        with medir_paso('inferencia', filas=len(posiciones)):
+            salida = np.asarray(inferir_batch(batch['input_ids'], batch['attention_mask']))
+        salidas.append(salida)
+        if progreso is not None:
+            progreso.agregar(salida)
+
+    nuevas = np.concatenate(salidas) if salidas else None
+    ordenadas = progreso.completar(nuevas) if progreso is not None else nuevas
+
+    # Restaurar el orden original
+    resultado = np.empty_like(ordenadas)
+    resultado[orden] = ordenadas
+    return resultado
@@ -0,0 +1,405 @@
+"""
+Caché de Embeddings
+===================
+Caché persistente de los embeddings de la Fase 05 entre ejecuciones.
+
+Cada entrada se identifica por (hash del texto normalizado, modelo de
+embeddings). Los vectores se guardan en float16 en un archivo de
+solo-agregar por modelo (<modelo>.f16) y un índice SQLite guarda la fila de
+cada texto y su último uso. Solo los textos que no están en la caché pasan
+por el modelo.
+
+Las filas sin referencia del índice (entradas expulsadas o escrituras
+interrumpidas) se recuperan con compactar(), que además aplica el tamaño
+máximo expulsando las entradas menos usadas:
+
+    python scripts/cache_embeddings.py --compactar
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import ConfigCacheEmbeddings
+from .almacen_dataset import bloqueo_archivo
+
+
+DTYPE = np.float16
+BYTES_VALOR = np.dtype(DTYPE).itemsize
+
+
+def normalizar(texto) -> str:
+    """Texto usado como clave y codificado por el modelo (espacios colapsados)."""
+    return ' '.join(str(texto).split())
+
+
+def _nombre_archivo(modelo: str) -> str:
+    """Archivo de vectores de un modelo (cada compactación usa uno nuevo)."""
+    legible = re.sub(r'[^A-Za-z0-9_.-]+', '_', modelo).strip('_')[-60:]
+    huella = hashlib.sha256(modelo.encode('utf-8')).hexdigest()[:8]
+    return f"{legible}-{huella}-{time.time_ns()}.f16"
+
+
+def _conectar(ruta: Path) -> sqlite3.Connection:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    conexion = sqlite3.connect(str(ruta), timeout=60)
+    conexion.execute('PRAGMA journal_mode=WAL')
+    with conexion:
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS vectores ('
+            'hash_texto TEXT NOT NULL, modelo TEXT NOT NULL, fila INTEGER NOT NULL, '
+            'ultimo_uso REAL NOT NULL, PRIMARY KEY (hash_texto, modelo))'
+        )
+        conexion.execute(
+            'CREATE INDEX IF NOT EXISTS idx_vectores_uso ON vectores (ultimo_uso)'
+        )
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS modelos ('
+            'modelo TEXT PRIMARY KEY, archivo TEXT NOT NULL, dimension INTEGER NOT NULL, '
+            'aciertos INTEGER NOT NULL DEFAULT 0, fallos INTEGER NOT NULL DEFAULT 0)'
+        )
+    return conexion
+
+
+class CacheEmbeddings:
+    """
+    Embeddings de un modelo. Se guardan en data/cache/embeddings/ (índice
+    compartido por todos los modelos).
+    """
+
+    NOMBRE_INDICE = 'indice.sqlite'
+
+    def __init__(self, modelo: str, directorio=None):
+        """
+        Args:
+            modelo: Nombre o ruta del modelo de embeddings
+            directorio: Directorio de la caché. Por defecto ConfigCacheEmbeddings.DIRECTORIO
+        """
+        self.modelo = modelo
+        self.directorio = Path(directorio or ConfigCacheEmbeddings.DIRECTORIO)
+        self.aciertos = 0
+        self.fallos = 0
+        self._conexion = _conectar(self.directorio / self.NOMBRE_INDICE)
+        self.dimension: Optional[int] = None
+        self.ruta_vectores = self.directorio / _nombre_archivo(modelo)
+        self._actualizar_archivo()
+
+    @classmethod
+    def crear(cls, modelo: str) -> Optional['CacheEmbeddings']:
+        """Retorna una caché si está habilitada en la configuración, o None."""
+        if not ConfigCacheEmbeddings.HABILITADA:
+            return None
+        try:
+            return cls(modelo)
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Caché de embeddings no disponible: {e}")
+            return None
+
+    @staticmethod
+    def _hash_texto(texto: str) -> str:
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def _actualizar_archivo(self):
+        """Archivo de vectores vigente del modelo (compactar() lo reemplaza)."""
+        fila = self._conexion.execute(
+            'SELECT archivo, dimension FROM modelos WHERE modelo = ?', (self.modelo,)
+        ).fetchone()
+        if fila:
+            self.ruta_vectores = self.directorio / fila[0]
+            self.dimension = fila[1]
+
+    def _bloqueo(self):
+        # Las escrituras agregan filas al archivo y al índice en el mismo orden
+        return bloqueo_archivo(self.directorio / (self.NOMBRE_INDICE + '.lock'))
+
+    def _leer_vectores(self) -> Optional[np.ndarray]:
+        """Archivo de vectores del modelo mapeado en memoria (solo lectura)."""
+        if self.dimension is None or not self.ruta_vectores.exists():
+            return None
+        filas = self.ruta_vectores.stat().st_size // (self.dimension * BYTES_VALOR)
+        if filas == 0:
+            return None
+        return np.memmap(self.ruta_vectores, dtype=DTYPE, mode='r', shape=(filas, self.dimension))
+
+    # ========== CONSULTA / ESCRITURA ==========
+
+    def obtener(self, textos: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Busca en la caché los textos (ya normalizados).
+
+        Returns:
+            {texto: vector float16} de los textos encontrados
+        """
+        self._actualizar_archivo()
+        hashes = {self._hash_texto(t): t for t in textos}
+        filas = {}
+        claves = list(hashes)
+        # Consultar en bloques (límite de parámetros de SQLite)
+        for inicio in range(0, len(claves), 500):
+            bloque = claves[inicio:inicio + 500]
+            marcas = ','.join('?' * len(bloque))
+            filas.update(self._conexion.execute(
+                f'SELECT hash_texto, fila FROM vectores WHERE modelo = ? AND hash_texto IN ({marcas})',
+                [self.modelo, *bloque]
+            ).fetchall())
+
+        vectores = self._leer_vectores()
+        if vectores is None:
+            return {}
+        filas = {h: f for h, f in filas.items() if f < len(vectores)}
+        if not filas:
+            return {}
+
+        hashes_encontrados = list(filas)
+        posiciones = np.array([filas[h] for h in hashes_encontrados], dtype=np.int64)
+        # Lectura en orden de archivo (acceso secuencial al disco)
+        orden = np.argsort(posiciones, kind='stable')
+        valores = np.empty((len(posiciones), self.dimension), dtype=DTYPE)
+        valores[orden] = vectores[posiciones[orden]]
+
+        # Registrar el uso para la expulsión al compactar
+        ahora = time.time()
+        with self._conexion:
+            self._conexion.executemany(
+                'UPDATE vectores SET ultimo_uso = ? WHERE hash_texto = ? AND modelo = ?',
+                [(ahora, h, self.modelo) for h in hashes_encontrados]
+            )
+        return {hashes[h]: valores[i] for i, h in enumerate(hashes_encontrados)}
+
+    def agregar(self, textos: List[str], vectores: np.ndarray):
+        """
+        Agrega vectores al final del archivo del modelo y los registra en el índice.
+
+        Args:
+            textos: Textos (ya normalizados)
+            vectores: Array (n_textos, dimensión)
+        """
+        vectores = np.ascontiguousarray(vectores, dtype=DTYPE)
+        if not len(textos):
+            return
+        with self._bloqueo():
+            self._actualizar_archivo()
+            if self.dimension is None:
+                self.dimension = int(vectores.shape[1])
+                with self._conexion:
+                    self._conexion.execute(
+                        'INSERT OR IGNORE INTO modelos (modelo, archivo, dimension) VALUES (?, ?, ?)',
+                        (self.modelo, self.ruta_vectores.name, self.dimension)
+                    )
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            # Primero los datos y después el índice: una escritura interrumpida
+            # solo deja filas sin referencia (se recuperan al compactar)
+            with open(self.ruta_vectores, 'ab') as f:
+                inicio = f.tell() // (self.dimension * BYTES_VALOR)
+                f.write(vectores.tobytes())
+            ahora = time.time()
+            with self._conexion:
+                self._conexion.executemany(
+                    'INSERT OR REPLACE INTO vectores (hash_texto, modelo, fila, ultimo_uso) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(self._hash_texto(t), self.modelo, inicio + i, ahora) for i, t in enumerate(textos)]
+                )
+
+    def embeddings(self, textos: List[str], funcion_embeddings: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Obtiene el embedding de cada texto, ejecutando el modelo solo para
+        los textos que no están en la caché.
+
+        Args:
+            textos: Textos a codificar
+            funcion_embeddings: Recibe los textos faltantes (normalizados) y
+                                retorna un array (n_textos, dimensión)
+
+        Returns:
+            Array float16 (n_textos, dimensión) en el orden de 'textos'
+        """
+        normalizados = [normalizar(t) for t in textos]
+        unicos = list(dict.fromkeys(normalizados))
+        encontrados = self.obtener(unicos)
+        faltantes = [t for t in unicos if t not in encontrados]
+        aciertos = sum(t in encontrados for t in normalizados)
+        self.aciertos += aciertos
+        self.fallos += len(normalizados) - aciertos
+
+        if faltantes:
+            nuevos = np.asarray(funcion_embeddings(faltantes), dtype=DTYPE)
+            self.agregar(faltantes, nuevos)
+            encontrados.update(zip(faltantes, nuevos))
+
+        if not normalizados:
+            return np.empty((0, self.dimension or 0), dtype=DTYPE)
+        return np.vstack([encontrados[t] for t in normalizados])
+
+    # ========== ESTADÍSTICAS ==========
+
+    def cerrar(self):
+        """Registra los contadores acumulados y cierra la conexión."""
+        with self._conexion:
+            self._conexion.execute(
+                'UPDATE modelos SET aciertos = aciertos + ?, fallos = fallos + ? WHERE modelo = ?',
+                (self.aciertos, self.fallos, self.modelo)
+            )
+        self._conexion.close()
+
+    def imprimir_resumen(self):
+        """Muestra los aciertos y fallos de la caché y la cierra."""
+        consultas = self.aciertos + self.fallos
+        tasa = self.aciertos / consultas if consultas else 0.0
+        tamano_mb = tamano_total(self.directorio) / (1024 * 1024)
+        print(f"   • Caché de embeddings: {self.aciertos} aciertos | "
+              f"{self.fallos} fallos ({tasa:.0%}) | {tamano_mb:.1f} MB")
+        if tamano_mb > ConfigCacheEmbeddings.MAX_MB:
+            print(f"   ⚠️  La caché de embeddings supera {ConfigCacheEmbeddings.MAX_MB:.0f} MB: "
+                  "python scripts/cache_embeddings.py --compactar")
+        self.cerrar()
+
+
+# ========== MANTENIMIENTO ==========
+
+def tamano_total(directorio=None) -> int:
+    """Bytes ocupados por la caché (vectores e índice)."""
+    directorio = Path(directorio or ConfigCacheEmbeddings.DIRECTORIO)
+    if not directorio.exists():
+        return 0
+    return sum(ruta.stat().st_size for ruta in directorio.iterdir() if ruta.is_file())
+
+
+def informe(directorio=None) -> List[Dict]:
+    """
+    Tamaño de la caché por modelo.
+
+    Returns:
+        Lista de {modelo, dimension, entradas, filas_archivo, sin_referencia,
+        tamano_mb, aciertos, fallos}
+    """
+    directorio = Path(directorio or ConfigCacheEmbeddings.DIRECTORIO)
+    if not (directorio / CacheEmbeddings.NOMBRE_INDICE).exists():
+        return []
+    conexion = _conectar(directorio / CacheEmbeddings.NOMBRE_INDICE)
+    try:
+        resultado = []
+        for modelo, archivo, dimension, aciertos, fallos in conexion.execute(
+            'SELECT modelo, archivo, dimension, aciertos, fallos FROM modelos ORDER BY modelo'
+        ).fetchall():
+            entradas = conexion.execute(
+                'SELECT COUNT(*) FROM vectores WHERE modelo = ?', (modelo,)
+            ).fetchone()[0]
+            ruta = directorio / archivo
+            tamano = ruta.stat().st_size if ruta.exists() else 0
+            filas = tamano // (dimension * BYTES_VALOR)
+            resultado.append({
+                'modelo': modelo,
+                'dimension': dimension,
+                'entradas': entradas,
+                'filas_archivo': filas,
+                'sin_referencia': max(0, filas - entradas),
+                'tamano_mb': tamano / (1024 * 1024),
+                'aciertos': aciertos,
+                'fallos': fallos,
+            })
+        return resultado
+    finally:
+        conexion.close()
+
+
+def compactar(directorio=None, max_mb: Optional[float] = None, dias_sin_uso: Optional[float] = None) -> Dict:
+    """
+    Reescribe los archivos de vectores solo con las entradas vigentes.
+
+    Args:
+        directorio: Directorio de la caché
+        max_mb: Tamaño máximo de los vectores; se expulsan las entradas menos
+                usadas (de todos los modelos). Por defecto ConfigCacheEmbeddings.MAX_MB
+        dias_sin_uso: Expulsar además las entradas no usadas en estos días
+
+    Returns:
+        {'entradas_expulsadas', 'mb_antes', 'mb_despues'}
+    """
+    directorio = Path(directorio or ConfigCacheEmbeddings.DIRECTORIO)
+    max_bytes = int((max_mb if max_mb is not None else ConfigCacheEmbeddings.MAX_MB) * 1024 * 1024)
+    ruta_indice = directorio / CacheEmbeddings.NOMBRE_INDICE
+    if not ruta_indice.exists():
+        return {'entradas_expulsadas': 0, 'mb_antes': 0.0, 'mb_despues': 0.0}
+
+    antes = tamano_total(directorio)
+    with bloqueo_archivo(directorio / (CacheEmbeddings.NOMBRE_INDICE + '.lock')):
+        conexion = _conectar(ruta_indice)
+        try:
+            modelos = {
+                modelo: (archivo, dimension)
+                for modelo, archivo, dimension in conexion.execute(
+                    'SELECT modelo, archivo, dimension FROM modelos'
+                ).fetchall()
+            }
+
+            # Entradas a expulsar: sin uso reciente y, después, las menos usadas
+            # hasta quedar bajo el tamaño máximo
+            expulsar = []
+            if dias_sin_uso is not None:
+                limite = time.time() - dias_sin_uso * 86400
+                expulsar += [r for (r,) in conexion.execute(
+                    'SELECT rowid FROM vectores WHERE ultimo_uso < ?', (limite,)
+                )]
+            descartadas = set(expulsar)
+            total = 0
+            for rowid, modelo in conexion.execute(
+                'SELECT rowid, modelo FROM vectores ORDER BY ultimo_uso DESC'
+            ):
+                if rowid in descartadas or modelo not in modelos:
+                    continue
+                total += modelos[modelo][1] * BYTES_VALOR
+                if total > max_bytes:
+                    expulsar.append(rowid)
+            with conexion:
+                conexion.executemany('DELETE FROM vectores WHERE rowid = ?', [(r,) for r in expulsar])
+
+            # Reescribir cada modelo en un archivo nuevo con las filas vigentes
+            # (en orden de archivo). El índice apunta al archivo nuevo en la
+            # misma transacción que las filas: si se interrumpe, el archivo
+            # anterior sigue siendo válido
+            for modelo, (archivo, dimension) in modelos.items():
+                ruta = directorio / archivo
+                filas = ruta.stat().st_size // (dimension * BYTES_VALOR) if ruta.exists() else 0
+                entradas = conexion.execute(
+                    'SELECT rowid, fila FROM vectores WHERE modelo = ? ORDER BY fila', (modelo,)
+                ).fetchall()
+                validas = [(rowid, fila) for rowid, fila in entradas if fila < filas]
+                invalidas = [(rowid,) for rowid, fila in entradas if fila >= filas]
+
+                nuevo = directorio / _nombre_archivo(modelo)
+                with open(nuevo, 'wb') as f:
+                    if validas:
+                        vectores = np.memmap(ruta, dtype=DTYPE, mode='r', shape=(filas, dimension))
+                        for inicio in range(0, len(validas), 10000):
+                            bloque = [fila for _, fila in validas[inicio:inicio + 10000]]
+                            f.write(np.ascontiguousarray(vectores[bloque]).tobytes())
+                        del vectores
+                with conexion:
+                    conexion.executemany('DELETE FROM vectores WHERE rowid = ?', invalidas)
+                    conexion.executemany(
+                        'UPDATE vectores SET fila = ? WHERE rowid = ?',
+                        [(nueva, rowid) for nueva, (rowid, _) in enumerate(validas)]
+                    )
+                    conexion.execute('UPDATE modelos SET archivo = ? WHERE modelo = ?', (nuevo.name, modelo))
+                modelos[modelo] = (nuevo.name, dimension)
+
+            # Archivos sin referencia (compactaciones anteriores o interrumpidas)
+            vigentes = {archivo for archivo, _ in modelos.values()}
+            for ruta in directorio.glob('*.f16'):
+                if ruta.name not in vigentes:
+                    ruta.unlink()
+
+            conexion.execute('VACUUM')
+        finally:
+            conexion.close()
+
+    return {
+        'entradas_expulsadas': len(expulsar),
+        'mb_antes': antes / (1024 * 1024),
+        'mb_despues': tamano_total(directorio) / (1024 * 1024),
+    }
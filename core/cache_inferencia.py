@@ -0,0 +1,321 @@
+"""
+Caché de Inferencia
+===================
+Caché persistente (SQLite) de las salidas crudas de los modelos BERT de las
+fases 02, 03 y 04.
+
+Cada entrada se identifica por (hash del texto, identificador del modelo,
+max_length) y guarda el vector de salida del modelo (float32): probabilidades
+de sentimiento, logits de subjetividad o probabilidades de categorías. Así los
+textos repetidos o re-ingestados, y las re-ejecuciones con forzar=True, no
+vuelven a pasar por el modelo.
+
+- Tamaño máximo configurable con expulsión de las entradas menos usadas (LRU).
+  Se mide sobre el tamaño real de la base (páginas de SQLite, incluidos
+  hash, modelo e índices de cada entrada) y las páginas liberadas se
+  devuelven al disco (auto_vacuum incremental)
+- Contadores de aciertos y fallos por modelo
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config import ConfigCacheInferencia
+
+
+def identificador_modelo_local(ruta_modelo) -> str:
+    """
+    Identificador de un modelo guardado en disco.
+
+    Incluye tamaño y fecha de los archivos del modelo para que un modelo
+    re-entrenado en la misma ruta no reutilice resultados anteriores.
+    """
+    ruta = Path(ruta_modelo)
+    h = hashlib.sha256()
+    if ruta.is_dir():
+        for archivo in sorted(ruta.iterdir()):
+            if archivo.is_file():
+                stat = archivo.stat()
+                h.update(f'{archivo.name}:{stat.st_size}:{stat.st_mtime_ns};'.encode('utf-8'))
+    return f'{ruta}#{h.hexdigest()[:12]}'
+
+
+def inferir_con_cache(
+    modelo: str,
+    max_length: int,
+    textos: List[str],
+    funcion_inferencia: Callable[[List[str]], np.ndarray]
+) -> np.ndarray:
+    """
+    Ejecuta la inferencia de una fase a través de la caché (si está habilitada).
+
+    Args:
+        modelo: Identificador del modelo
+        max_length: Longitud máxima de los textos
+        textos: Textos a analizar
+        funcion_inferencia: Recibe textos y retorna la salida cruda del modelo
+
+    Returns:
+        Array (n_textos, n_salidas) en el orden de 'textos'
+    """
+    cache = CacheInferencia.crear(modelo, max_length)
+    if cache is None:
+        return np.asarray(funcion_inferencia(textos), dtype=np.float32)
+
+    try:
+        return cache.inferir(textos, funcion_inferencia)
+    finally:
+        cache.imprimir_resumen()
+
+
+class CacheInferencia:
+    """
+    Caché de salidas de un modelo para un max_length dado.
+    Se guarda en data/cache/inferencia.sqlite (compartido por las fases).
+    """
+
+    # Al superar el límite se expulsa hasta quedar en esta fracción del máximo
+    FRACCION_TRAS_EXPULSION = 0.9
+
+    def __init__(self, modelo: str, max_length: int, ruta=None, max_mb: Optional[float] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            modelo: Identificador del modelo
+            max_length: Longitud máxima usada al tokenizar (o truncar) el texto
+            ruta: Archivo SQLite. Por defecto ConfigCacheInferencia.RUTA
+            max_mb: Tamaño máximo en MB. Por defecto ConfigCacheInferencia.MAX_MB
+        """
+        self.modelo = modelo
+        self.max_length = int(max_length)
+        self.ruta = Path(ruta or ConfigCacheInferencia.RUTA)
+        self.max_bytes = int((max_mb if max_mb is not None else ConfigCacheInferencia.MAX_MB) * 1024 * 1024)
+
+        self.aciertos = 0
+        self.fallos = 0
+
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conexion = sqlite3.connect(str(self.ruta), timeout=60)
+        self._activar_auto_vacuum()
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._crear_tablas()
+
+    @classmethod
+    def crear(cls, modelo: str, max_length: int) -> Optional['CacheInferencia']:
+        """Retorna una caché si está habilitada en la configuración, o None."""
+        if not ConfigCacheInferencia.HABILITADA:
+            return None
+        try:
+            return cls(modelo, max_length)
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Caché de inferencia no disponible: {e}")
+            return None
+
+    # ========== CONSULTA / ESCRITURA ==========
+
+    def obtener(self, textos: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Busca en la caché la salida de cada texto.
+
+        Returns:
+            Lista con el vector de salida de cada texto, o None si no está
+        """
+        hashes = [self._hash_texto(t) for t in textos]
+        encontrados = {}
+
+        # Consultar en bloques (límite de parámetros de SQLite)
+        unicos = list(dict.fromkeys(hashes))
+        for inicio in range(0, len(unicos), 500):
+            bloque = unicos[inicio:inicio + 500]
+            marcas = ','.join('?' * len(bloque))
+            filas = self._conexion.execute(
+                f'SELECT hash_texto, valor FROM resultados '
+                f'WHERE modelo = ? AND max_length = ? AND hash_texto IN ({marcas})',
+                [self.modelo, self.max_length, *bloque]
+            ).fetchall()
+            for hash_texto, valor in filas:
+                encontrados[hash_texto] = np.frombuffer(valor, dtype=np.float32)
+
+        resultados = [encontrados.get(h) for h in hashes]
+        aciertos = sum(r is not None for r in resultados)
+        self.aciertos += aciertos
+        self.fallos += len(resultados) - aciertos
+
+        # Registrar el uso para la expulsión LRU
+        if encontrados:
+            ahora = time.time()
+            with self._conexion:
+                self._conexion.executemany(
+                    'UPDATE resultados SET ultimo_uso = ? '
+                    'WHERE hash_texto = ? AND modelo = ? AND max_length = ?',
+                    [(ahora, h, self.modelo, self.max_length) for h in encontrados]
+                )
+
+        return resultados
+
+    def guardar(self, textos: List[str], valores: np.ndarray):
+        """
+        Guarda la salida del modelo para cada texto.
+
+        Args:
+            textos: Textos analizados
+            valores: Array (n_textos, n_salidas) con la salida cruda del modelo
+        """
+        ahora = time.time()
+        filas = []
+        for texto, valor in zip(textos, valores):
+            valor = np.asarray(valor, dtype=np.float32)
+            if not np.isfinite(valor).all():
+                continue  # Inferencia fallida: no se guarda
+            datos = valor.tobytes()
+            filas.append((self._hash_texto(texto), self.modelo, self.max_length, datos, len(datos), ahora))
+
+        with self._conexion:
+            self._conexion.executemany(
+                'INSERT OR REPLACE INTO resultados '
+                '(hash_texto, modelo, max_length, valor, tamano, ultimo_uso) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                filas
+            )
+
+        self._aplicar_limite()
+
+    def inferir(self, textos: List[str], funcion_inferencia: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Obtiene la salida de cada texto, ejecutando el modelo solo para los
+        textos que no están en la caché.
+
+        Args:
+            textos: Textos a analizar
+            funcion_inferencia: Recibe los textos faltantes y retorna un array
+                                (n_textos, n_salidas) con la salida del modelo
+
+        Returns:
+            Array (n_textos, n_salidas) en el orden de 'textos'
+        """
+        en_cache = self.obtener(textos)
+        faltantes = [i for i, valor in enumerate(en_cache) if valor is None]
+
+        if faltantes:
+            # Textos repetidos dentro del lote se infieren una sola vez
+            textos_faltantes = list(dict.fromkeys(textos[i] for i in faltantes))
+            nuevos = np.asarray(funcion_inferencia(textos_faltantes), dtype=np.float32)
+            self.guardar(textos_faltantes, nuevos)
+            por_texto = dict(zip(textos_faltantes, nuevos))
+            for i in faltantes:
+                en_cache[i] = por_texto[textos[i]]
+
+        if not en_cache:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(en_cache)
+
+    # ========== ESTADÍSTICAS ==========
+
+    def estadisticas(self) -> dict:
+        """Aciertos y fallos de esta ejecución, y tamaño total de la caché."""
+        consultas = self.aciertos + self.fallos
+        entradas = self._conexion.execute('SELECT COUNT(*) FROM resultados').fetchone()[0]
+        tamano = self._tamano_bytes()
+        return {
+            'modelo': self.modelo,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'entradas': entradas,
+            'tamano_mb': tamano / (1024 * 1024),
+        }
+
+    def cerrar(self):
+        """Registra los contadores acumulados y cierra la conexión."""
+        with self._conexion:
+            self._conexion.execute(
+                'INSERT INTO contadores (modelo, aciertos, fallos) VALUES (?, ?, ?) '
+                'ON CONFLICT(modelo) DO UPDATE SET '
+                'aciertos = aciertos + excluded.aciertos, fallos = fallos + excluded.fallos',
+                (self.modelo, self.aciertos, self.fallos)
+            )
+        self._conexion.close()
+
+    def imprimir_resumen(self):
+        """Muestra los aciertos y fallos de la caché y la cierra."""
+        stats = self.estadisticas()
+        print(f"   • Caché de inferencia: {stats['aciertos']} aciertos | "
+              f"{stats['fallos']} fallos ({stats['tasa_aciertos']:.0%}) | "
+              f"{stats['tamano_mb']:.1f} MB")
+        self.cerrar()
+
+    # ========== INTERNOS ==========
+
+    def _activar_auto_vacuum(self):
+        """
+        Activa auto_vacuum incremental: las páginas de las entradas
+        expulsadas se devuelven al disco con incremental_vacuum. Una caché
+        creada sin él se convierte una vez con VACUUM.
+        """
+        if self._conexion.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return
+        self._conexion.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        existe = self._conexion.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'resultados'"
+        ).fetchone()[0]
+        if existe:
+            self._conexion.execute('VACUUM')
+
+    def _tamano_bytes(self) -> int:
+        """Tamaño real de la base (páginas en uso y libres), sin recorrer la tabla."""
+        paginas = self._conexion.execute('PRAGMA page_count').fetchone()[0]
+        return paginas * self._conexion.execute('PRAGMA page_size').fetchone()[0]
+
+    def _crear_tablas(self):
+        with self._conexion:
+            self._conexion.execute(
+                'CREATE TABLE IF NOT EXISTS resultados ('
+                'hash_texto TEXT NOT NULL, modelo TEXT NOT NULL, max_length INTEGER NOT NULL, '
+                'valor BLOB NOT NULL, tamano INTEGER NOT NULL, ultimo_uso REAL NOT NULL, '
+                'PRIMARY KEY (hash_texto, modelo, max_length))'
+            )
+            self._conexion.execute(
+                'CREATE INDEX IF NOT EXISTS idx_resultados_uso ON resultados (ultimo_uso)'
+            )
+            self._conexion.execute(
+                'CREATE TABLE IF NOT EXISTS contadores ('
+                'modelo TEXT PRIMARY KEY, aciertos INTEGER NOT NULL, fallos INTEGER NOT NULL)'
+            )
+
+    @staticmethod
+    def _hash_texto(texto) -> str:
+        return hashlib.sha256(str(texto).encode('utf-8')).hexdigest()
+
+    def _aplicar_limite(self):
+        """
+        Expulsa las entradas menos usadas si la base supera el tamaño máximo.
+
+        El tamaño se lee del número de páginas (constante, sin SUM sobre la
+        tabla). Las entradas a expulsar se estiman con el tamaño medio por
+        entrada en disco. Como las claves son hashes, las entradas expulsadas
+        quedan repartidas por las páginas del índice: si incremental_vacuum
+        no alcanza para bajar del objetivo, la base se compacta con VACUUM.
+        """
+        total = self._tamano_bytes()
+        if total <= self.max_bytes:
+            return
+
+        objetivo = int(self.max_bytes * self.FRACCION_TRAS_EXPULSION)
+        entradas = self._conexion.execute('SELECT COUNT(*) FROM resultados').fetchone()[0]
+        expulsar = int(np.ceil(entradas * (total - objetivo) / total))
+        with self._conexion:
+            self._conexion.execute(
+                'DELETE FROM resultados WHERE rowid IN '
+                '(SELECT rowid FROM resultados ORDER BY ultimo_uso ASC LIMIT ?)',
+                (expulsar,)
+            )
+        self._conexion.execute('PRAGMA incremental_vacuum')
+        if self._tamano_bytes() > objetivo:
+            self._conexion.execute('VACUUM')
+        self._conexion.execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -0,0 +1,176 @@
+"""
+Categorías Multi-etiqueta
+=========================
+Representación compacta de las categorías de cada opinión (Fase 04).
+
+Las categorías se guardan como una máscara de bits en la columna
+'CategoriasMascara' (uint16): el bit i indica la categoría CATEGORIAS[i].
+La columna 'Categorias' se conserva como texto legible (lista serializada)
+para el CSV exportado, pero ninguna fase la vuelve a parsear: pertenencia,
+conteos y explode son operaciones vectorizadas sobre la máscara.
+
+Los datasets generados antes de la máscara se convierten desde el texto
+(cada valor distinto se parsea una sola vez).
+"""
+
+import ast
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Orden de las salidas del modelo de la Fase 04 (y de los bits de la máscara)
+CATEGORIAS = [
+    'Alojamiento',
+    'Gastronomía',
+    'Transporte',
+    'Eventos y festivales',
+    'Historia y cultura',
+    'Compras',
+    'Deportes y aventura',
+    'Vida nocturna',
+    'Naturaleza',
+    'Personal y servicio',
+    'Seguridad',
+    'Fauna y vida animal'
+]
+
+COLUMNA_TEXTO = 'Categorias'
+COLUMNA_MASCARA = 'CategoriasMascara'
+
+_BITS = (1 << np.arange(len(CATEGORIAS))).astype(np.uint16)
+_POSICION = {categoria: i for i, categoria in enumerate(CATEGORIAS)}
+
+
+def bit(categoria: str) -> int:
+    """Bit de una categoría en la máscara."""
+    return int(_BITS[_POSICION[categoria]])
+
+
+def desde_activas(activas) -> np.ndarray:
+    """
+    Máscaras a partir de una matriz booleana (n, len(CATEGORIAS)), por
+    ejemplo probabilidades > thresholds.
+    """
+    activas = np.asarray(activas, dtype=bool).reshape(-1, len(CATEGORIAS))
+    return (activas * _BITS).sum(axis=1).astype(np.uint16)
+
+
+def activas(mascaras) -> np.ndarray:
+    """Matriz booleana (n, len(CATEGORIAS)) de las máscaras."""
+    return (np.asarray(mascaras, dtype=np.uint16)[:, None] & _BITS) != 0
+
+
+def _parsear(texto) -> int:
+    """Máscara de un valor de texto ("['A', 'B']" o "A, B")."""
+    texto = str(texto).strip()
+    try:
+        nombres = ast.literal_eval(texto) if texto.startswith('[') else texto.split(',')
+    except (ValueError, SyntaxError):
+        nombres = texto.strip('[]').replace("'", '').replace('"', '').split(',')
+    mascara = 0
+    for nombre in nombres:
+        posicion = _POSICION.get(str(nombre).strip())
+        if posicion is not None:
+            mascara |= int(_BITS[posicion])
+    return mascara
+
+
+def desde_texto(textos) -> np.ndarray:
+    """Máscaras a partir de la columna de texto (vacíos y nulos = sin categorías)."""
+    codigos, valores = pd.factorize(pd.Series(textos, dtype=object))
+    unicas = np.array([_parsear(valor) for valor in valores], dtype=np.uint16)
+    mascaras = np.zeros(len(codigos), dtype=np.uint16)
+    validos = codigos >= 0
+    mascaras[validos] = unicas[codigos[validos]]
+    return mascaras
+
+
+def a_texto(mascaras) -> np.ndarray:
+    """Texto de la columna 'Categorias' (lista serializada) de cada máscara."""
+    mascaras = np.asarray(mascaras, dtype=np.uint16)
+    unicas, inversa = np.unique(mascaras, return_inverse=True)
+    textos = np.array(
+        [str([CATEGORIAS[i] for i in np.flatnonzero(fila)]) for fila in activas(unicas)],
+        dtype=object
+    )
+    return textos[inversa.reshape(-1)]
+
+
+def mascaras(df: pd.DataFrame) -> np.ndarray:
+    """
+    Máscara de cada fila de un DataFrame: usa 'CategoriasMascara' y, si no
+    existe o tiene filas vacías, las obtiene del texto de 'Categorias'.
+    """
+    if COLUMNA_MASCARA in df.columns:
+        valores = pd.to_numeric(df[COLUMNA_MASCARA], errors='coerce')
+        faltantes = valores.isna().to_numpy()
+        resultado = valores.fillna(0).to_numpy(dtype=np.uint16)
+        if faltantes.any() and COLUMNA_TEXTO in df.columns:
+            resultado[faltantes] = desde_texto(df[COLUMNA_TEXTO].to_numpy()[faltantes])
+        return resultado
+    if COLUMNA_TEXTO in df.columns:
+        return desde_texto(df[COLUMNA_TEXTO].to_numpy())
+    raise KeyError(f"El dataset no tiene '{COLUMNA_MASCARA}' ni '{COLUMNA_TEXTO}'")
+
+
+def contiene(mascaras, categoria: str) -> np.ndarray:
+    """Filas que pertenecen a una categoría (array booleano)."""
+    return (np.asarray(mascaras, dtype=np.uint16) & bit(categoria)) != 0
+
+
+def posiciones_por_categoria(mascaras) -> Dict[str, np.ndarray]:
+    """
+    Posiciones de las filas de cada categoría presente, en una sola pasada
+    sobre la máscara (en el orden de CATEGORIAS; filas en orden creciente).
+    """
+    filas, columnas = np.nonzero(activas(mascaras))
+    orden = np.argsort(columnas, kind='stable')
+    presentes_, inicios = np.unique(columnas[orden], return_index=True)
+    grupos = np.split(filas[orden], inicios[1:])
+    return {CATEGORIAS[i]: grupo for i, grupo in zip(presentes_, grupos)}
+
+
+def conteos(mascaras) -> pd.Series:
+    """Opiniones por categoría (solo las presentes), de mayor a menor."""
+    totales = pd.Series(activas(mascaras).sum(axis=0), index=CATEGORIAS)
+    return totales[totales > 0].sort_values(ascending=False, kind='stable')
+
+
+def presentes(mascaras) -> List[str]:
+    """Categorías con al menos una opinión, en el orden de CATEGORIAS."""
+    union = np.bitwise_or.reduce(np.asarray(mascaras, dtype=np.uint16)) if len(mascaras) else 0
+    return [categoria for i, categoria in enumerate(CATEGORIAS) if union & _BITS[i]]
+
+
+def explotar(df: pd.DataFrame, columnas: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Una fila por cada par (opinión, categoría).
+
+    Args:
+        df: DataFrame con las categorías
+        columnas: Columnas de df a conservar (por defecto ninguna)
+
+    Returns:
+        DataFrame con las columnas indicadas y 'Categoria'; el índice repite
+        el de la opinión original
+    """
+    filas, posiciones = np.nonzero(activas(mascaras(df)))
+    resultado = df.iloc[filas][list(columnas or [])].copy()
+    resultado['Categoria'] = np.asarray(CATEGORIAS, dtype=object)[posiciones]
+    return resultado
+
+
+def tabla_por_categoria(df: pd.DataFrame, columna: str, valores: List[str]) -> pd.DataFrame:
+    """
+    Cuenta las opiniones de cada categoría según los valores de otra columna
+    (por ejemplo, Sentimiento por categoría).
+
+    Returns:
+        DataFrame (categorías presentes × valores) con los conteos
+    """
+    explotado = explotar(df, [columna])
+    tabla = pd.crosstab(explotado['Categoria'].to_numpy(), explotado[columna].to_numpy())
+    tabla.index.name, tabla.columns.name = 'Categoria', columna
+    return tabla.reindex(columns=valores, fill_value=0).astype(int)
@@ -0,0 +1,98 @@
+"""
+Conjunto de Hashes en Disco
+===========================
+Conjunto de hashes de 64 bits guardado en un archivo SQLite temporal, para
+detectar filas repetidas entre lotes sin mantener un hash por fila del
+dataset en memoria (modo por lotes de la Fase 01).
+
+La memoria queda acotada por el tamaño del lote y la caché de páginas de
+SQLite; el archivo se elimina al cerrar el conjunto.
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+class ConjuntoHashes:
+    """Hashes ya vistos (ver docstring del módulo)."""
+
+    # Caché de páginas de SQLite (KB)
+    CACHE_KB = 16 * 1024
+
+    def __init__(self, directorio=None):
+        """
+        Args:
+            directorio: Carpeta del archivo temporal (por defecto, la del sistema)
+        """
+        if directorio is not None:
+            Path(directorio).mkdir(parents=True, exist_ok=True)
+        descriptor, self.ruta = tempfile.mkstemp(prefix='hashes_', suffix='.sqlite', dir=directorio)
+        os.close(descriptor)
+        self._conexion = sqlite3.connect(self.ruta)
+        self._conexion.execute('PRAGMA journal_mode=OFF')
+        self._conexion.execute('PRAGMA synchronous=OFF')
+        self._conexion.execute(f'PRAGMA cache_size=-{self.CACHE_KB}')
+        self._conexion.execute('CREATE TABLE hashes (valor INTEGER PRIMARY KEY)')
+        self._conexion.execute('CREATE TEMP TABLE lote (valor INTEGER PRIMARY KEY)')
+
+    def __enter__(self) -> 'ConjuntoHashes':
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    @staticmethod
+    def _enteros(hashes) -> np.ndarray:
+        """Hashes como enteros de 64 bits con signo (tipo INTEGER de SQLite)."""
+        return np.asarray(hashes, dtype=np.uint64).view(np.int64)
+
+    @staticmethod
+    def desde_hex(textos) -> np.ndarray:
+        """Hashes hexadecimales de hasta 16 caracteres (ej. IdResena) como uint64."""
+        return np.array([int(texto, 16) for texto in textos], dtype=np.uint64)
+
+    def agregar(self, hashes):
+        """Agrega hashes al conjunto."""
+        with self._conexion:
+            self._conexion.executemany(
+                'INSERT OR IGNORE INTO hashes VALUES (?)',
+                ((int(v),) for v in self._enteros(hashes))
+            )
+
+    def agregar_nuevos(self, hashes) -> np.ndarray:
+        """
+        Agrega los hashes y marca cuáles no se habían visto.
+
+        Returns:
+            Array booleano: True en la primera aparición de cada hash que no
+            estaba en el conjunto
+        """
+        valores = self._enteros(hashes)
+        primeras = np.zeros(len(valores), dtype=bool)
+        primeras[np.unique(valores, return_index=True)[1]] = True
+
+        with self._conexion:
+            self._conexion.execute('DELETE FROM lote')
+            self._conexion.executemany(
+                'INSERT OR IGNORE INTO lote VALUES (?)', ((int(v),) for v in valores)
+            )
+            nuevos = np.fromiter(
+                (v for (v,) in self._conexion.execute(
+                    'SELECT valor FROM lote WHERE valor NOT IN (SELECT valor FROM hashes)'
+                )),
+                dtype=np.int64
+            )
+            self._conexion.execute('INSERT OR IGNORE INTO hashes SELECT valor FROM lote')
+
+        return primeras & np.isin(valores, nuevos)
+
+    def cerrar(self):
+        """Cierra la conexión y elimina el archivo temporal."""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+            Path(self.ruta).unlink(missing_ok=True)
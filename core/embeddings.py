@@ -0,0 +1,185 @@
+"""
+Embeddings del Dataset
+======================
+Etapa de embeddings de la Fase 05, compartida por todas las categorías.
+
+El modelo de embeddings se carga una sola vez y cada texto distinto del
+dataset se codifica una sola vez (una reseña con varias categorías ya no se
+vuelve a codificar en cada una). Los vectores se guardan en float16 en un
+archivo mapeado en memoria y cada categoría recibe solo las filas que
+necesita para entrenar su BERTopic.
+
+Archivos (misma base):
+- <base>.npy: matriz (n_textos_distintos, dimensión) en float16
+- <base>.ids.npy: fila de la matriz de cada reseña del dataset (int64)
+- <base>.meta.json: modelo, firma de los textos, filas y dimensión
+
+Si el modelo y los textos no cambiaron, los vectores se reutilizan sin
+cargar el modelo (por ejemplo, al recalibrar las categorías). Si cambiaron,
+los textos ya codificados en ejecuciones anteriores se toman de la caché de
+embeddings (core/cache_embeddings.py) y solo los nuevos pasan por el modelo.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from tqdm import tqdm
+
+from config import ConfigInferencia
+from .cache_embeddings import CacheEmbeddings, normalizar
+from .metricas import medir_paso
+
+
+class EmbeddingsDataset:
+    """Vectores de las reseñas del dataset (ver docstring del módulo)."""
+
+    DTYPE = np.float16
+
+    def __init__(self, base, modelo: str):
+        """
+        Args:
+            base: Ruta sin extensión (ej. 'data/shared/embeddings')
+            modelo: Nombre o ruta del modelo de SentenceTransformers
+        """
+        self.base = Path(base)
+        self.modelo = modelo
+        self.ruta_matriz = self.base.with_name(self.base.name + '.npy')
+        self.ruta_ids = self.base.with_name(self.base.name + '.ids.npy')
+        self.ruta_meta = self.base.with_name(self.base.name + '.meta.json')
+        self.matriz = None
+        self.codigos = None
+        self._encoder = None
+
+    def _firma(self, textos: pd.Series) -> str:
+        h = hashlib.sha256(self.modelo.encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(textos, index=False).values.tobytes())
+        return h.hexdigest()
+
+    def _leer_meta(self):
+        try:
+            with open(self.ruta_meta, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def preparar(self, textos: pd.Series) -> 'EmbeddingsDataset':
+        """
+        Calcula (o reutiliza) los embeddings de los textos del dataset.
+
+        Args:
+            textos: 'TituloReview' de todas las filas, en el orden del dataset
+
+        Returns:
+            self, con la matriz abierta en modo lectura
+        """
+        # El modelo recibe siempre el texto normalizado, haya o no caché de
+        # embeddings (que lo usa como clave): los vectores no dependen de ella
+        textos = textos.fillna('').astype(str).map(normalizar)
+        firma = self._firma(textos)
+        meta = self._leer_meta()
+
+        if meta is None or meta.get('firma') != firma or not self.ruta_matriz.exists():
+            self._calcular(textos, firma)
+        else:
+            print(f"   • Embeddings reutilizados: {self.ruta_matriz}")
+
+        return self.abrir()
+
+    def abrir(self) -> 'EmbeddingsDataset':
+        """
+        Abre en modo lectura los embeddings ya calculados (por ejemplo, desde
+        los procesos que analizan cada categoría en paralelo).
+        """
+        self.matriz = np.load(self.ruta_matriz, mmap_mode='r')
+        self.codigos = np.load(self.ruta_ids, mmap_mode='r')
+        return self
+
+    def _cargar_encoder(self):
+        """Carga el modelo de embeddings la primera vez que se necesita."""
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+            with medir_paso('carga_modelo'):
+                self._encoder = SentenceTransformer(self.modelo)
+        return self._encoder
+
+    def _codificar(self, textos):
+        """Ejecuta el modelo de embeddings sobre una lista de textos."""
+        encoder = self._cargar_encoder()
+        with medir_paso('embeddings', filas=len(textos)):
+            return encoder.encode(
+                list(textos), batch_size=ConfigInferencia.BATCH_EMBEDDINGS,
+                convert_to_numpy=True, show_progress_bar=False
+            )
+
+    def _calcular(self, textos: pd.Series, firma: str):
+        """Obtiene el vector de cada texto distinto una vez y guarda la matriz."""
+        codigos, unicos = pd.factorize(textos)
+        print(f"   • Calculando embeddings: {len(unicos)} textos distintos "
+              f"de {len(textos)} reseñas")
+
+        self._encoder = None
+        cache = CacheEmbeddings.crear(self.modelo)
+        if cache is not None and cache.dimension is not None:
+            dimension = cache.dimension
+        else:
+            dimension = self._cargar_encoder().get_sentence_embedding_dimension()
+        batch_size = ConfigInferencia.BATCH_EMBEDDINGS
+
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_matriz.with_name(self.base.name + '.tmp.npy')
+        matriz = open_memmap(temporal, mode='w+', dtype=self.DTYPE, shape=(len(unicos), dimension))
+        try:
+            # Se escribe por bloques: la matriz completa no pasa por la RAM
+            bloque = batch_size * 16
+            for inicio in tqdm(range(0, len(unicos), bloque), desc="   Embeddings"):
+                textos_bloque = list(unicos[inicio:inicio + bloque])
+                if cache is not None:
+                    vectores = cache.embeddings(textos_bloque, self._codificar)
+                else:
+                    vectores = self._codificar(textos_bloque)
+                matriz[inicio:inicio + len(textos_bloque)] = vectores
+            matriz.flush()
+        finally:
+            del matriz
+            self._encoder = None
+            if cache is not None:
+                cache.imprimir_resumen()
+
+        os.replace(temporal, self.ruta_matriz)
+        np.save(self.ruta_ids, codigos.astype(np.int64))
+        temporal_meta = self.ruta_meta.with_name(self.ruta_meta.name + '.tmp')
+        with open(temporal_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'modelo': self.modelo,
+                'firma': firma,
+                'filas': int(len(textos)),
+                'textos_distintos': int(len(unicos)),
+                'dimension': int(dimension),
+                'dtype': np.dtype(self.DTYPE).name,
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temporal_meta, self.ruta_meta)
+
+    def vectores(self, posiciones) -> np.ndarray:
+        """
+        Embeddings de un subconjunto de filas del dataset.
+
+        Args:
+            posiciones: Posiciones (0..n-1) o máscara booleana de las filas
+
+        Returns:
+            np.ndarray (n_filas, dimensión) en float32
+        """
+        posiciones = np.asarray(posiciones)
+        if posiciones.dtype == bool:
+            posiciones = np.flatnonzero(posiciones)
+        return np.asarray(self.matriz[self.codigos[posiciones]], dtype=np.float32)
+
+    def cerrar(self):
+        """Libera el mapeo en memoria."""
+        self.matriz = None
+        self.codigos = None
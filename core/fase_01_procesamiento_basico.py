@@ -6,6 +6,9 @@ Este módulo procesa el dataset de opiniones turísticas aplicando:
 - Eliminación de duplicados
 - Creación de texto consolidado (TituloReview)
 - Selección de columnas finales: TituloReview, FechaEstadia, Calificacion
+- Identificador estable de cada reseña (IdResena)
+- Modo incremental: agrega solo las reseñas nuevas al dataset existente
+- Modo por lotes: procesa el dataset en lotes de tamaño fijo
 """
 
 import pandas as pd
@@ -13,17 +16,30 @@ from datetime import datetime
 from pathlib import Path
 import os
 
+from config import ConfigAlmacenamiento
+from .almacen_dataset import AlmacenDataset
+from .conjunto_hashes import ConjuntoHashes
+from .incremental import COLUMNA_ID, calcular_ids
+from .manifiesto import ManifiestoEjecucion
+from .metricas import medir_paso, registrar_filas
+
 
 class ProcesadorBasico:
     """
     Procesa el dataset de producción aplicando transformaciones básicas.
-    Modifica el archivo CSV directamente en /production/data/dataset.csv
+    Lee data/dataset.csv (vía el almacén del dataset) y reemplaza su contenido.
     """
     
+    # Ruta relativa desde el directorio de producción
+    DATASET_PATH = Path(__file__).parent.parent / 'data' / 'dataset.csv'
+    NOMBRE_FASE = 'fase_01'
+    COLUMNAS_SALIDA = ['TituloReview', 'FechaEstadia', 'Calificacion', COLUMNA_ID]
+    
     def __init__(self):
         """Inicializa el procesador con la ruta fija del dataset de producción."""
-        # Ruta relativa desde el directorio de producción
-        self.dataset_path = Path(__file__).parent.parent / 'data' / 'dataset.csv'
+        self.dataset_path = self.DATASET_PATH
+        self.almacen = AlmacenDataset(self.dataset_path)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
         self.df = None
     
     def crear_texto_consolidado(self, row):
@@ -55,51 +71,198 @@ class ProcesadorBasico:
     
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe la columna 'TituloReview' en el dataset.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Consulta el manifiesto de ejecución: un CSV nuevo invalida la fase.
         """
         try:
-            df = pd.read_csv(self.dataset_path)
-            return 'TituloReview' in df.columns
+            if ConfigAlmacenamiento.INCREMENTAL and self.almacen.csv_modificado():
+                return False
+            return self.manifiesto.esta_vigente(self.NOMBRE_FASE, [], self.COLUMNAS_SALIDA)
         except:
             return False
     
-    def procesar(self, forzar=False):
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(self.NOMBRE_FASE, [], self.COLUMNAS_SALIDA,
+                                  filas=self.almacen.num_filas())
+    
+    def persistir(self, df):
         """
-        Ejecuta el pipeline completo de procesamiento básico.
-        Modifica el dataset CSV directamente.
+        Guarda el dataset procesado en el almacén.
         
-        Args:
-            forzar: Si es True, ejecuta incluso si ya fue procesado
+        Las columnas de la fase reemplazan el dataset; en modo incremental las
+        columnas de resultados conservadas de ejecuciones anteriores se
+        escriben a continuación.
         """
-        if not forzar and self.ya_procesado():
-            print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
+        self.almacen.escribir(df[self.COLUMNAS_SALIDA])
         
-        # Cargar dataset
-        self.df = pd.read_csv(self.dataset_path)
-        filas_iniciales = len(self.df)
+        resultados = [c for c in df.columns if c not in self.COLUMNAS_SALIDA]
+        if resultados:
+            self.almacen.escribir_columnas(df[resultados])
+        
+        self.almacen.registrar_csv()
+    
+    def _combinar_existentes(self, df_nuevo):
+        """
+        Modo incremental: agrega al dataset existente solo las reseñas nuevas.
+        
+        Las filas existentes conservan su posición y sus resultados; las
+        nuevas se agregan al final con los resultados vacíos.
+        """
+        df_nuevo = df_nuevo.drop_duplicates(subset=[COLUMNA_ID])
+        
+        columnas = self.almacen.columnas()
+        if not {'TituloReview', 'FechaEstadia'}.issubset(columnas):
+            return df_nuevo
+        
+        existentes = self.almacen.leer()
+        if COLUMNA_ID not in existentes.columns:
+            # Datasets procesados antes de existir el identificador
+            existentes[COLUMNA_ID] = calcular_ids(existentes)
+        
+        nuevos = df_nuevo[~df_nuevo[COLUMNA_ID].isin(existentes[COLUMNA_ID])]
+        print(f"   • Modo incremental: {len(existentes)} reseñas existentes | {len(nuevos)} nuevas")
+        
+        return pd.concat([existentes, nuevos], ignore_index=True)
+    
+    def _transformar(self, df, vistos=None):
+        """
+        Aplica las transformaciones de la fase a un DataFrame (completo o un lote).
         
+        Args:
+            df: Datos a transformar
+            vistos: ConjuntoHashes de las filas ya procesadas en lotes
+                    anteriores (modo por lotes); las filas repetidas se
+                    descartan y el conjunto se actualiza
+        
+        Returns:
+            DataFrame con las columnas finales
+        """
         # Convertir FechaEstadia (ya está en formato ISO YYYY-MM-DD)
-        if 'FechaEstadia' in self.df.columns:
-            self.df['FechaEstadia'] = pd.to_datetime(self.df['FechaEstadia'], errors='coerce')
+        if 'FechaEstadia' in df.columns:
+            df['FechaEstadia'] = pd.to_datetime(df['FechaEstadia'], errors='coerce')
         
         # Eliminar filas con FechaEstadia nula
-        self.df = self.df.dropna(subset=['FechaEstadia'])
+        df = df.dropna(subset=['FechaEstadia'])
         
         # Eliminar duplicados
-        self.df = self.df.drop_duplicates()
+        df = df.drop_duplicates()
+        if vistos is not None:
+            hashes = pd.util.hash_pandas_object(df, index=False)
+            df = df[vistos.agregar_nuevos(hashes.to_numpy())]
         
         # Crear texto consolidado SOLO si no existe ya
-        if 'TituloReview' not in self.df.columns and 'Titulo' in self.df.columns and 'Review' in self.df.columns:
-            self.df['TituloReview'] = self.df.apply(self.crear_texto_consolidado, axis=1)
+        if 'TituloReview' not in df.columns and 'Titulo' in df.columns and 'Review' in df.columns:
+            df['TituloReview'] = (df.apply(self.crear_texto_consolidado, axis=1)
+                                  if len(df) else pd.Series(dtype=object))
+        
+        # Identificador estable de cada reseña
+        df[COLUMNA_ID] = calcular_ids(df)
         
         # Seleccionar solo las columnas finales
-        columnas_finales = ['TituloReview', 'FechaEstadia', 'Calificacion']
-        self.df = self.df[columnas_finales]
+        return df[self.COLUMNAS_SALIDA]
+    
+    def _procesar_por_lotes(self):
+        """
+        Modo por lotes: transforma el dataset lote a lote y escribe el nuevo
+        dataset de forma incremental (solo un lote permanece en memoria).
+        
+        Los hashes de las filas y los IdResena ya vistos, para descartar
+        repetidos entre lotes, se guardan en conjuntos en disco (un hash en
+        memoria por fila crecería con el dataset).
+        
+        Returns:
+            Tupla (filas iniciales, filas finales)
+        """
+        tamano_lote = ConfigAlmacenamiento.TAMANO_LOTE
+        filas_iniciales = 0
+        filas_finales = 0
+        
+        directorio = self.almacen.directorio.parent
+        with self.almacen.escritor_lotes(columnas_base=self.COLUMNAS_SALIDA) as escritor, \
+                ConjuntoHashes(directorio) as vistos, ConjuntoHashes(directorio) as ids:
+            if ConfigAlmacenamiento.INCREMENTAL:
+                # Conservar primero las reseñas existentes con sus resultados
+                if {'TituloReview', 'FechaEstadia'}.issubset(self.almacen.columnas()):
+                    for lote in self.almacen.iterar_lotes(tamano_lote=tamano_lote):
+                        if COLUMNA_ID not in lote.columns:
+                            lote[COLUMNA_ID] = calcular_ids(lote)
+                        ids.agregar(ConjuntoHashes.desde_hex(lote[COLUMNA_ID]))
+                        escritor.escribir_lote(lote)
+                        filas_finales += len(lote)
+                existentes = filas_finales
+                fuente = pd.read_csv(self.almacen.ruta_csv, chunksize=tamano_lote)
+            else:
+                fuente = self.almacen.iterar_lotes(tamano_lote=tamano_lote)
+            
+            for lote in fuente:
+                filas_iniciales += len(lote)
+                with medir_paso('transformacion', filas=len(lote)):
+                    lote = self._transformar(lote, vistos)
+                    
+                    if ConfigAlmacenamiento.INCREMENTAL:
+                        lote = lote[ids.agregar_nuevos(ConjuntoHashes.desde_hex(lote[COLUMNA_ID]))]
+                
+                with medir_paso('escritura', filas=len(lote)):
+                    escritor.escribir_lote(lote.reset_index(drop=True))
+                filas_finales += len(lote)
+        
+        if ConfigAlmacenamiento.INCREMENTAL:
+            print(f"   • Modo incremental: {existentes} reseñas existentes | {filas_finales - existentes} nuevas")
+        
+        self.almacen.registrar_csv()
+        return filas_iniciales, filas_finales
+    
+    def procesar(self, forzar=False, guardar=True):
+        """
+        Ejecuta el pipeline completo de procesamiento básico.
+        Reemplaza el contenido del dataset en el almacén (en modo incremental
+        agrega las reseñas nuevas de data/dataset.csv al dataset existente).
+        
+        Args:
+            forzar: Si es True, ejecuta incluso si ya fue procesado
+            guardar: Si es False, solo retorna el DataFrame procesado (pipeline
+                     en memoria); la persistencia queda a cargo del orquestador
+        
+        Returns:
+            DataFrame procesado con tipos ya convertidos, o None si se omite
+            (o en modo por lotes, donde el dataset no se carga completo)
+        """
+        if not forzar and self.ya_procesado():
+            print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
+            return None
         
-        # Guardar dataset procesado
-        self.df.to_csv(self.dataset_path, index=False)
+        if guardar and ConfigAlmacenamiento.TAMANO_LOTE:
+            filas_iniciales, filas_finales = self._procesar_por_lotes()
+            registrar_filas(filas_iniciales)
+            self._registrar_manifiesto()
+            print(f"✅ Fase 01 completada: {filas_iniciales} → {filas_finales} filas | "
+                  f"{len(self.COLUMNAS_SALIDA)} columnas (por lotes)")
+            return None
+        
+        # Cargar dataset (en modo incremental, las reseñas recibidas en el CSV)
+        with medir_paso('carga'):
+            if ConfigAlmacenamiento.INCREMENTAL:
+                self.df = pd.read_csv(self.almacen.ruta_csv)
+            else:
+                self.df = self.almacen.leer()
+        filas_iniciales = len(self.df)
+        registrar_filas(filas_iniciales)
+        
+        with medir_paso('transformacion', filas=filas_iniciales):
+            self.df = self._transformar(self.df)
+            
+            if ConfigAlmacenamiento.INCREMENTAL:
+                self.df = self._combinar_existentes(self.df)
+        
+        # Guardar dataset procesado (descarta columnas derivadas previas)
+        self.df = self.df.reset_index(drop=True)
+        if guardar:
+            with medir_paso('escritura', filas=len(self.df)):
+                self.persistir(self.df)
+            self._registrar_manifiesto()
         
         filas_finales = len(self.df)
         print(f"✅ Fase 01 completada: {filas_iniciales} → {filas_finales} filas | {len(self.df.columns)} columnas")
+        
+        return self.df
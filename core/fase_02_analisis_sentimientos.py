@@ -4,13 +4,26 @@ Fase 02: Análisis de Sentimientos
 Analiza sentimientos de las opiniones turísticas usando HuggingFace BERT.
 """
 
+import numpy as np
 import pandas as pd
 import warnings
+from collections import Counter
+from pathlib import Path
 warnings.filterwarnings('ignore')
-from tqdm import tqdm
+
+from config import ConfigAlmacenamiento, ConfigInferencia, ConfigModelos
+from .almacen_dataset import AlmacenDataset
+from .batches_longitud import inferir_por_longitud
+from .cache_inferencia import identificador_modelo_local, inferir_con_cache
+from .incremental import asignar_resultados, columnas_con_resultados, filas_pendientes
+from .manifiesto import ManifiestoEjecucion
+from .matrices_scores import MatrizScores
+from .metricas import medir_paso, registrar_filas
+from .reanudacion import ProgresoInferencia, ProgresoLotes
 
 try:
-    from transformers import pipeline
+    from transformers import AutoConfig, AutoTokenizer
+    from .backend_inferencia import cargar_clasificador, softmax, validacion_pendiente, variante_modelo
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
@@ -23,7 +36,13 @@ class AnalizadorSentimientos:
     """
     
     DATASET_PATH = "data/dataset.csv"
-    MODELO_NOMBRE = "nlptown/bert-base-multilingual-uncased-sentiment"
+    NOMBRE_FASE = 'fase_02'
+    COLUMNAS_ENTRADA = ['TituloReview']
+    COLUMNAS_SALIDA = ['Sentimiento']
+    MODELO_NOMBRE = ConfigModelos.SENTIMIENTOS
+    MAX_CARACTERES = 512
+    MAX_TOKENS = 512
+    BATCH_SIZE = ConfigInferencia.BATCH_SENTIMIENTOS
     
     # Mapeo de etiquetas HuggingFace a sentimientos
     MAPEO_ETIQUETAS = {
@@ -42,34 +61,63 @@ class AnalizadorSentimientos:
     
     def __init__(self):
         """Inicializa el analizador."""
-        self.pipeline = None
+        self.tokenizer = None
+        self.model = None
         self.modelo_cargado = False
+        self.almacen = AlmacenDataset(self.DATASET_PATH)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
         
-    def cargar_modelo(self):
-        """Carga el modelo preentrenado de HuggingFace."""
+    @staticmethod
+    def _verificar_transformers():
+        """Error claro si faltan transformers/torch (y con ellas el backend de inferencia)."""
         if not TRANSFORMERS_AVAILABLE:
             raise ImportError(
                 "La librería transformers no está disponible. "
                 "Instala con: pip install transformers torch"
             )
+    
+    def cargar_modelo(self):
+        """Carga el modelo preentrenado de HuggingFace."""
+        self._verificar_transformers()
         
         try:
-            self.pipeline = pipeline(
-                "sentiment-analysis",
-                model=self.MODELO_NOMBRE,
-                return_all_scores=True
-            )
+            self.tokenizer = AutoTokenizer.from_pretrained(self.MODELO_NOMBRE)
+            self.model = cargar_clasificador(self.MODELO_NOMBRE, self.tokenizer, self.MAX_TOKENS)
             self.modelo_cargado = True
             
         except Exception as e:
             raise RuntimeError(f"Error al cargar modelo: {e}")
     
+    def _identificador_modelo(self):
+        """
+        Identificador del modelo para el manifiesto y la caché: nombre del
+        modelo (con la firma de sus archivos si es una ruta local, para
+        detectar un re-entrenamiento) y variante (fp32 o INT8).
+        """
+        self._verificar_transformers()
+        modelo = self.MODELO_NOMBRE
+        base = identificador_modelo_local(modelo) if Path(modelo).is_dir() else modelo
+        return base + variante_modelo(modelo)
+    
+    def _identificador_inferencia(self):
+        """
+        Identificador del modelo para la caché de inferencia y la reanudación.
+        Si la validación INT8 está pendiente se carga antes el modelo (que la
+        ejecuta), para no guardar salidas de una variante con el de otra.
+        """
+        self._verificar_transformers()
+        if validacion_pendiente(self.MODELO_NOMBRE) and not self.modelo_cargado:
+            with medir_paso('carga_modelo'):
+                self.cargar_modelo()
+        return self._identificador_modelo()
+    
     def mapear_resultado(self, resultado):
         """
         Mapea resultado de HuggingFace a categoría de sentimiento.
         
         Args:
-            resultado: Resultado del pipeline de HuggingFace
+            resultado: Lista de {'label', 'score'} por etiqueta (formato de
+                       los pipelines de HuggingFace)
             
         Returns:
             str: 'Positivo', 'Neutro' o 'Negativo'
@@ -118,59 +166,236 @@ class AnalizadorSentimientos:
         
         try:
             # Limitar a 512 caracteres
-            texto_procesado = str(texto)[:512]
-            resultado = self.pipeline(texto_procesado)
-            return self.mapear_resultado(resultado)
+            texto_procesado = str(texto)[:self.MAX_CARACTERES]
+            scores = inferir_por_longitud(
+                [texto_procesado], self.tokenizer, self.MAX_TOKENS, 1,
+                self._scores_batch, mostrar_progreso=False
+            )[0]
+            etiquetas = self._etiquetas()
+            return self.mapear_resultado(
+                [{'label': e, 'score': float(s)} for e, s in zip(etiquetas, scores)]
+            )
             
         except Exception:
             return "Neutro"
     
+    def _etiquetas(self):
+        """Etiquetas del modelo en el orden de sus salidas."""
+        if self.modelo_cargado:
+            config = self.model.config
+        else:
+            config = AutoConfig.from_pretrained(self.MODELO_NOMBRE)
+        return [config.id2label[i] for i in range(len(config.id2label))]
+    
+    def _scores_batch(self, input_ids, attention_mask):
+        """
+        Probabilidad de cada etiqueta para un batch tokenizado: una sola pasada
+        del modelo (softmax de los logits, igual que el pipeline 'sentiment-analysis').
+        """
+        return softmax(self.model.logits(input_ids, attention_mask))
+    
+    def _inferir_scores(self, textos):
+        """
+        Salida cruda del modelo: probabilidad de cada etiqueta por texto.
+        Los textos se analizan en batches agrupados por longitud.
+        """
+        if not self.modelo_cargado:
+            with medir_paso('carga_modelo'):
+                self.cargar_modelo()
+        
+        # Continuar desde el progreso guardado si la fase fue interrumpida
+        progreso = ProgresoInferencia(
+            self.NOMBRE_FASE, self._identificador_inferencia(), self.MAX_CARACTERES, textos
+        )
+        return inferir_por_longitud(
+            textos, self.tokenizer, self.MAX_TOKENS, self.BATCH_SIZE,
+            self._scores_batch, progreso
+        )
+    
+    def clasificar_textos(self, textos):
+        """
+        Analiza el sentimiento de una lista de textos y conserva la
+        distribución de probabilidad del modelo.
+        Consulta la caché de inferencia antes de ejecutar el modelo.
+        
+        Args:
+            textos: Textos a analizar
+            
+        Returns:
+            tuple: (sentimiento de cada texto, matriz (n_textos, n_etiquetas)
+                    de probabilidades; NaN en los textos vacíos)
+        """
+        etiquetas = self._etiquetas()
+        sentimientos = ["Neutro"] * len(textos)
+        probabilidades = np.full((len(textos), len(etiquetas)), np.nan, dtype=np.float32)
+        validos = [i for i, texto in enumerate(textos)
+                   if not (pd.isna(texto) or str(texto).strip() == "")]
+        if not validos:
+            return sentimientos, probabilidades
+        
+        # Limitar a 512 caracteres
+        textos_procesados = [str(textos[i])[:self.MAX_CARACTERES] for i in validos]
+        scores = inferir_con_cache(
+            self._identificador_inferencia(), self.MAX_CARACTERES,
+            textos_procesados, self._inferir_scores
+        )
+        probabilidades[validos] = scores
+        
+        for i, vector in zip(validos, scores):
+            if np.isnan(vector).any():
+                continue
+            sentimientos[i] = self.mapear_resultado(
+                [{'label': e, 'score': float(s)} for e, s in zip(etiquetas, vector)]
+            )
+        
+        return sentimientos, probabilidades
+    
+    def analizar_textos(self, textos):
+        """
+        Analiza el sentimiento de una lista de textos.
+        
+        Args:
+            textos: Textos a analizar
+            
+        Returns:
+            list: Sentimiento detectado para cada texto
+        """
+        return self.clasificar_textos(textos)[0]
+    
+    def _matriz_scores(self):
+        """Probabilidades del modelo por reseña (data/shared/sentimientos_scores.npy)."""
+        return MatrizScores(Path(self.DATASET_PATH).parent / 'shared' / 'sentimientos_scores')
+    
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe la columna 'Sentimiento' en el dataset.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Consulta el manifiesto de ejecución (sin cargar el dataset).
         """
         try:
-            df = pd.read_csv(self.DATASET_PATH)
-            return 'Sentimiento' in df.columns
+            return self.manifiesto.esta_vigente(
+                self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA, self._identificador_modelo()
+            )
         except:
             return False
     
-    def procesar(self, forzar=False):
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA, self._identificador_modelo()
+        )
+    
+    def _imprimir_resumen(self, total, distribucion):
+        """Muestra las opiniones procesadas y la distribución de sentimientos."""
+        print(f"✅ Análisis completado: {total} opiniones procesadas")
+        print(f"   Positivo: {distribucion.get('Positivo', 0)} | "
+              f"Neutro: {distribucion.get('Neutro', 0)} | "
+              f"Negativo: {distribucion.get('Negativo', 0)}")
+    
+    def _procesar_por_lotes(self):
+        """
+        Modo por lotes: lee, analiza y escribe el dataset lote a lote.
+        Solo un lote permanece en memoria. Los resultados de cada lote
+        terminado se guardan para reanudar una ejecución interrumpida.
+        """
+        columnas = columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+        num_filas = self.almacen.num_filas()
+        distribucion = Counter()
+        total = 0
+        matriz = self._matriz_scores()
+        progreso = ProgresoLotes(
+            self.NOMBRE_FASE, self._identificador_modelo(), self.almacen.huella(columnas),
+            ConfigAlmacenamiento.TAMANO_LOTE
+        )
+        
+        with self.almacen.escritor_lotes() as escritor, \
+                matriz.escritor(self._etiquetas(), num_filas, conservar=True) as escribir_scores:
+            for lote in self.almacen.iterar_lotes(columnas):
+                print(f"   • Lote {lote.index[0] + 1}-{lote.index[-1] + 1} de {num_filas}")
+                guardado = progreso.leer(lote)
+                if guardado is None:
+                    pendientes = filas_pendientes(
+                        lote, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, self._identificador_modelo()
+                    )
+                    textos = lote.loc[pendientes, 'TituloReview'].tolist()
+                    sentimientos, scores = self.clasificar_textos(textos)
+                    salida = asignar_resultados(lote, 'Sentimiento', pendientes, sentimientos)[self.COLUMNAS_SALIDA]
+                    ids = lote.index[pendientes.values]
+                    progreso.registrar(lote, salida, ids, scores)
+                else:
+                    salida, ids, scores = guardado
+                total += len(ids)
+                registrar_filas(len(ids))
+                
+                with medir_paso('escritura', filas=len(lote)):
+                    escribir_scores(ids, scores)
+                    escritor.escribir_lote(salida)
+                distribucion.update(salida['Sentimiento'])
+        progreso.eliminar()
+        print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
+        
+        self._registrar_manifiesto()
+        self._imprimir_resumen(total, distribucion)
+    
+    def procesar(self, forzar=False, df=None, guardar=True):
         """
         Procesa el dataset completo y agrega columna 'Sentimiento'.
-        Modifica el archivo dataset.csv directamente.
+        Escribe únicamente la columna 'Sentimiento' en el almacén del dataset.
+        En modo incremental solo analiza las opiniones sin sentimiento.
         
         Args:
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria. Si es None,
+                se cargan del almacén solo las columnas de entrada.
+            guardar: Si es True, escribe las columnas de salida en el almacén
+                     y registra la fase en el manifiesto
+        
+        Returns:
+            DataFrame con la columna de salida añadida (o el recibido si se omite).
+            En modo por lotes retorna None: el dataset no se carga completo.
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
+            return df
+        
+        if df is None and guardar and ConfigAlmacenamiento.TAMANO_LOTE:
+            self._procesar_por_lotes()
+            return None
         
-        # Cargar dataset
-        df = pd.read_csv(self.DATASET_PATH)
+        # Cargar solo la columna de texto (y los resultados previos en modo incremental)
+        if df is None:
+            with medir_paso('carga'):
+                df = self.almacen.leer(
+                    columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+                )
         
-        # Cargar modelo
-        self.cargar_modelo()
+        pendientes = filas_pendientes(
+            df, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, self._identificador_modelo()
+        )
+        textos = df.loc[pendientes, 'TituloReview']
         
-        # Procesar sentimientos
-        total = len(df)
-        sentimientos = []
+        # Procesar sentimientos (el modelo se carga solo si hay textos fuera de la caché)
+        total = len(textos)
+        registrar_filas(total)
+        sentimientos, probabilidades = self.clasificar_textos(textos.tolist())
         
-        for i, texto in enumerate(tqdm(df['TituloReview'], desc="   Progreso")):
-            sentimiento = self.analizar_texto(texto)
-            sentimientos.append(sentimiento)
+        # Guardar la distribución de probabilidad para otras fases
+        if total:
+            indices = None if pendientes.all() else np.flatnonzero(pendientes.values)
+            matriz = self._matriz_scores()
+            with medir_paso('escritura', filas=total):
+                matriz.guardar(self._etiquetas(), probabilidades, indices, conservar=indices is not None)
+            print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
         
         # Agregar columna al dataset
-        df['Sentimiento'] = sentimientos
+        df = asignar_resultados(df, 'Sentimiento', pendientes, sentimientos)
         
-        # Guardar dataset modificado
-        df.to_csv(self.DATASET_PATH, index=False)
+        # Guardar solo la columna nueva
+        if guardar:
+            with medir_paso('escritura', filas=len(df)):
+                self.almacen.escribir_columnas(df[self.COLUMNAS_SALIDA])
+            self._registrar_manifiesto()
         
         # Estadísticas
-        distribucion = df['Sentimiento'].value_counts()
-        print(f"✅ Análisis completado: {total} opiniones procesadas")
-        print(f"   Positivo: {distribucion.get('Positivo', 0)} | "
-              f"Neutro: {distribucion.get('Neutro', 0)} | "
-              f"Negativo: {distribucion.get('Negativo', 0)}")
+        self._imprimir_resumen(total, df['Sentimiento'].value_counts())
+        
+        return df
@@ -4,41 +4,23 @@ Fase 03: Análisis de Subjetividad
 Analiza la subjetividad de las opiniones turísticas usando modelo BERT fine-tuned.
 """
 
-import pandas as pd
 import numpy as np
-import torch
-from torch.utils.data import Dataset, DataLoader
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from tqdm import tqdm
+from collections import Counter
+from pathlib import Path
+from transformers import AutoTokenizer
 import warnings
 warnings.filterwarnings('ignore')
 
-
-class SubjectivityDataset(Dataset):
-    """Dataset para clasificación binaria de subjetividad."""
-    
-    def __init__(self, texts, tokenizer, max_length):
-        self.texts = texts
-        self.tokenizer = tokenizer
-        self.max_length = max_length
-    
-    def __len__(self):
-        return len(self.texts)
-    
-    def __getitem__(self, idx):
-        encoding = self.tokenizer(
-            str(self.texts[idx]),
-            max_length=self.max_length,
-            padding='max_length',
-            truncation=True,
-            return_tensors='pt'
-        )
-        
-        return {
-            'input_ids': encoding['input_ids'].squeeze(0),
-            'attention_mask': encoding['attention_mask'].squeeze(0),
-            'idx': idx
-        }
+from config import ConfigAlmacenamiento, ConfigModelos
+from .almacen_dataset import AlmacenDataset
+from .backend_inferencia import cargar_clasificador, softmax, validacion_pendiente, variante_modelo
+from .batches_longitud import inferir_por_longitud
+from .cache_inferencia import identificador_modelo_local, inferir_con_cache
+from .incremental import asignar_resultados, columnas_con_resultados, filas_pendientes
+from .manifiesto import ManifiestoEjecucion
+from .matrices_scores import MatrizScores
+from .metricas import medir_paso, registrar_filas
+from .reanudacion import ProgresoInferencia, ProgresoLotes
 
 
 class AnalizadorSubjetividad:
@@ -48,7 +30,10 @@ class AnalizadorSubjetividad:
     """
     
     DATASET_PATH = "data/dataset.csv"
-    MODEL_PATH = "models/subjectivity_task/best_model"
+    NOMBRE_FASE = 'fase_03'
+    COLUMNAS_ENTRADA = ['TituloReview']
+    COLUMNAS_SALIDA = ['Subjetividad']
+    MODEL_PATH = ConfigModelos.SUBJETIVIDAD
     MAX_LENGTH = 128
     BATCH_SIZE = 32
     
@@ -59,104 +44,261 @@ class AnalizadorSubjetividad:
         """Inicializa el analizador."""
         self.tokenizer = None
         self.model = None
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.modelo_cargado = False
+        self.almacen = AlmacenDataset(self.DATASET_PATH)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
         
     def cargar_modelo(self):
         """Carga el modelo fine-tuned y tokenizador."""
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_PATH)
-            self.model = AutoModelForSequenceClassification.from_pretrained(self.MODEL_PATH)
-            self.model.to(self.device)
-            self.model.eval()
+            self.model = cargar_clasificador(
+                self.MODEL_PATH, self.tokenizer, self.MAX_LENGTH,
+                nombres=self._etiquetas()
+            )
             self.modelo_cargado = True
             
         except Exception as e:
             raise RuntimeError(f"Error al cargar modelo: {e}")
     
-    def predecir_batch(self, dataloader):
+    def _identificador_modelo(self):
         """
-        Predice subjetividad para un batch de datos.
+        Identificador del modelo para el manifiesto y la caché: firma de sus
+        archivos (detecta un re-entrenamiento en la misma ruta) y variante
+        (fp32 o INT8).
+        """
+        return identificador_modelo_local(self.MODEL_PATH) + variante_modelo(self.MODEL_PATH)
+    
+    def _identificador_inferencia(self):
+        """
+        Identificador del modelo para la caché de inferencia y la reanudación.
+        Si la validación INT8 está pendiente se carga antes el modelo (que la
+        ejecuta), para no guardar salidas de una variante con el de otra.
+        """
+        if validacion_pendiente(self.MODEL_PATH) and not self.modelo_cargado:
+            with medir_paso('carga_modelo'):
+                self.cargar_modelo()
+        return self._identificador_modelo()
+    
+    def _logits_batch(self, input_ids, attention_mask):
+        """Logits del modelo para un batch tokenizado."""
+        return self.model.logits(input_ids, attention_mask)
+    
+    def predecir_logits(self, textos, progreso=None):
+        """
+        Obtiene los logits del modelo en batches agrupados por longitud.
         
         Args:
-            dataloader: DataLoader con los datos
+            textos: Textos a analizar
+            progreso: ProgresoInferencia donde guardar los logits de cada batch (opcional)
             
         Returns:
-            np.array: Array con las predicciones (clases)
+            np.array: Array (n_textos, n_clases) con los logits, en el orden de los textos
+        """
+        return inferir_por_longitud(
+            textos, self.tokenizer, self.MAX_LENGTH, self.BATCH_SIZE,
+            self._logits_batch, progreso
+        )
+    
+    def predecir_batch(self, textos):
         """
-        all_predictions = []
+        Predice subjetividad para una lista de textos.
         
-        with torch.no_grad():
-            for batch in tqdm(dataloader, desc="   Progreso"):
-                input_ids = batch['input_ids'].to(self.device)
-                attention_mask = batch['attention_mask'].to(self.device)
-                
-                outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
-                logits = outputs.logits.cpu().numpy()
-                
-                # Obtener clase predicha (argmax)
-                predicted_classes = np.argmax(logits, axis=1)
-                all_predictions.extend(predicted_classes)
+        Args:
+            textos: Textos a analizar
+            
+        Returns:
+            np.array: Array con las predicciones (clases)
+        """
+        # Obtener clase predicha (argmax)
+        return np.argmax(self.predecir_logits(textos), axis=1)
+    
+    def _inferir_logits(self, textos):
+        """Salida cruda del modelo (logits) para una lista de textos."""
+        if not self.modelo_cargado:
+            with medir_paso('carga_modelo'):
+                self.cargar_modelo()
         
-        return np.array(all_predictions)
+        # Continuar desde el progreso guardado si la fase fue interrumpida
+        progreso = ProgresoInferencia(
+            self.NOMBRE_FASE, self._identificador_inferencia(), self.MAX_LENGTH, textos
+        )
+        return self.predecir_logits(textos, progreso)
     
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe la columna 'Subjetividad' en el dataset.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Consulta el manifiesto de ejecución (sin cargar el dataset).
         """
         try:
-            df = pd.read_csv(self.DATASET_PATH)
-            return 'Subjetividad' in df.columns
+            return self.manifiesto.esta_vigente(
+                self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA, self._identificador_modelo()
+            )
         except:
             return False
     
-    def procesar(self, forzar=False):
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA, self._identificador_modelo()
+        )
+    
+    def clasificar_textos(self, textos):
+        """
+        Clasifica la subjetividad de una lista de textos y conserva la
+        probabilidad de cada clase.
+        Consulta la caché de inferencia antes de ejecutar el modelo.
+        
+        Args:
+            textos: Textos a analizar
+            
+        Returns:
+            tuple: (etiqueta de cada texto, matriz (n_textos, n_clases) de probabilidades)
+        """
+        if not textos:
+            return [], np.empty((0, len(self.ID_TO_LABEL)), dtype=np.float32)
+        
+        # El modelo se carga solo si hay textos fuera de la caché
+        logits = inferir_con_cache(
+            self._identificador_inferencia(), self.MAX_LENGTH,
+            [str(t) for t in textos], self._inferir_logits
+        )
+        predicted_classes = np.argmax(logits, axis=1)
+        
+        # Mapear IDs a etiquetas
+        return [self.ID_TO_LABEL[pred] for pred in predicted_classes], softmax(logits)
+    
+    def analizar_textos(self, textos):
+        """
+        Clasifica la subjetividad de una lista de textos.
+        
+        Args:
+            textos: Textos a analizar
+            
+        Returns:
+            list: Etiqueta de subjetividad de cada texto
+        """
+        return self.clasificar_textos(textos)[0]
+    
+    def _etiquetas(self):
+        """Clases del modelo en el orden de sus salidas."""
+        return [self.ID_TO_LABEL[i] for i in sorted(self.ID_TO_LABEL)]
+    
+    def _matriz_scores(self):
+        """Probabilidades del modelo por reseña (data/shared/subjetividad_scores.npy)."""
+        return MatrizScores(Path(self.DATASET_PATH).parent / 'shared' / 'subjetividad_scores')
+    
+    def _imprimir_resumen(self, total, distribucion):
+        """Muestra las opiniones procesadas y la distribución de subjetividad."""
+        print(f"✅ Análisis completado: {total} opiniones procesadas")
+        print(f"   Subjetiva: {distribucion.get('Subjetiva', 0)} | "
+              f"Mixta: {distribucion.get('Mixta', 0)}")
+    
+    def _procesar_por_lotes(self):
+        """
+        Modo por lotes: lee, analiza y escribe el dataset lote a lote.
+        Solo un lote permanece en memoria. Los resultados de cada lote
+        terminado se guardan para reanudar una ejecución interrumpida.
+        """
+        columnas = columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+        num_filas = self.almacen.num_filas()
+        distribucion = Counter()
+        total = 0
+        matriz = self._matriz_scores()
+        progreso = ProgresoLotes(
+            self.NOMBRE_FASE, self._identificador_modelo(), self.almacen.huella(columnas),
+            ConfigAlmacenamiento.TAMANO_LOTE
+        )
+        
+        with self.almacen.escritor_lotes() as escritor, \
+                matriz.escritor(self._etiquetas(), num_filas, conservar=True) as escribir_scores:
+            for lote in self.almacen.iterar_lotes(columnas):
+                print(f"   • Lote {lote.index[0] + 1}-{lote.index[-1] + 1} de {num_filas}")
+                guardado = progreso.leer(lote)
+                if guardado is None:
+                    pendientes = filas_pendientes(
+                        lote, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, self._identificador_modelo()
+                    )
+                    textos = lote.loc[pendientes, 'TituloReview'].tolist()
+                    subjetividad, scores = self.clasificar_textos(textos)
+                    salida = asignar_resultados(lote, 'Subjetividad', pendientes, subjetividad)[self.COLUMNAS_SALIDA]
+                    ids = lote.index[pendientes.values]
+                    progreso.registrar(lote, salida, ids, scores)
+                else:
+                    salida, ids, scores = guardado
+                total += len(ids)
+                registrar_filas(len(ids))
+                
+                with medir_paso('escritura', filas=len(lote)):
+                    escribir_scores(ids, scores)
+                    escritor.escribir_lote(salida)
+                distribucion.update(salida['Subjetividad'])
+        progreso.eliminar()
+        print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
+        
+        self._registrar_manifiesto()
+        self._imprimir_resumen(total, distribucion)
+    
+    def procesar(self, forzar=False, df=None, guardar=True):
         """
         Procesa el dataset completo y agrega columna 'Subjetividad'.
-        Modifica el archivo dataset.csv directamente.
+        Escribe únicamente la columna 'Subjetividad' en el almacén del dataset.
+        En modo incremental solo analiza las opiniones sin subjetividad.
         
         Args:
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria. Si es None,
+                se cargan del almacén solo las columnas de entrada.
+            guardar: Si es True, escribe las columnas de salida en el almacén
+                     y registra la fase en el manifiesto
+        
+        Returns:
+            DataFrame con la columna de salida añadida (o el recibido si se omite).
+            En modo por lotes retorna None: el dataset no se carga completo.
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
-        
-        # Cargar dataset
-        df = pd.read_csv(self.DATASET_PATH)
-        total = len(df)
+            return df
         
-        # Cargar modelo
-        self.cargar_modelo()
+        if df is None and guardar and ConfigAlmacenamiento.TAMANO_LOTE:
+            self._procesar_por_lotes()
+            return None
         
-        # Crear dataset y dataloader
-        dataset = SubjectivityDataset(
-            df['TituloReview'].tolist(),
-            self.tokenizer,
-            self.MAX_LENGTH
-        )
+        # Cargar solo la columna de texto (y los resultados previos en modo incremental)
+        if df is None:
+            with medir_paso('carga'):
+                df = self.almacen.leer(
+                    columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+                )
         
-        dataloader = DataLoader(
-            dataset,
-            batch_size=self.BATCH_SIZE,
-            shuffle=False
+        pendientes = filas_pendientes(
+            df, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, self._identificador_modelo()
         )
+        textos = df.loc[pendientes, 'TituloReview'].tolist()
+        total = len(textos)
+        registrar_filas(total)
         
         # Predecir subjetividad
-        predicted_classes = self.predecir_batch(dataloader)
+        subjetividad, probabilidades = self.clasificar_textos(textos)
         
-        # Mapear IDs a etiquetas
-        subjetividad = [self.ID_TO_LABEL[pred] for pred in predicted_classes]
+        # Guardar la probabilidad de cada clase para otras fases
+        if total:
+            indices = None if pendientes.all() else np.flatnonzero(pendientes.values)
+            matriz = self._matriz_scores()
+            with medir_paso('escritura', filas=total):
+                matriz.guardar(self._etiquetas(), probabilidades, indices, conservar=indices is not None)
+            print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
         
         # Agregar columna al dataset
-        df['Subjetividad'] = subjetividad
+        df = asignar_resultados(df, 'Subjetividad', pendientes, subjetividad)
         
-        # Guardar dataset modificado
-        df.to_csv(self.DATASET_PATH, index=False)
+        # Guardar solo la columna nueva
+        if guardar:
+            with medir_paso('escritura', filas=len(df)):
+                self.almacen.escribir_columnas(df[self.COLUMNAS_SALIDA])
+            self._registrar_manifiesto()
         
         # Estadísticas
-        distribucion = df['Subjetividad'].value_counts()
-        print(f"✅ Análisis completado: {total} opiniones procesadas")
-        print(f"   Subjetiva: {distribucion.get('Subjetiva', 0)} | "
-              f"Mixta: {distribucion.get('Mixta', 0)}")
+        self._imprimir_resumen(total, df['Subjetividad'].value_counts())
+        
+        return df
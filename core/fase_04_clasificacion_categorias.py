@@ -6,211 +6,446 @@ Clasifica las opiniones turísticas en múltiples categorías usando un modelo B
 
 import pandas as pd
 import numpy as np
-import torch
-from torch.utils.data import Dataset, DataLoader
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, logging as transformers_logging
+from transformers import AutoTokenizer, logging as transformers_logging
 import json
+import os
+import hashlib
 import warnings
+from contextlib import contextmanager
 warnings.filterwarnings('ignore')
 transformers_logging.set_verbosity_error()
 
+from config import ConfigAlmacenamiento, ConfigModelos
+from .almacen_dataset import AlmacenDataset
+from .backend_inferencia import cargar_clasificador, sigmoide, validacion_pendiente, variante_modelo
+from .batches_longitud import inferir_por_longitud
+from . import categorias as cats
+from .cache_inferencia import identificador_modelo_local, inferir_con_cache
+from .incremental import asignar_resultados, columnas_con_resultados, filas_pendientes
+from .manifiesto import ManifiestoEjecucion
+from .matrices_scores import MatrizScores
+from .metricas import medir_paso, registrar_filas
+from .reanudacion import ProgresoInferencia, ProgresoLotes
+
 
 class ClasificadorCategorias:
     """
     Clasifica opiniones en categorías turísticas usando un modelo BERT fine-tuned.
-    Añade una columna 'Categorias' al dataset con las etiquetas predichas.
+    Añade al dataset las etiquetas predichas: 'CategoriasMascara' (máscara de
+    bits, ver core/categorias.py) y 'Categorias' (texto legible).
     """
     
+    NOMBRE_FASE = 'fase_04'
+    COLUMNAS_ENTRADA = ['TituloReview']
+    COLUMNAS_SALIDA = [cats.COLUMNA_TEXTO, cats.COLUMNA_MASCARA]
+    
     def __init__(self):
         self.dataset_path = 'data/dataset.csv'
-        self.model_path = 'models/multilabel_task/best_model'
-        self.thresholds_path = 'models/multilabel_task/optimal_thresholds.json'
+        self.model_path = ConfigModelos.CATEGORIAS
+        self.thresholds_path = os.path.join(os.path.dirname(self.model_path), 'optimal_thresholds.json')
         self.max_length = 128
         self.batch_size = 32
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        
-        self.label_names = [
-            'Alojamiento',
-            'Gastronomía',
-            'Transporte',
-            'Eventos y festivales',
-            'Historia y cultura',
-            'Compras',
-            'Deportes y aventura',
-            'Vida nocturna',
-            'Naturaleza',
-            'Personal y servicio',
-            'Seguridad',
-            'Fauna y vida animal'
-        ]
+        
+        self.label_names = list(cats.CATEGORIAS)
         
         self.model = None
         self.tokenizer = None
         self.optimal_thresholds = None
+        self.almacen = AlmacenDataset(self.dataset_path)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
     
     def _cargar_modelo(self):
-        """Carga el modelo BERT fine-tuned y los thresholds optimizados (si existen)."""
+        """Carga el modelo BERT fine-tuned y su tokenizador."""
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, fix_mistral_regex=True)
         except TypeError:
             # Si hay error con fix_mistral_regex, cargar sin el flag
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
-        self.model.to(self.device)
-        self.model.eval()
+        if self.optimal_thresholds is None:
+            self._cargar_thresholds()
+        # La validación INT8 compara las categorías asignadas con los thresholds
+        self.model = cargar_clasificador(
+            self.model_path, self.tokenizer, self.max_length,
+            decidir=lambda logits: sigmoide(logits) > self.optimal_thresholds,
+            nombres=self.label_names
+        )
+    
+    def leer_thresholds(self, ruta):
+        """
+        Lee un archivo de thresholds ({categoría: threshold}).
         
-        # Cargar thresholds optimizados (si existen, sino usar 0.5 por defecto)
+        Returns:
+            np.ndarray con el threshold de cada categoría en el orden de label_names
+        """
+        with open(ruta, 'r', encoding='utf-8') as f:
+            thresholds_dict = json.load(f)
+        faltantes = [label for label in self.label_names if label not in thresholds_dict]
+        if faltantes:
+            raise KeyError(f"Categorías sin threshold en {ruta}: {faltantes}")
+        return np.array([thresholds_dict[label] for label in self.label_names], dtype=np.float32)
+    
+    def _cargar_thresholds(self):
+        """Carga los thresholds optimizados (si existen, sino usa 0.5 por defecto)."""
         try:
-            with open(self.thresholds_path, 'r', encoding='utf-8') as f:
-                thresholds_dict = json.load(f)
-            self.optimal_thresholds = np.array([thresholds_dict[label] for label in self.label_names])
+            self.optimal_thresholds = self.leer_thresholds(self.thresholds_path)
             print(f"   ✅ Thresholds cargados desde: {self.thresholds_path}")
         except FileNotFoundError:
             # Usar 0.5 como threshold por defecto para todas las clases
             self.optimal_thresholds = np.full(len(self.label_names), 0.5)
     
-    def _crear_dataset(self, texts):
-        """Crea un dataset PyTorch para las predicciones."""
-        class ReviewDataset(Dataset):
-            def __init__(self, texts, tokenizer, max_length):
-                self.texts = texts
-                self.tokenizer = tokenizer
-                self.max_length = max_length
-            
-            def __len__(self):
-                return len(self.texts)
-            
-            def __getitem__(self, idx):
-                encoding = self.tokenizer(
-                    str(self.texts[idx]),
-                    max_length=self.max_length,
-                    padding='max_length',
-                    truncation=True,
-                    return_tensors='pt'
-                )
-                
-                return {
-                    'input_ids': encoding['input_ids'].squeeze(0),
-                    'attention_mask': encoding['attention_mask'].squeeze(0)
-                }
-        
-        return ReviewDataset(texts, self.tokenizer, self.max_length)
+    def _identificador_inferencia(self):
+        """
+        Identificador del modelo para la caché de inferencia y la reanudación.
+        Si la validación INT8 está pendiente se carga antes el modelo (que la
+        ejecuta), para no guardar salidas de una variante con el de otra.
+        """
+        if validacion_pendiente(self.model_path) and self.model is None:
+            with medir_paso('carga_modelo'):
+                self._cargar_modelo()
+        return identificador_modelo_local(self.model_path) + variante_modelo(self.model_path)
     
-    def _predecir(self, dataloader):
-        """Realiza predicciones con el modelo."""
-        all_predictions = []
-        
-        with torch.no_grad():
-            for batch in dataloader:
-                input_ids = batch['input_ids'].to(self.device)
-                attention_mask = batch['attention_mask'].to(self.device)
-                
-                outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
-                predictions = torch.sigmoid(outputs.logits).cpu().numpy()
-                all_predictions.extend(predictions)
+    def _probabilidades_batch(self, input_ids, attention_mask):
+        """Probabilidad de cada categoría (sigmoide) para un batch tokenizado."""
+        return sigmoide(self.model.logits(input_ids, attention_mask))
+    
+    def _inferir_probabilidades(self, textos):
+        """Salida cruda del modelo (probabilidad de cada categoría) para una lista de textos."""
+        if self.model is None:
+            with medir_paso('carga_modelo'):
+                self._cargar_modelo()
         
-        return np.array(all_predictions)
+        # Continuar desde el progreso guardado si la fase fue interrumpida
+        progreso = ProgresoInferencia(
+            self.NOMBRE_FASE, self._identificador_inferencia(), self.max_length, textos
+        )
+        return inferir_por_longitud(
+            textos, self.tokenizer, self.max_length, self.batch_size,
+            self._probabilidades_batch, progreso, mostrar_progreso=False
+        )
+    
+    def _predecir_textos(self, textos):
+        """Probabilidades de cada categoría, consultando la caché de inferencia."""
+        return inferir_con_cache(
+            self._identificador_inferencia(), self.max_length,
+            [str(t) for t in textos], self._inferir_probabilidades
+        )
     
     def _aplicar_thresholds(self, predictions):
-        """Aplica los thresholds optimizados y convierte a etiquetas."""
-        categorias_lista = []
-        
-        for pred in predictions:
-            # Aplicar thresholds optimizados
-            etiquetas_activas = pred > self.optimal_thresholds
-            
-            # Obtener nombres de etiquetas
-            categorias = [self.label_names[i] for i in range(len(self.label_names)) 
-                         if etiquetas_activas[i]]
-            
-            categorias_lista.append(categorias)
+        """
+        Aplica los thresholds optimizados (comparación vectorizada).
         
-        return categorias_lista
+        Returns:
+            np.ndarray uint16 con la máscara de categorías de cada opinión
+        """
+        predictions = np.asarray(predictions, dtype=np.float32).reshape(-1, len(self.label_names))
+        return cats.desde_activas(predictions > self.optimal_thresholds)
+    
+    @staticmethod
+    def _asignar_categorias(df, pendientes, mascaras):
+        """Escribe 'CategoriasMascara' y 'Categorias' en las filas pendientes."""
+        df = asignar_resultados(df, cats.COLUMNA_MASCARA, pendientes, mascaras)
+        df[cats.COLUMNA_MASCARA] = df[cats.COLUMNA_MASCARA].astype(np.uint16)
+        return asignar_resultados(df, cats.COLUMNA_TEXTO, pendientes, cats.a_texto(mascaras))
     
-    def _guardar_scores(self, predictions):
+    def _matriz_scores(self):
+        """Matriz de probabilidades compartida con otras fases (data/shared/categorias_scores.npy)."""
+        shared_dir = os.path.join(os.path.dirname(self.dataset_path), 'shared')
+        return MatrizScores(os.path.join(shared_dir, 'categorias_scores'))
+    
+    def _guardar_scores(self, predictions, indices=None):
         """
         Guarda las probabilidades de cada categoría para uso de otras fases.
         
         Args:
             predictions: Array numpy con las probabilidades (shape: [n_samples, n_labels])
+            indices: Filas del dataset a las que corresponden las predicciones.
+                     Si se indica (modo incremental), se actualizan solo esas
+                     filas y se conservan las probabilidades existentes.
+        """
+        matriz = self._matriz_scores()
+        matriz.guardar(self.label_names, predictions, indices, conservar=indices is not None)
+        print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
+    
+    @contextmanager
+    def _escritor_scores(self, filas, conservar=False):
         """
-        import os
+        Escribe la matriz de probabilidades por lotes (modo por lotes), con el
+        mismo formato que _guardar_scores pero sin mantenerla en memoria.
         
-        # Crear carpeta shared si no existe
-        shared_dir = os.path.join(os.path.dirname(self.dataset_path), 'shared')
-        os.makedirs(shared_dir, exist_ok=True)
+        Args:
+            filas: Filas del dataset
+            conservar: Si es True, las filas no escritas conservan sus
+                       probabilidades (modo incremental)
         
-        # Crear diccionario con scores
-        scores_dict = {}
-        for idx, pred in enumerate(predictions):
-            scores_dict[idx] = {
-                self.label_names[i]: float(pred[i]) 
-                for i in range(len(self.label_names))
-            }
+        Yields:
+            Función escribir(indices, predictions) para agregar cada lote
+        """
+        matriz = self._matriz_scores()
+        with matriz.escritor(self.label_names, filas, conservar=conservar) as escribir:
+            yield escribir
+        print(f"   • Probabilidades guardadas en: {matriz.ruta_matriz}")
+    
+    def _procesar_por_lotes(self):
+        """
+        Modo por lotes: clasifica y escribe el dataset lote a lote.
         
-        # Guardar en JSON
-        scores_path = os.path.join(shared_dir, 'categorias_scores.json')
-        with open(scores_path, 'w', encoding='utf-8') as f:
-            json.dump(scores_dict, f, ensure_ascii=False, indent=2)
+        Las probabilidades se escriben a medida que se calculan. En modo
+        incremental solo se clasifican (y se escriben sus probabilidades) las
+        opiniones sin categorías de cada lote; las demás conservan las suyas.
+        Los resultados de cada lote terminado se guardan para reanudar una
+        ejecución interrumpida.
+        """
+        self._cargar_thresholds()
+        columnas = columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+        identificador = self._identificador_modelo()
+        num_filas = self.almacen.num_filas()
+        print(f"Clasificando {num_filas} opiniones en {len(self.label_names)} categorías (por lotes)...")
+        
+        total_opiniones = 0
+        total_categorias = 0
+        progreso = ProgresoLotes(
+            self.NOMBRE_FASE, identificador, self.almacen.huella(columnas), ConfigAlmacenamiento.TAMANO_LOTE
+        )
         
-        print(f"   • Probabilidades guardadas en: {scores_path}")
+        with self.almacen.escritor_lotes() as escritor, \
+                self._escritor_scores(num_filas, conservar=True) as escribir_scores:
+            for lote in self.almacen.iterar_lotes(columnas):
+                print(f"   • Lote {lote.index[0] + 1}-{lote.index[-1] + 1} de {num_filas}")
+                guardado = progreso.leer(lote)
+                if guardado is None:
+                    pendientes = filas_pendientes(
+                        lote, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, identificador
+                    )
+                    textos = lote.loc[pendientes, 'TituloReview'].tolist()
+                    mascaras = np.empty(0, dtype=np.uint16)
+                    scores = np.empty((0, len(self.label_names)), dtype=np.float32)
+                    if textos:
+                        scores = self._predecir_textos(textos)
+                        mascaras = self._aplicar_thresholds(scores)
+                    salida = self._asignar_categorias(lote, pendientes, mascaras)[self.COLUMNAS_SALIDA]
+                    ids = lote.index[pendientes.values]
+                    progreso.registrar(lote, salida, ids, scores)
+                else:
+                    salida, ids, scores = guardado
+                registrar_filas(len(ids))
+                
+                with medir_paso('escritura', filas=len(lote)):
+                    escribir_scores(ids, scores)
+                    escritor.escribir_lote(salida)
+                
+                mascaras = salida.loc[ids, cats.COLUMNA_MASCARA].to_numpy(dtype=np.uint16)
+                total_opiniones += len(mascaras)
+                total_categorias += int(cats.activas(mascaras).sum())
+        progreso.eliminar()
+        
+        self._registrar_manifiesto()
+        
+        print(f"✅ Clasificación completada. Columna 'Categorias' añadida al dataset.")
+        if total_opiniones:
+            print(f"   • Promedio de categorías por opinión: {total_categorias / total_opiniones:.2f}")
+    
+    def _recalibrar_filas(self, df, matriz):
+        """
+        Reemplaza las categorías de las filas de df que tienen probabilidades
+        guardadas (df indexado por la posición en el dataset).
+        
+        Returns:
+            Número de filas cuyas categorías cambiaron
+        """
+        if len(matriz.ids) == 0:
+            return 0
+        posiciones = np.searchsorted(matriz.ids, df.index.values)
+        posiciones = np.minimum(posiciones, len(matriz.ids) - 1)
+        con_scores = matriz.ids[posiciones] == df.index.values
+        scores = np.asarray(matriz.matriz[posiciones[con_scores]], dtype=np.float32)
+        # Filas con NaN: no tienen probabilidades (se conservan sus categorías)
+        validas = ~np.isnan(scores).any(axis=1)
+        filas = df.index[con_scores][validas]
+        
+        nuevas = self._aplicar_thresholds(scores[validas])
+        anteriores = cats.mascaras(df.loc[filas])
+        cambiadas = int((anteriores != nuevas).sum())
+        df[cats.COLUMNA_MASCARA] = cats.mascaras(df)
+        df.loc[filas, cats.COLUMNA_MASCARA] = nuevas
+        df.loc[filas, cats.COLUMNA_TEXTO] = cats.a_texto(nuevas)
+        return cambiadas
+    
+    def recalibrar(self):
+        """
+        Vuelve a aplicar los thresholds de optimal_thresholds.json sobre las
+        probabilidades guardadas (data/shared/categorias_scores.npy), sin
+        ejecutar el modelo. Reescribe solo las columnas de categorías y registra
+        la fase con los thresholds nuevos.
+        
+        Returns:
+            Número de opiniones cuyas categorías cambiaron
+        """
+        matriz = self._matriz_scores()
+        if not matriz.existe():
+            raise FileNotFoundError(
+                f"Probabilidades de categorías no encontradas: {matriz.ruta_matriz}\n"
+                "Ejecuta primero la Fase 04 completa."
+            )
+        self._cargar_thresholds()
+        matriz.leer()
+        if list(matriz.etiquetas) != self.label_names:
+            raise ValueError(f"Las etiquetas de {matriz.ruta_matriz} no coinciden con las del modelo")
+        
+        # Datasets anteriores a la máscara: se genera a partir del texto
+        columnas = [c for c in self.COLUMNAS_SALIDA if c in self.almacen.columnas()]
+        cambiadas = 0
+        if ConfigAlmacenamiento.TAMANO_LOTE:
+            with self.almacen.escritor_lotes() as escritor:
+                for lote in self.almacen.iterar_lotes(columnas):
+                    cambiadas += self._recalibrar_filas(lote, matriz)
+                    with medir_paso('escritura', filas=len(lote)):
+                        escritor.escribir_lote(lote[self.COLUMNAS_SALIDA])
+        else:
+            with medir_paso('carga'):
+                df = self.almacen.leer(columnas)
+            cambiadas = self._recalibrar_filas(df, matriz)
+            with medir_paso('escritura', filas=len(df)):
+                self.almacen.escribir_columnas(df[self.COLUMNAS_SALIDA])
+        matriz.cerrar()
+        
+        self._registrar_manifiesto()
+        print(f"✅ Categorías recalibradas: {cambiadas} opiniones cambiaron")
+        return cambiadas
+    
+    def reporte_thresholds(self, escenarios):
+        """
+        Cuenta las categorías asignadas con distintos thresholds sin
+        modificar el dataset (análisis what-if).
+        
+        Args:
+            escenarios: {nombre: thresholds}; cada valor es un número (mismo
+                        threshold para todas las categorías) o un array con
+                        uno por categoría
+        
+        Returns:
+            DataFrame con una columna por escenario: opiniones por categoría,
+            opiniones sin categoría y promedio de categorías por opinión
+        """
+        matriz = self._matriz_scores().leer()
+        scores = np.asarray(matriz.matriz, dtype=np.float32)
+        matriz.cerrar()
+        scores = scores[~np.isnan(scores).any(axis=1)]
+        
+        reporte = {}
+        for nombre, thresholds in escenarios.items():
+            activas = scores > np.broadcast_to(np.asarray(thresholds, dtype=np.float32), (len(self.label_names),))
+            por_opinion = activas.sum(axis=1)
+            conteos = dict(zip(self.label_names, activas.sum(axis=0).tolist()))
+            conteos['Sin categoría'] = int((por_opinion == 0).sum())
+            conteos['Promedio por opinión'] = round(float(por_opinion.mean()), 2) if len(scores) else 0.0
+            reporte[nombre] = conteos
+        return pd.DataFrame(reporte)
+    
+    def _identificador_modelo(self):
+        """
+        Identifica el modelo (firma de sus archivos y variante fp32/INT8, como
+        en la caché) y sus thresholds: los tres determinan las etiquetas.
+        """
+        identificador = identificador_modelo_local(self.model_path) + variante_modelo(self.model_path)
+        if os.path.exists(self.thresholds_path):
+            with open(self.thresholds_path, 'rb') as f:
+                identificador += '#' + hashlib.sha256(f.read()).hexdigest()[:12]
+        return identificador
     
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe la columna 'Categorias' en el dataset.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Consulta el manifiesto de ejecución (sin cargar el dataset).
         """
         try:
-            df = pd.read_csv(self.dataset_path)
-            return 'Categorias' in df.columns
+            return self.manifiesto.esta_vigente(
+                self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA,
+                self._identificador_modelo()
+            )
         except:
             return False
     
-    def procesar(self, forzar=False):
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA,
+            self._identificador_modelo()
+        )
+    
+    def procesar(self, forzar=False, df=None, guardar=True):
         """
         Procesa el dataset completo:
         1. Carga el modelo y thresholds
         2. Realiza predicciones
-        3. Añade columna 'Categorias' al dataset
+        3. Añade las columnas 'Categorias' y 'CategoriasMascara' al dataset
         4. Guarda probabilidades en data/shared/ para otras fases
         
+        En modo incremental solo clasifica las opiniones sin categorías.
+        
         Args:
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria. Si es None,
+                se cargan del almacén solo las columnas de entrada.
+            guardar: Si es True, escribe las columnas de salida en el almacén
+                     y registra la fase en el manifiesto
+        
+        Returns:
+            DataFrame con la columna de salida añadida (o el recibido si se omite).
+            En modo por lotes retorna None: el dataset no se carga completo.
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
+            return df
         
-        # Cargar dataset
-        df = pd.read_csv(self.dataset_path)
+        if df is None and guardar and ConfigAlmacenamiento.TAMANO_LOTE:
+            self._procesar_por_lotes()
+            return None
         
-        # Cargar modelo
-        self._cargar_modelo()
-        
-        # Crear dataset y dataloader
-        dataset = self._crear_dataset(df['TituloReview'].tolist())
-        dataloader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
-        
-        print(f"Clasificando {len(df)} opiniones en {len(self.label_names)} categorías...")
-        
-        # Realizar predicciones
-        predictions = self._predecir(dataloader)
+        # Cargar solo la columna de texto (y los resultados previos en modo incremental)
+        if df is None:
+            with medir_paso('carga'):
+                df = self.almacen.leer(
+                    columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+                )
         
-        # Guardar probabilidades para otras fases
-        self._guardar_scores(predictions)
+        pendientes = filas_pendientes(
+            df, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE, self._identificador_modelo()
+        )
+        textos = df.loc[pendientes, 'TituloReview'].tolist()
+        registrar_filas(len(textos))
+        mascaras = np.empty(0, dtype=np.uint16)
         
-        # Aplicar thresholds y obtener etiquetas
-        categorias = self._aplicar_thresholds(predictions)
+        if textos:
+            # Cargar thresholds (el modelo se carga solo si hay textos fuera de la caché)
+            self._cargar_thresholds()
+            
+            print(f"Clasificando {len(textos)} opiniones en {len(self.label_names)} categorías...")
+            
+            # Realizar predicciones (las probabilidades no dependen de los thresholds)
+            predictions = self._predecir_textos(textos)
+            
+            # Guardar probabilidades para otras fases
+            indices = None if pendientes.all() else np.flatnonzero(pendientes.values)
+            with medir_paso('escritura', filas=len(predictions)):
+                self._guardar_scores(predictions, indices)
+            
+            # Aplicar thresholds y obtener etiquetas
+            mascaras = self._aplicar_thresholds(predictions)
         
-        # Convertir listas a strings JSON para guardar en CSV (sin ensure_ascii para evitar dobles comillas)
-        df['Categorias'] = [str(cat) for cat in categorias]
+        # Máscara de bits y texto legible para el CSV
+        df = self._asignar_categorias(df, pendientes, mascaras)
         
-        # Guardar dataset actualizado
-        df.to_csv(self.dataset_path, index=False)
+        # Guardar solo la columna nueva
+        if guardar:
+            with medir_paso('escritura', filas=len(df)):
+                self.almacen.escribir_columnas(df[self.COLUMNAS_SALIDA])
+            self._registrar_manifiesto()
         
         print(f"✅ Clasificación completada. Columna 'Categorias' añadida al dataset.")
         
         # Estadísticas básicas
-        total_categorias = sum(len(cat) for cat in categorias)
-        promedio_categorias = total_categorias / len(categorias)
-        print(f"   • Promedio de categorías por opinión: {promedio_categorias:.2f}")
+        if len(mascaras):
+            promedio_categorias = cats.activas(mascaras).sum() / len(mascaras)
+            print(f"   • Promedio de categorías por opinión: {promedio_categorias:.2f}")
+        
+        return df
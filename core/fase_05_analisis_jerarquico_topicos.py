@@ -3,12 +3,51 @@ Fase 05: Análisis Jerárquico de Tópicos
 ========================================
 Identifica sub-tópicos dentro de cada categoría usando BERTopic.
 Añade la columna 'Topico' al dataset con el sub-tópico identificado.
+
+Las categorías son independientes entre sí: se analizan en procesos
+separados (ConfigTopicos.PROCESOS) que leen los embeddings compartidos
+mapeados en memoria, y sus resultados se combinan en el orden de las
+categorías sin importar cuál termina primero.
+
+El modelo BERTopic de cada categoría se guarda con sus etiquetas del LLM en
+models/topicos/<categoria>/. En las ejecuciones siguientes las opiniones sin
+tópico se asignan a los tópicos existentes (predicción aproximada de
+HDBSCAN), sin reentrenar ni volver a llamar al LLM. Los tópicos existentes
+solo se conservan en modo incremental y si la ejecución anterior usó el
+mismo modelo (como en las fases 02-04). Una categoría se reentrena si se
+solicita (TOPICOS_REENTRENAR o scripts/reentrenar_topicos.py), si cambió el
+modelo de embeddings o el LLM, o si se detecta deriva: creció demasiado
+desde el entrenamiento o las opiniones asignadas tienen muchos más outliers
+que las de entrenamiento.
+
+Todas las opiniones, también las de entrenamiento, reciben su tópico con la
+misma predicción aproximada (transform): una opinión sin cambios obtiene el
+mismo tópico al entrenar y al asignar, y la proporción de outliers de
+referencia para la deriva se mide igual que la de las opiniones asignadas.
+
+En las categorías con más de ConfigTopicos.MAX_MUESTRA opiniones, UMAP y
+HDBSCAN se entrenan sobre una muestra estratificada (por combinación de
+categorías de la opinión).
+
+Las probabilidades de cada opinión en cada tópico (soft clustering de
+HDBSCAN) son costosas y solo se calculan con TOPICOS_PROBABILIDADES=true
+(se guardan por categoría en data/shared/topicos/). Un consumidor que las
+necesite para una categoría o unas opiniones puede pedirlas a demanda con
+probabilidades_topicos().
 """
 
 import pandas as pd
 import numpy as np
 import warnings
+import ast
+import json
+import multiprocessing
 import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -17,20 +56,29 @@ load_dotenv()
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 warnings.filterwarnings('ignore')
 
-from sentence_transformers import SentenceTransformer
 from umap import UMAP
 from hdbscan import HDBSCAN
 from sklearn.feature_extraction.text import CountVectorizer
 from bertopic import BERTopic
-from typing import List, Dict
+from typing import List, Dict, Optional
 from collections import Counter
 import re
 from pydantic import BaseModel, Field
 import nltk
 from nltk.corpus import stopwords
 
+from config import ConfigModelos, ConfigTopicos
+
 # Importar proveedor de LLM unificado
-from .llm_provider import crear_chain
+from .llm_provider import crear_chain, LLMProvider
+from . import categorias as cats
+from .almacen_dataset import AlmacenDataset
+from .embeddings import EmbeddingsDataset
+from .incremental import columnas_con_resultados, resultados_vigentes
+from .manifiesto import ManifiestoEjecucion
+from .matrices_scores import MatrizScores
+from .metricas import REGISTRO, medir_paso, registrar_detalle, registrar_filas
+from .reanudacion import ProgresoCategorias
 
 
 class TopicLabel(BaseModel):
@@ -55,9 +103,26 @@ class AnalizadorJerarquicoTopicos:
         Topico: {'Transporte': 'Servicio de ferry', 'Personal y servicio': 'Atención al cliente'}
     """
     
+    NOMBRE_FASE = 'fase_05'
+    COLUMNAS_ENTRADA = ['TituloReview', cats.COLUMNA_MASCARA]
+    COLUMNAS_SALIDA = ['Topico']
+    MODELO_EMBEDDINGS = ConfigModelos.EMBEDDINGS
+    
+    # Opiniones asignadas mínimas para evaluar la deriva de outliers
+    MIN_OPINIONES_DERIVA = 30
+    
+    # Opiniones por bloque al asignar con un modelo entrenado
+    BLOQUE_ASIGNACION = 50000
+    
     def __init__(self):
         self.dataset_path = 'data/dataset.csv'
+        self.almacen = AlmacenDataset(self.dataset_path)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
         self.min_opiniones_categoria = 50  # Mínimo de opiniones para aplicar BERTopic
+        self.embeddings = None
+        self.directorio_modelos = Path(ConfigTopicos.DIRECTORIO_MODELOS)
+        # True (todas) o lista de categorías a reentrenar en esta ejecución
+        self.reentrenar = ConfigTopicos.REENTRENAR
         
         # Descargar stopwords si no están disponibles
         try:
@@ -243,7 +308,10 @@ class AnalizadorJerarquicoTopicos:
         }
     
     def _crear_bertopic(self, textos: List[str]) -> BERTopic:
-        """Crea modelo BERTopic optimizado para los textos."""
+        """
+        Crea modelo BERTopic optimizado para los textos.
+        Los embeddings se reciben precalculados en fit_transform.
+        """
         # Analizar características
         caracteristicas = self._analizar_caracteristicas(textos)
         
@@ -253,19 +321,19 @@ class AnalizadorJerarquicoTopicos:
         vectorizer_params = self._optimizar_vectorizer(caracteristicas)
         
         # Crear componentes
-        embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
         umap_model = UMAP(**umap_params)
         hdbscan_model = HDBSCAN(**hdbscan_params)
         vectorizer_model = CountVectorizer(**vectorizer_params)
         
         # Crear modelo BERTopic
         topic_model = BERTopic(
-            embedding_model=embedding_model,
+            embedding_model=None,
             umap_model=umap_model,
             hdbscan_model=hdbscan_model,
             vectorizer_model=vectorizer_model,
             language="multilingual",
-            calculate_probabilities=True,
+            # Las probabilidades por tópico se piden al asignar (ver _transformar)
+            calculate_probabilities=False,
             verbose=False
         )
         
@@ -337,29 +405,59 @@ IMPORTANTE - FORMATO JSON:
         
         return chain
     
-    def _analizar_categoria(self, df: pd.DataFrame, categoria: str) -> Dict:
-        """
-        Analiza sub-tópicos para una categoría específica.
-        Retorna diccionario con mapeo índice -> {categoria: nombre_tópico}.
+    def _obtener_embeddings(self, df: pd.DataFrame) -> EmbeddingsDataset:
+        """Embeddings de todas las reseñas (se calculan una vez por dataset)."""
+        if self.embeddings is None:
+            base = Path(self.dataset_path).parent / 'shared' / 'embeddings'
+            self.embeddings = EmbeddingsDataset(base, self.MODELO_EMBEDDINGS).preparar(df['TituloReview'])
+        return self.embeddings
+    
+    def _seleccionar_categoria(self, df: pd.DataFrame, posiciones: np.ndarray, con_texto: np.ndarray):
         """
-        # Filtrar opiniones de esta categoría
-        mask = df['Categorias'].apply(lambda x: categoria in str(x))
-        df_categoria = df[mask].copy()
+        Opiniones con texto de una categoría.
         
-        num_opiniones = len(df_categoria)
+        Args:
+            posiciones: Posiciones de las opiniones de la categoría en df
+            con_texto: Filas de df con 'TituloReview'
         
-        if num_opiniones < self.min_opiniones_categoria:
-            return {}
+        Returns:
+            Tupla (textos, posiciones de las opiniones en df)
+        """
+        posiciones = posiciones[con_texto[posiciones]]
+        return df['TituloReview'].to_numpy()[posiciones].tolist(), posiciones
+    
+    def _modelar_categoria(self, categoria: str, textos: List[str], posiciones: np.ndarray,
+                           estratos: np.ndarray, embeddings: EmbeddingsDataset) -> List[str]:
+        """
+        Identifica los sub-tópicos de una categoría con BERTopic y los etiqueta con el LLM.
+        Si la categoría supera ConfigTopicos.MAX_MUESTRA opiniones, el modelo se
+        entrena con una muestra estratificada. Todas las opiniones se asignan
+        después con transform (ver docstring del módulo).
         
-        # Extraer textos
-        textos = df_categoria['TituloReview'].dropna().tolist()
+        Args:
+            categoria: Categoría a analizar
+            textos: Textos de las opiniones de la categoría
+            posiciones: Posición de cada opinión en el dataset (fila de embeddings)
+            estratos: Máscara de categorías de cada opinión (estratos de la muestra)
+            embeddings: Embeddings del dataset
         
-        if not textos:
-            return {}
+        Returns:
+            Nombre del tópico de cada texto
+        """
+        muestra = None
+        if ConfigTopicos.MAX_MUESTRA and len(textos) > ConfigTopicos.MAX_MUESTRA:
+            muestra = muestra_estratificada(estratos, ConfigTopicos.MAX_MUESTRA)
+            textos_ajuste = [textos[i] for i in muestra]
+            posiciones_ajuste = posiciones[muestra]
+        else:
+            textos_ajuste, posiciones_ajuste = textos, posiciones
         
         # Crear y entrenar modelo BERTopic
-        topic_model = self._crear_bertopic(textos)
-        topics, _ = topic_model.fit_transform(textos)
+        topic_model = self._crear_bertopic(textos_ajuste)
+        inicio = time.perf_counter()
+        with medir_paso('bertopic', filas=len(textos_ajuste)):
+            topic_model.fit(textos_ajuste, embeddings=embeddings.vectores(posiciones_ajuste))
+        tiempo_ajuste = time.perf_counter() - inicio
         
         # Obtener información de tópicos
         topic_info = topic_model.get_topic_info()
@@ -390,101 +488,634 @@ IMPORTANTE - FORMATO JSON:
         
         if topic_data:
             clasificador_llm = self._configurar_clasificador_llm(categoria)
-            resultado_llm = clasificador_llm.invoke({"topics_info": topics_info_text})
+            with medir_paso('llm', llamadas_llm=1):
+                resultado_llm = clasificador_llm.invoke({"topics_info": topics_info_text})
             
             for topic_label in resultado_llm.topics:
                 topic_names[topic_label.topic_id] = topic_label.label
         
-        # Crear mapeo índice -> {categoria: nombre_tópico}
-        mapeo_topicos = {}
-        for idx, topic_id in enumerate(topics):
-            original_idx = df_categoria.iloc[idx].name
-            topico_nombre = topic_names.get(topic_id, "Opiniones Diversas")
-            mapeo_topicos[original_idx] = {categoria: topico_nombre}
+        # Asignar todas las opiniones con el modelo entrenado
+        inicio = time.perf_counter()
+        topics, probabilidades = self._transformar(
+            topic_model, textos, posiciones, embeddings, probabilidades=ConfigTopicos.PROBABILIDADES
+        )
+        tiempo_asignacion = time.perf_counter() - inicio
+        
+        # Los outliers de referencia son los de las opiniones de entrenamiento
+        topics_entrenamiento = topics if muestra is None else topics[muestra]
+        self._guardar_modelo(categoria, topic_model, topic_names, topics_entrenamiento, len(textos))
+        
+        if ConfigTopicos.PROBABILIDADES:
+            self._guardar_probabilidades(categoria, topic_names, probabilidades, posiciones)
+        
+        self._registrar_detalle(categoria, 'entrenamiento', len(textos), len(textos_ajuste),
+                                tiempo_ajuste, tiempo_asignacion)
+        return [topic_names.get(topic_id, "Opiniones Diversas") for topic_id in topics]
+    
+    def _transformar(self, topic_model: BERTopic, textos: List[str], posiciones: np.ndarray,
+                     embeddings: EmbeddingsDataset, probabilidades: bool = False):
+        """
+        Asigna opiniones a los tópicos de un modelo entrenado (predicción
+        aproximada de HDBSCAN), por bloques para acotar la memoria.
+        
+        Args:
+            probabilidades: Calcular además la probabilidad de cada tópico
+                            (vector de pertenencia de HDBSCAN)
+        
+        Returns:
+            Tupla (tópico de cada texto, matriz (n, n_tópicos) o None)
+        """
+        topic_model.calculate_probabilities = probabilidades
+        topics, matrices = [np.empty(0, dtype=np.int64)], []
+        for inicio in range(0, len(textos), self.BLOQUE_ASIGNACION):
+            fin = inicio + self.BLOQUE_ASIGNACION
+            with medir_paso('asignacion', filas=len(textos[inicio:fin])):
+                bloque, probabilidades_bloque = topic_model.transform(
+                    textos[inicio:fin], embeddings=embeddings.vectores(posiciones[inicio:fin])
+                )
+            topics.append(np.asarray(bloque, dtype=np.int64))
+            if probabilidades:
+                matrices.append(np.asarray(probabilidades_bloque, dtype=np.float32))
+        if not probabilidades:
+            return np.concatenate(topics), None
+        matriz = np.concatenate(matrices) if matrices else np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(topics), matriz
+    
+    # ========== PROBABILIDADES ==========
+    
+    def _matriz_probabilidades(self, categoria: str) -> MatrizScores:
+        """Probabilidades de la categoría guardadas (data/shared/topicos/<categoria>)."""
+        base = Path(self.dataset_path).parent / 'shared' / 'topicos' / self._ruta_modelo(categoria).name
+        return MatrizScores(base)
+    
+    @staticmethod
+    def _etiquetas_topicos(topic_names: Dict, n_topicos: int) -> List[str]:
+        """Nombre de cada columna de probabilidades (tópicos 0..n-1)."""
+        return [topic_names.get(topic_id, f"Tópico {topic_id}") for topic_id in range(n_topicos)]
+    
+    def _guardar_probabilidades(self, categoria: str, topic_names: Dict, probabilidades: np.ndarray,
+                                posiciones: np.ndarray, conservar: bool = False):
+        """Guarda la probabilidad de cada tópico de las opiniones de una categoría."""
+        probabilidades = np.asarray(probabilidades)
+        if probabilidades.ndim != 2:
+            return
+        with medir_paso('escritura_probabilidades', filas=len(posiciones)):
+            self._matriz_probabilidades(categoria).guardar(
+                self._etiquetas_topicos(topic_names, probabilidades.shape[1]),
+                probabilidades, posiciones, conservar=conservar
+            )
+    
+    def probabilidades_topicos(self, categoria: str, indices=None, df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Calcula a demanda la probabilidad de cada tópico de las opiniones de
+        una categoría, con el modelo guardado (no reentrena).
+        
+        Args:
+            categoria: Categoría con modelo en models/topicos/
+            indices: Índices de las opiniones del dataset (por defecto todas
+                     las de la categoría)
+            df: Columnas de entrada de la fase (por defecto se leen del almacén)
+        
+        Returns:
+            DataFrame (opiniones × tópicos) con el índice del dataset y el
+            nombre de cada tópico como columna
+        """
+        meta = self._leer_meta_modelo(categoria)
+        if meta is None:
+            raise KeyError(f"No hay modelo de tópicos guardado para '{categoria}'")
+        if df is None:
+            df = self.almacen.leer(self.COLUMNAS_ENTRADA)
+        
+        textos, posiciones = self._seleccionar_categoria(
+            df, np.flatnonzero(cats.contiene(cats.mascaras(df), categoria)), df['TituloReview'].notna().to_numpy()
+        )
+        if indices is not None:
+            seleccion = np.flatnonzero(df.index[posiciones].isin(indices))
+            textos, posiciones = [textos[i] for i in seleccion], posiciones[seleccion]
+        
+        topic_model = BERTopic.load(str(self._ruta_modelo(categoria) / 'modelo.pkl'))
+        try:
+            _, probabilidades = self._transformar(
+                topic_model, textos, posiciones, self._obtener_embeddings(df), probabilidades=True
+            )
+        finally:
+            if self.embeddings is not None:
+                self.embeddings.cerrar()
+                self.embeddings = None
+        
+        etiquetas = {int(topic_id): nombre for topic_id, nombre in meta['etiquetas'].items()}
+        return pd.DataFrame(
+            probabilidades, index=df.index[posiciones],
+            columns=self._etiquetas_topicos(etiquetas, probabilidades.shape[1])
+        )
+    
+    def _registrar_detalle(self, categoria: str, modo: str, opiniones: int, muestra: int,
+                           tiempo_ajuste: float, tiempo_asignacion: float):
+        """Registra en el reporte de métricas el tamaño de la muestra y los tiempos de la categoría."""
+        registrar_detalle(categoria, {
+            'modo': modo,
+            'opiniones': int(opiniones),
+            'muestra': int(muestra),
+            'ajuste_s': round(tiempo_ajuste, 3),
+            'asignacion_s': round(tiempo_asignacion, 3),
+        })
+        if muestra < opiniones:
+            print(f"    {categoria}: muestra de {muestra} de {opiniones} opiniones | "
+                  f"ajuste {tiempo_ajuste:.1f}s | asignación {tiempo_asignacion:.1f}s")
+    
+    # ========== MODELOS GUARDADOS ==========
+    
+    def _ruta_modelo(self, categoria: str) -> Path:
+        """Directorio del modelo de una categoría (ej. models/topicos/gastronomia)."""
+        nombre = unicodedata.normalize('NFKD', categoria).encode('ascii', 'ignore').decode('ascii')
+        return self.directorio_modelos / re.sub(r'[^a-z0-9]+', '_', nombre.lower()).strip('_')
+    
+    def _leer_meta_modelo(self, categoria: str) -> Optional[Dict]:
+        """Metadatos del modelo guardado de una categoría, o None si no existe."""
+        ruta = self._ruta_modelo(categoria)
+        if not (ruta / 'modelo.pkl').exists():
+            return None
+        try:
+            with open(ruta / 'meta.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+    
+    def _guardar_modelo(self, categoria: str, topic_model: BERTopic, topic_names: Dict, topics,
+                        opiniones_categoria: int):
+        """Guarda el modelo entrenado de una categoría con las etiquetas del LLM."""
+        ruta = self._ruta_modelo(categoria)
+        ruta.mkdir(parents=True, exist_ok=True)
+        temporal = ruta / 'modelo.pkl.tmp'
+        with medir_paso('guardar_modelo'):
+            topic_model.save(str(temporal), serialization='pickle')
+        os.replace(temporal, ruta / 'modelo.pkl')
+        
+        topics = np.asarray(topics)
+        temporal_meta = ruta / 'meta.json.tmp'
+        with open(temporal_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'categoria': categoria,
+                'modelo_embeddings': self.MODELO_EMBEDDINGS,
+                'llm': LLMProvider.get_info()['modelo'],
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'opiniones_categoria': int(opiniones_categoria),
+                'opiniones_entrenamiento': int(len(topics)),
+                'proporcion_outliers': float(np.mean(topics == -1)) if len(topics) else 0.0,
+                'etiquetas': {str(topic_id): nombre for topic_id, nombre in topic_names.items()},
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temporal_meta, ruta / 'meta.json')
+    
+    def _motivo_reentrenamiento(self, categoria: str, num_textos: int) -> Optional[str]:
+        """
+        Motivo para entrenar un modelo nuevo de la categoría, o None si sus
+        opiniones se pueden asignar con el modelo guardado.
+        """
+        if self.reentrenar is True or categoria in (self.reentrenar or ()):
+            return 'reentrenamiento solicitado'
+        meta = self._leer_meta_modelo(categoria)
+        if meta is None:
+            return 'sin modelo guardado'
+        if meta.get('modelo_embeddings') != self.MODELO_EMBEDDINGS:
+            return 'cambió el modelo de embeddings'
+        if meta.get('llm') != LLMProvider.get_info()['modelo']:
+            return 'cambió el LLM'
+        crecimiento = num_textos / max(1, meta['opiniones_categoria']) - 1
+        if crecimiento > ConfigTopicos.MAX_CRECIMIENTO:
+            return f'creció {crecimiento:.0%} desde el entrenamiento'
+        return None
+    
+    def _asignar_categoria(self, categoria: str, textos: List[str], posiciones: np.ndarray,
+                           embeddings: EmbeddingsDataset) -> Optional[List[str]]:
+        """
+        Asigna opiniones a los tópicos del modelo guardado de la categoría
+        (predicción aproximada de HDBSCAN, sin reentrenar ni llamar al LLM).
+        
+        Returns:
+            Nombre del tópico de cada texto, o None si la proporción de
+            outliers indica deriva (la categoría debe reentrenarse)
+        """
+        meta = self._leer_meta_modelo(categoria)
+        with medir_paso('carga_modelo'):
+            topic_model = BERTopic.load(str(self._ruta_modelo(categoria) / 'modelo.pkl'))
+        inicio = time.perf_counter()
+        topics, probabilidades = self._transformar(
+            topic_model, textos, posiciones, embeddings, probabilidades=ConfigTopicos.PROBABILIDADES
+        )
+        self._registrar_detalle(categoria, 'asignacion', len(textos), 0, 0.0, time.perf_counter() - inicio)
+        
+        if len(topics) >= self.MIN_OPINIONES_DERIVA:
+            deriva = float(np.mean(topics == -1)) - meta['proporcion_outliers']
+            if deriva > ConfigTopicos.MAX_DERIVA_OUTLIERS:
+                print(f"  ↻ {categoria}: outliers +{deriva:.0%} respecto del entrenamiento - reentrenando")
+                return None
+        
+        etiquetas = {int(topic_id): nombre for topic_id, nombre in meta['etiquetas'].items()}
+        if probabilidades is not None:
+            self._guardar_probabilidades(categoria, etiquetas, probabilidades, posiciones, conservar=True)
+        return [etiquetas.get(int(topic_id), "Opiniones Diversas") for topic_id in topics]
+    
+    def _topicos_categoria(self, categoria: str, textos: List[str], posiciones: np.ndarray,
+                           estratos: np.ndarray, pendientes: Optional[np.ndarray],
+                           embeddings: EmbeddingsDataset):
+        """
+        Tópicos de una categoría: asigna las opiniones pendientes con el modelo
+        guardado o entrena uno nuevo con todas las opiniones (si pendientes es
+        None o se detecta deriva al asignar).
+        
+        Returns:
+            Tupla (nombres, máscara): nombre del tópico de las opiniones de
+            'textos' indicadas por la máscara
+        """
+        if pendientes is not None:
+            seleccion = np.flatnonzero(pendientes)
+            nombres = self._asignar_categoria(
+                categoria, [textos[i] for i in seleccion], posiciones[seleccion], embeddings
+            )
+            if nombres is not None:
+                return nombres, pendientes
+        
+        nombres = self._modelar_categoria(categoria, textos, posiciones, estratos, embeddings)
+        return nombres, np.ones(len(textos), dtype=bool)
+    
+    def _topicos_existentes(self, df: pd.DataFrame) -> Optional[List[Dict]]:
+        """Tópicos {categoria: tópico} de cada opinión asignados en una ejecución anterior."""
+        if 'Topico' not in df.columns:
+            return None
+        codigos, valores = pd.factorize(df['Topico'])
+        diccionarios = []
+        for valor in valores:
+            try:
+                diccionario = ast.literal_eval(valor) if isinstance(valor, str) else {}
+            except (ValueError, SyntaxError):
+                diccionario = {}
+            diccionarios.append(diccionario if isinstance(diccionario, dict) else {})
+        return [diccionarios[codigo] if codigo >= 0 else {} for codigo in codigos]
+    
+    def _nombres_categoria(self, categoria: str, posiciones: np.ndarray, nombres: List[str],
+                           mascara: np.ndarray, existentes: Optional[List[Dict]]):
+        """
+        Tópico de cada opinión de una categoría: los nombres calculados
+        (máscara) y los ya asignados (resto).
+        
+        Returns:
+            Tupla (posiciones en df, nombre del tópico de cada una)
+        """
+        resultado = np.empty(len(posiciones), dtype=object)
+        resultado[mascara] = nombres
+        if existentes is not None:
+            resultado[~mascara] = [existentes[posicion][categoria] for posicion in posiciones[~mascara]]
+        return posiciones, resultado
+    
+    @staticmethod
+    def _a_progreso(df: pd.DataFrame, categoria: str, posiciones: np.ndarray, nombres: np.ndarray) -> Dict:
+        """Resultado de una categoría como mapeo índice -> {categoria: tópico} (progreso guardado)."""
+        return {idx: {categoria: nombre} for idx, nombre in zip(df.index[posiciones], nombres)}
+    
+    @staticmethod
+    def _desde_progreso(df: pd.DataFrame, categoria: str, mapeo: Dict):
+        """Resultado (posiciones, nombres) de una categoría del progreso guardado."""
+        posiciones = df.index.get_indexer(list(mapeo))
+        nombres = np.array([topico[categoria] for topico in mapeo.values()], dtype=object)
+        return posiciones, nombres
+    
+    @staticmethod
+    def _columna_topicos(num_filas: int, categorias: List[str], resultados: Dict):
+        """
+        Columna 'Topico' ({categoria: tópico} de cada opinión, en el orden de
+        las categorías) a partir de los resultados por posición.
+        
+        Cada categoría aporta una columna de códigos de tópico y cada
+        combinación distinta de tópicos se convierte a texto una sola vez.
+        
+        Returns:
+            Tupla (textos de la columna, matriz de códigos (-1 = sin tópico))
+        """
+        codigos = np.full((num_filas, len(categorias)), -1, dtype=np.int64)
+        vocabularios = []
+        for j, categoria in enumerate(categorias):
+            posiciones, nombres = resultados.get(categoria, (np.empty(0, dtype=np.int64), []))
+            codigos_categoria, vocabulario = pd.factorize(pd.Series(nombres, dtype=object))
+            codigos[posiciones, j] = codigos_categoria
+            vocabularios.append(vocabulario)
         
-        return mapeo_topicos
+        if num_filas == 0 or not categorias:
+            return np.full(num_filas, '{}', dtype=object), codigos
+        combinaciones, inversa = np.unique(codigos, axis=0, return_inverse=True)
+        textos = np.array([
+            str({categorias[j]: vocabularios[j][codigo] for j, codigo in enumerate(fila) if codigo >= 0})
+            for fila in combinaciones
+        ], dtype=object)
+        return textos[inversa.reshape(-1)], codigos
+    
+    @staticmethod
+    def _describir_tarea(num_opiniones: int, pendientes: Optional[np.ndarray], motivo: Optional[str]) -> str:
+        """Texto de progreso de una categoría."""
+        if pendientes is None:
+            return f"{num_opiniones} opiniones - entrenando ({motivo})"
+        return f"{num_opiniones} opiniones - asignando {int(pendientes.sum())} sin tópico"
+    
+    def _numero_procesos(self, num_categorias: int) -> int:
+        """Procesos para analizar las categorías, limitados por núcleos y memoria disponible."""
+        procesos = ConfigTopicos.PROCESOS or (os.cpu_count() or 1)
+        memoria_mb = _memoria_disponible_mb()
+        if memoria_mb is not None:
+            procesos = min(procesos, int(memoria_mb // ConfigTopicos.MEMORIA_PROCESO_MB))
+        return max(1, min(procesos, num_categorias))
+    
+    def _analizar_categorias(self, df: pd.DataFrame, tareas: List, existentes: Optional[List[Dict]]):
+        """
+        Analiza las categorías (en procesos separados si hay más de un
+        proceso disponible) y entrega (categoria, (posiciones, nombres)) de
+        cada una a medida que termina.
+        
+        Args:
+            df: Columnas de entrada de la fase
+            tareas: Lista de (categoria, num_opiniones, textos, posiciones,
+                    estratos, pendientes, motivo); pendientes es None si la
+                    categoría se entrena
+            existentes: Tópicos ya asignados de cada opinión (o None)
+        """
+        embeddings = self._obtener_embeddings(df)
+        procesos = self._numero_procesos(len(tareas))
+        
+        if procesos == 1:
+            for categoria, num_opiniones, textos, posiciones, estratos, pendientes, motivo in tareas:
+                print(f"  • {categoria}: {self._describir_tarea(num_opiniones, pendientes, motivo)}...")
+                nombres, mascara = self._topicos_categoria(
+                    categoria, textos, posiciones, estratos, pendientes, embeddings
+                )
+                yield categoria, self._nombres_categoria(categoria, posiciones, nombres, mascara, existentes)
+            return
+        
+        print(f"  Analizando {len(tareas)} categorías en {procesos} procesos...")
+        hilos = max(1, (os.cpu_count() or 1) // procesos)
+        error = None
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_proceso,
+            initargs=(hilos, str(embeddings.base), embeddings.modelo)
+        ) as pool:
+            # Primero las categorías más grandes: la más lenta marca el tiempo total
+            futuros = {}
+            for categoria, num_opiniones, textos, posiciones, estratos, pendientes, motivo in sorted(
+                tareas, key=lambda t: -(len(t[2]) if t[5] is None else int(t[5].sum()))
+            ):
+                print(f"  • {categoria}: {self._describir_tarea(num_opiniones, pendientes, motivo)}")
+                futuro = pool.submit(
+                    _analizar_en_proceso, categoria, textos, posiciones, estratos, pendientes
+                )
+                futuros[futuro] = (categoria, num_opiniones, posiciones)
+            
+            for futuro in as_completed(futuros):
+                categoria, num_opiniones, posiciones = futuros[futuro]
+                try:
+                    nombres, mascara, metricas = futuro.result()
+                except Exception as e:
+                    # Las demás categorías terminan y quedan guardadas para reanudar
+                    print(f"  ❌ {categoria}: {e}")
+                    error = error or e
+                    continue
+                REGISTRO.agregar_pasos(metricas['pasos'], metricas.get('detalle'))
+                print(f"  ✓ {categoria}: completada")
+                yield categoria, self._nombres_categoria(categoria, posiciones, nombres, mascara, existentes)
+        
+        if error is not None:
+            raise error
+    
+    def _identificador_modelo(self):
+        """Identifica el modelo de embeddings y el LLM usado para etiquetar."""
+        return f"{self.MODELO_EMBEDDINGS}|{LLMProvider.get_info()['modelo']}|min={self.min_opiniones_categoria}"
     
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe la columna 'Topico' en el dataset.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Consulta el manifiesto de ejecución (sin cargar el dataset).
         """
         try:
-            df = pd.read_csv(self.dataset_path)
-            return 'Topico' in df.columns
+            return self.manifiesto.esta_vigente(
+                self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA,
+                self._identificador_modelo()
+            )
         except:
             return False
     
-    def procesar(self, forzar=False):
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA,
+            self._identificador_modelo()
+        )
+    
+    def procesar(self, forzar=False, df=None, guardar=True):
         """
         Procesa el dataset completo:
         1. Identifica categorías con suficientes opiniones
-        2. Aplica BERTopic a cada categoría
+        2. Aplica BERTopic a cada categoría (o asigna las opiniones sin
+           tópico con el modelo guardado de la categoría)
         3. Etiqueta tópicos con LLM
         4. Añade columna 'Topico' al dataset como DICCIONARIO {categoria: topico}
         
         Args:
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria. Si es None,
+                se cargan del almacén solo las columnas de entrada.
+            guardar: Si es True, escribe las columnas de salida en el almacén
+                     y registra la fase en el manifiesto
+        
+        Returns:
+            DataFrame con la columna de salida añadida (o el recibido si se omite)
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
-        
-        # Cargar dataset
-        df = pd.read_csv(self.dataset_path)
+            return df
         
-        # Inicializar diccionario para acumular tópicos por índice
-        topicos_por_indice = {idx: {} for idx in df.index}
+        # Cargar solo las columnas necesarias (y los tópicos previos en modo incremental)
+        if df is None:
+            with medir_paso('carga'):
+                df = self.almacen.leer(
+                    columnas_con_resultados(self.almacen, self.COLUMNAS_ENTRADA, self.COLUMNAS_SALIDA)
+                )
+        registrar_filas(len(df))
         
-        # Extraer todas las categorías únicas
-        todas_categorias = set()
-        for cats in df['Categorias']:
-            if pd.notna(cats):
-                # Parsear la lista de categorías (formato string de lista)
-                cats_str = str(cats).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',')]
-                todas_categorias.update(cats_list)
+        # Tópicos de una ejecución anterior: solo en modo incremental y con el
+        # mismo modelo (igual que filas_pendientes en las fases 02-04)
+        existentes = None
+        if resultados_vigentes(df, self.COLUMNAS_SALIDA, self.manifiesto, self.NOMBRE_FASE,
+                               self._identificador_modelo()):
+            existentes = self._topicos_existentes(df)
         
-        # Filtrar categorías válidas (no vacías)
-        categorias_validas = [c for c in todas_categorias if c and c.strip()]
+        # Filas de cada categoría presente (una sola pasada sobre la máscara de
+        # bits de la Fase 04)
+        mascaras = cats.mascaras(df)
+        posiciones_categorias = cats.posiciones_por_categoria(mascaras)
+        categorias_validas = list(posiciones_categorias)
+        con_texto = df['TituloReview'].notna().to_numpy()
         
         print(f"Analizando {len(categorias_validas)} categorías únicas...")
         
-        categorias_procesadas = 0
+        # Categorías ya analizadas en una ejecución interrumpida
+        progreso = ProgresoCategorias(
+            self.NOMBRE_FASE, self._identificador_modelo(), df[self.COLUMNAS_ENTRADA]
+        )
         
-        # Procesar cada categoría
+        # (posiciones, nombres de tópico) de cada categoría analizada
+        resultados = {}
+        tareas = []
         for categoria in categorias_validas:
+            if categoria in progreso.categorias:
+                resultados[categoria] = self._desde_progreso(df, categoria, progreso.categorias[categoria])
+                continue
+            
             # Contar opiniones en esta categoría
-            mask = df['Categorias'].apply(lambda x: categoria in str(x))
-            num_opiniones = mask.sum()
+            num_opiniones = len(posiciones_categorias[categoria])
             
             if num_opiniones < self.min_opiniones_categoria:
                 continue
             
-            print(f"  • {categoria}: {num_opiniones} opiniones - procesando...")
-            
-            # Analizar sub-tópicos
-            mapeo_topicos = self._analizar_categoria(df, categoria)
-            
-            # Asignar tópicos al diccionario (ACUMULATIVO - múltiples tópicos por reseña)
-            for idx, topico_dict in mapeo_topicos.items():
-                topicos_por_indice[idx].update(topico_dict)
+            textos, posiciones = self._seleccionar_categoria(df, posiciones_categorias[categoria], con_texto)
+            if not textos:
+                resultados[categoria] = (posiciones, np.empty(0, dtype=object))
+                progreso.registrar(categoria, {})
+                continue
             
-            categorias_procesadas += 1
+            # Con modelo guardado solo se asignan las opiniones sin tópico en la categoría
+            motivo = self._motivo_reentrenamiento(categoria, len(textos))
+            pendientes = None
+            if motivo is None:
+                pendientes = np.ones(len(textos), dtype=bool) if existentes is None else np.array(
+                    [categoria not in existentes[posicion] for posicion in posiciones], dtype=bool
+                )
+                if not pendientes.any():
+                    resultados[categoria] = self._nombres_categoria(
+                        categoria, posiciones, [], np.zeros(len(textos), dtype=bool), existentes
+                    )
+                    continue
+            tareas.append((categoria, num_opiniones, textos, posiciones, mascaras[posiciones],
+                           pendientes, motivo))
+        
+        # Analizar sub-tópicos (cada categoría se guarda al terminar)
+        if tareas:
+            for categoria, resultado in self._analizar_categorias(df, tareas, existentes):
+                resultados[categoria] = resultado
+                progreso.registrar(categoria, self._a_progreso(df, categoria, *resultado))
         
-        # Convertir diccionarios a strings para guardar en CSV
-        df['Topico'] = [str(topicos_por_indice[idx]) if topicos_por_indice[idx] else '{}' 
-                       for idx in df.index]
+        # Asignar tópicos en el orden de las categorías (ACUMULATIVO - múltiples
+        # tópicos por reseña), sin importar el orden en que terminaron; se
+        # guardan como texto del diccionario para el CSV
+        categorias_procesadas = len(resultados)
+        df['Topico'], codigos = self._columna_topicos(len(df), categorias_validas, resultados)
         
-        # Guardar dataset actualizado
-        df.to_csv(self.dataset_path, index=False)
+        # Guardar solo la columna nueva
+        if guardar:
+            with medir_paso('escritura', filas=len(df)):
+                self.almacen.escribir_columnas(df[self.COLUMNAS_SALIDA])
+            self._registrar_manifiesto()
+        progreso.eliminar()
+        if self.embeddings is not None:
+            self.embeddings.cerrar()
+            self.embeddings = None
         
         # Estadísticas
-        num_con_topico = sum(1 for idx in df.index if topicos_por_indice[idx])
-        total_topicos = sum(len(topicos_por_indice[idx]) for idx in df.index)
+        num_con_topico = int((codigos >= 0).any(axis=1).sum())
+        total_topicos = int((codigos >= 0).sum())
         promedio_topicos = total_topicos / num_con_topico if num_con_topico > 0 else 0
         
         print(f"✅ Análisis de tópicos completado.")
         print(f"   • Categorías procesadas: {categorias_procesadas}")
         print(f"   • Opiniones con tópico asignado: {num_con_topico}/{len(df)}")
         print(f"   • Promedio de tópicos por opinión: {promedio_topicos:.2f}")
+        
+        return df
+
+
+# ========== MUESTRA DE ENTRENAMIENTO ==========
+
+def muestra_estratificada(estratos: np.ndarray, tamano: int, semilla: int = 42) -> np.ndarray:
+    """
+    Muestra aleatoria estratificada con asignación proporcional (cada estrato
+    aporta según su tamaño; los restos se reparten por mayor fracción).
+    
+    Args:
+        estratos: Estrato de cada elemento (ej. máscara de categorías)
+        tamano: Tamaño de la muestra
+        semilla: Semilla del generador (muestra reproducible)
+    
+    Returns:
+        Posiciones de los elementos elegidos, ordenadas
+    """
+    n = len(estratos)
+    if tamano >= n:
+        return np.arange(n)
+    _, inversa, conteos = np.unique(estratos, return_inverse=True, return_counts=True)
+    inversa = inversa.reshape(-1)
+    cuotas = conteos * tamano / n
+    asignados = np.floor(cuotas).astype(np.int64)
+    faltantes = tamano - int(asignados.sum())
+    asignados[np.argsort(-(cuotas - asignados), kind='stable')[:faltantes]] += 1
+    
+    # Orden aleatorio dentro de cada estrato; se toman los primeros de cada uno
+    orden = np.random.default_rng(semilla).permutation(n)
+    orden = orden[np.argsort(inversa[orden], kind='stable')]
+    inicios = np.repeat(np.cumsum(conteos) - conteos, conteos)
+    rango = np.arange(n) - inicios
+    return np.sort(orden[rango < np.repeat(asignados, conteos)])
+
+
+# ========== ANÁLISIS EN PROCESOS SEPARADOS ==========
+
+# Estado de cada proceso de análisis (ver _inicializar_proceso)
+_ANALIZADOR = None
+_EMBEDDINGS = None
+
+
+def _memoria_disponible_mb():
+    """Memoria disponible del sistema (MB), o None si no se puede medir."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for linea in f:
+                if linea.startswith('MemAvailable:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _inicializar_proceso(hilos: int, base_embeddings: str, modelo_embeddings: str):
+    """
+    Prepara un proceso de análisis: limita sus hilos para no sobre-suscribir
+    la CPU y abre los embeddings compartidos en modo lectura.
+    """
+    global _ANALIZADOR, _EMBEDDINGS
+    os.environ['OMP_NUM_THREADS'] = str(hilos)
+    os.environ['MKL_NUM_THREADS'] = str(hilos)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(hilos)
+    except ImportError:
+        pass
+    try:
+        import numba
+        numba.set_num_threads(min(hilos, numba.config.NUMBA_NUM_THREADS))
+    except ImportError:
+        pass
+    _ANALIZADOR = AnalizadorJerarquicoTopicos()
+    _EMBEDDINGS = EmbeddingsDataset(base_embeddings, modelo_embeddings).abrir()
+
+
+def _analizar_en_proceso(categoria: str, textos: List[str], posiciones: np.ndarray,
+                         estratos: np.ndarray, pendientes: Optional[np.ndarray]):
+    """
+    Analiza una categoría en un proceso separado.
+    
+    Returns:
+        Tupla (nombres, máscara, métricas de la categoría); ver
+        AnalizadorJerarquicoTopicos._topicos_categoria
+    """
+    clave = AnalizadorJerarquicoTopicos.NOMBRE_FASE
+    with REGISTRO.medir_fase(clave, proceso='separado'):
+        nombres, mascara = _ANALIZADOR._topicos_categoria(
+            categoria, textos, posiciones, estratos, pendientes, _EMBEDDINGS
+        )
+    return nombres, mascara, REGISTRO.fases[clave]
@@ -5,6 +5,7 @@ Genera resúmenes estratégicos seleccionando reseñas representativas
 y usando LLM para crear insights profesionales para turismólogos.
 """
 
+import numpy as np
 import pandas as pd
 import json
 import os
@@ -18,7 +19,11 @@ warnings.filterwarnings('ignore')
 from dotenv import load_dotenv
 
 # Importar proveedor de LLM unificado
-from .llm_provider import get_llm, crear_chain
+from .llm_provider import get_llm, crear_chain, LLMProvider
+from .almacen_dataset import AlmacenDataset
+from .manifiesto import ManifiestoEjecucion
+from .matrices_scores import MatrizScores, convertir_json
+from .metricas import medir_paso, registrar_filas
 
 # Cargar variables de entorno
 load_dotenv()
@@ -33,7 +38,11 @@ class ResumidorInteligente:
     4. Múltiples formatos de resumen configurables
     """
     
-    def __init__(self, top_n_subtopicos: int = 3, incluir_neutros: bool = False):
+    NOMBRE_FASE = 'fase_06'
+    COLUMNAS_ENTRADA = ['TituloReview', 'FechaEstadia', 'Sentimiento', 'Subjetividad', 'Categorias', 'Topico']
+    
+    def __init__(self, top_n_subtopicos: int = 3, incluir_neutros: bool = False,
+                 min_confianza_sentimiento: float = 0.0):
         """
         Inicializa el resumidor.
         
@@ -44,37 +53,64 @@ class ResumidorInteligente:
             incluir_neutros: Si True, incluye reseñas con sentimiento Neutro.
                             Si False, solo usa Positivo y Negativo (más eficiente).
                             Default: False (recomendado para resúmenes accionables)
+            min_confianza_sentimiento: Probabilidad mínima del modelo de sentimientos
+                            (Fase 02) para usar una reseña. Descarta reseñas con
+                            sentimiento ambiguo. Default: 0.0 (sin filtro)
         """
         self.dataset_path = 'data/dataset.csv'
-        self.scores_path = 'data/shared/categorias_scores.json'
+        self.almacen = AlmacenDataset(self.dataset_path)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
+        self.scores = MatrizScores('data/shared/categorias_scores')
+        self.scores_sentimiento = MatrizScores('data/shared/sentimientos_scores')
         self.output_path = Path('data/shared/resumenes.json')
         self.top_n_subtopicos = top_n_subtopicos
         self.incluir_neutros = incluir_neutros
+        self.min_confianza_sentimiento = min_confianza_sentimiento
         
         self.df = None
-        self.scores = None
+        self.categoria_dominante = None
+        self.confianza_sentimiento = None
         self.llm = None
         
-    def _cargar_datos(self):
-        """Carga el dataset y las probabilidades de categorías."""
-        # Cargar dataset
-        if not os.path.exists(self.dataset_path):
-            raise FileNotFoundError(f"Dataset no encontrado: {self.dataset_path}")
+    def _cargar_datos(self, df: Optional[pd.DataFrame] = None):
+        """
+        Carga el dataset y las probabilidades de categorías.
         
-        self.df = pd.read_csv(self.dataset_path)
+        Args:
+            df: DataFrame compartido del pipeline en memoria (opcional)
+        """
+        # Cargar dataset (o reutilizar el DataFrame en memoria)
+        if df is not None:
+            self.df = df
+        elif not self.almacen.existe():
+            raise FileNotFoundError(f"Dataset no encontrado: {self.dataset_path}")
+        else:
+            self.df = self.almacen.leer()
+        
+        # Cargar scores de categorías (matriz mapeada en memoria, sin copiarla)
+        if not self.scores.existe():
+            ruta_json = self.scores.base.with_suffix('.json')
+            if not ruta_json.exists():
+                raise FileNotFoundError(
+                    f"Probabilidades de categorías no encontradas: {self.scores.ruta_matriz}\n"
+                    "Asegúrate de ejecutar primero la Fase 04."
+                )
+            # Formato anterior (JSON): convertir una sola vez
+            convertir_json(ruta_json, self.scores.base)
         
-        # Cargar scores de categorías
-        if not os.path.exists(self.scores_path):
-            raise FileNotFoundError(
-                f"Probabilidades de categorías no encontradas: {self.scores_path}\n"
-                "Asegúrate de ejecutar primero la Fase 04."
-            )
+        self.scores.leer()
+        self.categoria_dominante = self.scores.etiqueta_dominante()
         
-        with open(self.scores_path, 'r', encoding='utf-8') as f:
-            self.scores = json.load(f)
+        # Confianza del modelo de sentimientos (solo si se filtra por ella)
+        if self.min_confianza_sentimiento > 0:
+            if self.scores_sentimiento.existe():
+                self.confianza_sentimiento = self.scores_sentimiento.leer().confianza()
+            else:
+                print(f"   ⚠️  Probabilidades de sentimiento no encontradas "
+                      f"({self.scores_sentimiento.ruta_matriz}): no se filtra por confianza")
         
         print(f"   • Dataset cargado: {len(self.df)} reseñas")
-        print(f"   • Probabilidades cargadas: {len(self.scores)} registros")
+        print(f"   • Probabilidades cargadas: {len(self.scores.ids)} registros")
     
     def _obtener_categoria_dominante(self, idx: int) -> Optional[str]:
         """
@@ -86,18 +122,7 @@ class ResumidorInteligente:
         Returns:
             Nombre de la categoría con mayor probabilidad, o None si no hay
         """
-        if str(idx) not in self.scores:
-            return None
-        
-        categoria_scores = self.scores[str(idx)]
-        
-        if not categoria_scores:
-            return None
-        
-        # Obtener categoría con mayor probabilidad
-        categoria_dominante = max(categoria_scores.items(), key=lambda x: x[1])
-        
-        return categoria_dominante[0]
+        return self.categoria_dominante.get(idx)
     
     def _obtener_topico_para_categoria(self, idx: int, categoria: str) -> Optional[str]:
         """
@@ -154,10 +179,19 @@ class ResumidorInteligente:
             if eliminadas > 0:
                 print(f"   ✓ Sentimientos neutros excluidos: {eliminadas} reseñas")
         
+        # 2b. Filtrar sentimientos ambiguos (probabilidad del modelo baja)
+        if self.confianza_sentimiento is not None:
+            antes_filtro = len(df_filtrado)
+            # Las reseñas sin probabilidades guardadas se conservan
+            confianza = np.asarray(df_filtrado.index.map(self.confianza_sentimiento), dtype=float)
+            df_filtrado = df_filtrado[np.isnan(confianza) | (confianza >= self.min_confianza_sentimiento)]
+            eliminadas = antes_filtro - len(df_filtrado)
+            if eliminadas > 0:
+                print(f"   ✓ Sentimientos con confianza < {self.min_confianza_sentimiento}: "
+                      f"{eliminadas} reseñas excluidas")
+        
         # 3. Agregar categoría dominante
-        df_filtrado['CategoriaDominante'] = df_filtrado.index.map(
-            lambda idx: self._obtener_categoria_dominante(idx)
-        )
+        df_filtrado['CategoriaDominante'] = df_filtrado.index.map(self.categoria_dominante)
         
         # Eliminar filas sin categoría dominante
         df_filtrado = df_filtrado[df_filtrado['CategoriaDominante'].notna()]
@@ -341,10 +375,11 @@ Enfócate en información accionable y relevante para la toma de decisiones."""
         # Usar el proveedor de LLM unificado
         chain = crear_chain(template)
         
-        resumen = chain.invoke({
-            "categoria": categoria,
-            "reseñas": contexto_reseñas
-        })
+        with medir_paso('llm', llamadas_llm=1):
+            resumen = chain.invoke({
+                "categoria": categoria,
+                "reseñas": contexto_reseñas
+            })
         
         return resumen.strip()
     
@@ -410,7 +445,8 @@ Enfócate en información accionable para la toma de decisiones de gestión tur
         # Usar el proveedor de LLM unificado
         chain = crear_chain(template)
         
-        resumen_global = chain.invoke({"resumenes": contexto})
+        with medir_paso('llm', llamadas_llm=1):
+            resumen_global = chain.invoke({"resumenes": contexto})
         
         return resumen_global.strip()
     
@@ -442,6 +478,7 @@ Enfócate en información accionable para la toma de decisiones de gestión tur
                 "tipos_resumen": tipos_resumen,
                 "top_subtopicos_por_categoria": self.top_n_subtopicos,
                 "incluir_neutros": self.incluir_neutros,
+                "min_confianza_sentimiento": self.min_confianza_sentimiento,
                 "sentimientos_incluidos": ['Positivo', 'Neutro', 'Negativo'] if self.incluir_neutros else ['Positivo', 'Negativo'],
                 "reduccion_porcentaje": round(
                     (1 - len(df_seleccionado) / len(self.df)) * 100, 2
@@ -505,14 +542,40 @@ Enfócate en información accionable para la toma de decisiones de gestión tur
         
         print(f"\n   ✓ Resúmenes guardados en: {self.output_path}")
     
+    def _identificador_modelo(self):
+        """Identifica el LLM y los parámetros de selección de reseñas."""
+        identificador = (f"{LLMProvider.get_info()['modelo']}|top={self.top_n_subtopicos}"
+                         f"|neutros={self.incluir_neutros}")
+        if self.min_confianza_sentimiento > 0:
+            identificador += f"|confianza={self.min_confianza_sentimiento}"
+        return identificador
+    
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe el archivo de resúmenes.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Revisa si existe el archivo de resúmenes y si sus entradas no cambiaron.
         """
-        return self.output_path.exists()
+        try:
+            return self.output_path.exists() and self.manifiesto.esta_vigente(
+                self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, [], self._identificador_modelo()
+            )
+        except:
+            return False
+    
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self.COLUMNAS_ENTRADA, [], self._identificador_modelo(),
+            archivo_salida=str(self.output_path)
+        )
     
-    def procesar(self, tipos_resumen: List[str] = None, forzar: bool = False):
+    def procesar(
+        self,
+        tipos_resumen: List[str] = None,
+        forzar: bool = False,
+        df: Optional[pd.DataFrame] = None,
+        guardar: bool = True
+    ):
         """
         Ejecuta el pipeline completo de generación de resúmenes.
         
@@ -521,10 +584,15 @@ Enfócate en información accionable para la toma de decisiones de gestión tur
                           Opciones: 'descriptivo', 'estructurado', 'insights'
                           Por defecto: ['descriptivo', 'estructurado', 'insights']
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria (opcional)
+            guardar: Si es True, registra la fase en el manifiesto
+        
+        Returns:
+            El DataFrame recibido (la fase no modifica el dataset)
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
+            return df
         # Validar tipos de resumen
         tipos_validos = {'descriptivo', 'estructurado', 'insights'}
         
@@ -542,21 +610,29 @@ Enfócate en información accionable para la toma de decisiones de gestión tur
         print(f"Tipos de resumen solicitados: {', '.join(tipos_resumen)}")
         
         # 1. Cargar datos
-        self._cargar_datos()
+        with medir_paso('carga'):
+            self._cargar_datos(df)
+        registrar_filas(len(self.df))
         
         # 2. Seleccionar reseñas representativas
-        df_seleccionado = self._seleccionar_reseñas_representativas()
+        with medir_paso('seleccion', filas=len(self.df)):
+            df_seleccionado = self._seleccionar_reseñas_representativas()
         
         if len(df_seleccionado) == 0:
             print("⚠️  No se encontraron reseñas representativas. Verifica el dataset.")
-            return
+            return df
         
         # 3. Generar resúmenes
         resultado = self._generar_resumenes(df_seleccionado, tipos_resumen)
         
         # 4. Guardar resultado
-        self._guardar_resultado(resultado)
+        with medir_paso('escritura'):
+            self._guardar_resultado(resultado)
+        if guardar:
+            self._registrar_manifiesto()
         
         print(f"\n✅ Resúmenes generados exitosamente")
         print(f"   • Categorías resumidas: {len(resultado['resumenes'][tipos_resumen[0]]['por_categoria'])}")
         print(f"   • Tipos de resumen: {len(tipos_resumen)}")
+        
+        return df
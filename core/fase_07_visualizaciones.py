@@ -24,7 +24,7 @@ import pandas as pd
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -35,6 +35,9 @@ from .visualizaciones.generador_categorias import GeneradorCategorias
 from .visualizaciones.generador_topicos import GeneradorTopicos
 from .visualizaciones.generador_temporal import GeneradorTemporal
 from .visualizaciones.utils import configurar_estilo_grafico
+from .almacen_dataset import AlmacenDataset
+from .manifiesto import ManifiestoEjecucion
+from .metricas import medir_paso, registrar_filas
 
 
 class GeneradorVisualizaciones:
@@ -45,15 +48,23 @@ class GeneradorVisualizaciones:
     y características de los datos disponibles.
     """
     
+    NOMBRE_FASE = 'fase_07'
+    COLUMNAS_ENTRADA = [
+        'TituloReview', 'FechaEstadia', 'Calificacion',
+        'Sentimiento', 'Subjetividad', 'Categorias', 'CategoriasMascara', 'Topico'
+    ]
+    
     def __init__(self, dataset_path='data/dataset.csv', output_dir='data/visualizaciones'):
         """
         Inicializa el generador de visualizaciones.
         
         Args:
-            dataset_path: Ruta al dataset CSV procesado
+            dataset_path: Ruta al dataset CSV procesado (o a su almacén columnar)
             output_dir: Directorio de salida para las visualizaciones
         """
         self.dataset_path = Path(dataset_path)
+        self.almacen = AlmacenDataset(self.dataset_path)
+        self.manifiesto = ManifiestoEjecucion(self.almacen)
         self.output_dir = Path(output_dir)
         self.df = None
         self.validador = None
@@ -62,12 +73,29 @@ class GeneradorVisualizaciones:
     
     def ya_procesado(self):
         """
-        Verifica si esta fase ya fue ejecutada.
-        Revisa si existe el directorio de visualizaciones con archivos.
+        Verifica si esta fase ya fue ejecutada y sigue vigente.
+        Revisa si existen visualizaciones y si el dataset no cambió desde entonces.
         """
-        return self.output_dir.exists() and len(list(self.output_dir.glob('*.png'))) > 0
+        try:
+            return (self.output_dir.exists()
+                    and len(list(self.output_dir.glob('*.png'))) > 0
+                    and self.manifiesto.esta_vigente(self.NOMBRE_FASE, self._columnas_entrada(), []))
+        except:
+            return False
+    
+    def _columnas_entrada(self):
+        """Columnas de entrada presentes en el dataset."""
+        disponibles = set(self.almacen.columnas())
+        return [c for c in self.COLUMNAS_ENTRADA if c in disponibles]
+    
+    def _registrar_manifiesto(self):
+        """Registra la fase como completada en el manifiesto."""
+        self.manifiesto.registrar(
+            self.NOMBRE_FASE, self._columnas_entrada(), [],
+            directorio_salida=str(self.output_dir)
+        )
     
-    def procesar(self, forzar=False):
+    def procesar(self, forzar=False, df: Optional[pd.DataFrame] = None, guardar=True):
         """
         Pipeline principal de generación de visualizaciones.
         
@@ -79,19 +107,27 @@ class GeneradorVisualizaciones:
         
         Args:
             forzar: Si es True, ejecuta incluso si ya fue procesado
+            df: DataFrame compartido del pipeline en memoria (opcional)
+            guardar: Si es True, registra la fase en el manifiesto
+        
+        Returns:
+            El DataFrame recibido (la fase no modifica el dataset)
         """
         if not forzar and self.ya_procesado():
             print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
-            return
+            return df
         print("\n" + "="*60)
         print("FASE 07: GENERACIÓN DE VISUALIZACIONES")
         print("="*60)
         
         # 1. Cargar datos
-        self._cargar_datos()
+        with medir_paso('carga'):
+            self._cargar_datos(df)
+        registrar_filas(len(self.df))
         
         # 2. Validar dataset
-        self._validar_dataset()
+        with medir_paso('validacion', filas=len(self.df)):
+            self._validar_dataset()
         
         # 3. Configurar estilo
         configurar_estilo_grafico()
@@ -110,6 +146,8 @@ class GeneradorVisualizaciones:
         
         # 6. Generar reporte final
         self._generar_reporte_final()
+        if guardar:
+            self._registrar_manifiesto()
         
         print("\n" + "="*60)
         print("✅ Visualizaciones generadas exitosamente")
@@ -118,16 +156,28 @@ class GeneradorVisualizaciones:
         print(f"   • Guardadas en: {self.output_dir}/")
         print(f"   • Reporte: {self.output_dir}/reporte_generacion.json")
         print("="*60)
+        
+        return df
     
-    def _cargar_datos(self):
-        """Carga el dataset procesado."""
-        if not self.dataset_path.exists():
+    def _cargar_datos(self, df: Optional[pd.DataFrame] = None):
+        """
+        Carga el dataset procesado.
+        
+        Args:
+            df: DataFrame compartido del pipeline en memoria (opcional)
+        """
+        if df is not None:
+            self.df = df
+            print(f"\n📂 Dataset en memoria: {len(self.df)} opiniones")
+            return
+        
+        if not self.almacen.existe():
             raise FileNotFoundError(
                 f"Dataset no encontrado: {self.dataset_path}\n"
                 "Asegúrate de ejecutar las Fases 01-06 primero."
             )
         
-        self.df = pd.read_csv(self.dataset_path)
+        self.df = self.almacen.leer()
         print(f"\n📂 Dataset cargado: {len(self.df)} opiniones")
     
     def _validar_dataset(self):
@@ -175,8 +225,9 @@ class GeneradorVisualizaciones:
         print(f"\n   [{nombre}] Generando visualizaciones...")
         
         try:
-            generador = GeneradorClass(self.df, self.validador, self.output_dir)
-            generadas = generador.generar_todas()
+            with medir_paso(f'visualizaciones_{nombre.lower()}'):
+                generador = GeneradorClass(self.df, self.validador, self.output_dir)
+                generadas = generador.generar_todas()
             
             self.visualizaciones_generadas.extend(generadas)
             
@@ -0,0 +1,122 @@
+"""
+Modo Incremental
+================
+Utilidades para procesar solo las reseñas nuevas del dataset.
+
+- Cada reseña recibe un identificador estable (IdResena) calculado a partir
+  del texto normalizado de 'TituloReview' y la fecha de estadía.
+- Las fases de inferencia (02-04) solo analizan las filas cuyas columnas de
+  salida están vacías; los resultados existentes se conservan.
+- La Fase 05 solo conserva los tópicos existentes bajo las mismas
+  condiciones (ver resultados_vigentes).
+
+Se activa con DATASET_INCREMENTAL=true (ver ConfigAlmacenamiento).
+"""
+
+import hashlib
+import re
+from typing import List
+
+import pandas as pd
+
+from config import ConfigAlmacenamiento
+
+
+COLUMNA_ID = 'IdResena'
+
+
+def normalizar_texto(texto) -> str:
+    """Normaliza un texto para el identificador (minúsculas, espacios colapsados)."""
+    if pd.isna(texto):
+        return ''
+    return re.sub(r'\s+', ' ', str(texto)).strip().lower()
+
+
+def calcular_ids(df: pd.DataFrame) -> pd.Series:
+    """
+    Calcula el identificador estable de cada reseña.
+
+    Args:
+        df: DataFrame con 'TituloReview' y 'FechaEstadia'
+
+    Returns:
+        Serie con el hash (16 caracteres hex) de texto normalizado + fecha
+    """
+    fechas = pd.to_datetime(df['FechaEstadia'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+    ids = [
+        hashlib.sha1(f'{normalizar_texto(texto)}|{fecha}'.encode('utf-8')).hexdigest()[:16]
+        for texto, fecha in zip(df['TituloReview'], fechas)
+    ]
+    return pd.Series(ids, index=df.index, name=COLUMNA_ID)
+
+
+def resultados_vigentes(df: pd.DataFrame, columnas_salida: List[str], manifiesto, fase: str, modelo=None) -> bool:
+    """
+    Indica si los resultados de una fase presentes en df se pueden conservar:
+    modo incremental, columnas de salida presentes y última ejecución de la
+    fase completada con el mismo modelo.
+
+    Args:
+        df: DataFrame de la fase (puede incluir sus columnas de salida)
+        columnas_salida: Columnas que genera la fase
+        manifiesto: ManifiestoEjecucion del dataset
+        fase: Identificador de la fase (ej. 'fase_05')
+        modelo: Identificador del modelo actual
+    """
+    if not ConfigAlmacenamiento.INCREMENTAL:
+        return False
+    if not set(columnas_salida).issubset(df.columns):
+        return False
+
+    registro = manifiesto.obtener(fase)
+    return registro is not None and registro.get('estado') == 'completada' and registro.get('modelo') == modelo
+
+
+def filas_pendientes(df: pd.DataFrame, columnas_salida: List[str], manifiesto, fase: str, modelo=None) -> pd.Series:
+    """
+    Determina qué filas debe analizar una fase.
+
+    En modo incremental solo son pendientes las filas sin resultado, siempre
+    que los resultados existentes se hayan generado con el mismo modelo. En
+    cualquier otro caso todas las filas son pendientes.
+
+    Args:
+        df: DataFrame de la fase (puede incluir sus columnas de salida)
+        columnas_salida: Columnas que genera la fase
+        manifiesto: ManifiestoEjecucion del dataset
+        fase: Identificador de la fase (ej. 'fase_02')
+        modelo: Identificador del modelo actual
+
+    Returns:
+        Serie booleana (True = la fila debe analizarse)
+    """
+    if not resultados_vigentes(df, columnas_salida, manifiesto, fase, modelo):
+        return pd.Series(True, index=df.index)
+
+    pendientes = df[columnas_salida].isna().any(axis=1)
+    print(f"   • Modo incremental: {int(pendientes.sum())} de {len(df)} opiniones pendientes")
+    return pendientes
+
+
+def asignar_resultados(df: pd.DataFrame, columna: str, pendientes: pd.Series, valores) -> pd.DataFrame:
+    """Escribe los resultados de las filas pendientes conservando los existentes."""
+    if pendientes.all():
+        df[columna] = list(valores)
+        return df
+
+    if columna not in df.columns:
+        df[columna] = None
+    df[columna] = df[columna].astype(object)
+    df.loc[pendientes, columna] = list(valores)
+    return df
+
+
+def columnas_con_resultados(almacen, columnas_entrada: List[str], columnas_salida: List[str]) -> List[str]:
+    """
+    Columnas a cargar del almacén: las de entrada y, en modo incremental,
+    las de salida ya existentes (para conservar sus resultados).
+    """
+    if not ConfigAlmacenamiento.INCREMENTAL:
+        return list(columnas_entrada)
+    disponibles = set(almacen.columnas())
+    return list(columnas_entrada) + [c for c in columnas_salida if c in disponibles]
@@ -0,0 +1,153 @@
+"""
+Manifiesto de Ejecución
+=======================
+Registro JSON junto al dataset con el estado de cada fase del pipeline:
+- Estado de completitud
+- Huella de las columnas de entrada y de salida
+- Identificador del modelo utilizado
+- Columnas generadas
+
+Permite decidir si una fase puede omitirse con una consulta de metadatos
+(sin cargar el dataset) y detectar salidas obsoletas: si cambian las
+columnas de entrada o el modelo, la fase deja de estar vigente.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .almacen_dataset import bloqueo_archivo
+
+
+class ManifiestoEjecucion:
+    """
+    Manifiesto de ejecución de las fases del pipeline.
+    Se guarda en data/manifiesto_ejecucion.json (junto al dataset).
+    """
+
+    NOMBRE_ARCHIVO = 'manifiesto_ejecucion.json'
+
+    def __init__(self, almacen):
+        """
+        Inicializa el manifiesto.
+
+        Args:
+            almacen: AlmacenDataset del que se obtienen las huellas de columnas
+        """
+        self.almacen = almacen
+        self.ruta = Path(almacen.ruta_csv).parent / self.NOMBRE_ARCHIVO
+
+    def obtener(self, fase: str) -> Optional[Dict]:
+        """Retorna el registro de una fase, o None si no existe."""
+        return self._leer().get(fase)
+
+    def esta_vigente(
+        self,
+        fase: str,
+        columnas_entrada: List[str],
+        columnas_salida: List[str],
+        modelo: Optional[str] = None
+    ) -> bool:
+        """
+        Verifica si la fase está completada y sus salidas siguen vigentes.
+
+        Una fase está vigente si su registro está completado, la huella de
+        entrada y el modelo coinciden con los actuales y las columnas de
+        salida no fueron modificadas desde el registro.
+
+        Si no existe registro (datasets anteriores al manifiesto) se
+        considera vigente cuando todas las columnas de salida existen.
+
+        Args:
+            fase: Identificador de la fase (ej. 'fase_02')
+            columnas_entrada: Columnas que la fase lee
+            columnas_salida: Columnas que la fase genera
+            modelo: Identificador del modelo utilizado
+
+        Returns:
+            True si la fase puede omitirse
+        """
+        registro = self.obtener(fase)
+
+        if registro is None:
+            disponibles = set(self.almacen.columnas())
+            return set(columnas_salida).issubset(disponibles)
+
+        if registro.get('estado') != 'completada':
+            return False
+
+        if registro.get('modelo') != modelo:
+            return False
+
+        huella_entrada = self.almacen.huella(columnas_entrada)
+        if huella_entrada is None or huella_entrada != registro.get('hash_entrada'):
+            return False
+
+        huella_salida = self.almacen.huella(columnas_salida)
+        return huella_salida is not None and huella_salida == registro.get('hash_salida')
+
+    def registrar(
+        self,
+        fase: str,
+        columnas_entrada: List[str],
+        columnas_salida: List[str],
+        modelo: Optional[str] = None,
+        **extra
+    ):
+        """
+        Registra una fase como completada con las huellas actuales.
+
+        Debe llamarse después de escribir las columnas de salida.
+
+        Args:
+            fase: Identificador de la fase
+            columnas_entrada: Columnas que la fase leyó
+            columnas_salida: Columnas que la fase escribió
+            modelo: Identificador del modelo utilizado
+            **extra: Información adicional a guardar en el registro
+        """
+        registro = {
+            'estado': 'completada',
+            'fecha': datetime.now().isoformat(),
+            'hash_entrada': self.almacen.huella(columnas_entrada),
+            'hash_salida': self.almacen.huella(columnas_salida),
+            'modelo': modelo,
+            'columnas_entrada': list(columnas_entrada),
+            'columnas_salida': list(columnas_salida),
+            **extra
+        }
+        with self._bloqueo():
+            manifiesto = self._leer()
+            manifiesto[fase] = registro
+            self._guardar(manifiesto)
+
+    def invalidar(self, fases: Iterable[str]):
+        """Marca fases como obsoletas para forzar su re-ejecución."""
+        with self._bloqueo():
+            manifiesto = self._leer()
+            for fase in fases:
+                if fase in manifiesto:
+                    manifiesto[fase]['estado'] = 'obsoleta'
+            self._guardar(manifiesto)
+
+    def _bloqueo(self):
+        # Fases en procesos separados pueden registrar a la vez
+        return bloqueo_archivo(self.ruta.with_name(self.ruta.name + '.lock'))
+
+    def _leer(self) -> Dict:
+        if not self.ruta.exists():
+            return {}
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _guardar(self, manifiesto: Dict):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta_tmp = self.ruta.with_name(self.ruta.name + '.tmp')
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+        os.replace(ruta_tmp, self.ruta)
@@ -0,0 +1,193 @@
+"""
+Matrices de Scores
+==================
+Almacenamiento compacto de las probabilidades por fila de un modelo
+(por ejemplo, las 12 categorías de la Fase 04).
+
+Cada matriz se guarda como tres archivos con la misma base:
+- <base>.npy: matriz (n_filas, n_etiquetas) en float16 o float32
+- <base>.ids.npy: posición en el dataset de cada fila de la matriz (int64)
+- <base>.meta.json: etiquetas (orden de las columnas), filas y tipo
+
+La lectura usa memory-mapping: los consumidores acceden a la matriz sin
+copiarla ni parsearla.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from config import ConfigAlmacenamiento
+
+
+class MatrizScores:
+    """Matriz de probabilidades en disco (ver docstring del módulo)."""
+
+    def __init__(self, base):
+        """
+        Args:
+            base: Ruta sin extensión (ej. 'data/shared/categorias_scores')
+        """
+        self.base = Path(base)
+        self.ruta_matriz = self.base.with_name(self.base.name + '.npy')
+        self.ruta_ids = self.base.with_name(self.base.name + '.ids.npy')
+        self.ruta_meta = self.base.with_name(self.base.name + '.meta.json')
+        self.etiquetas: Optional[List[str]] = None
+        self.ids: Optional[np.ndarray] = None
+        self.matriz: Optional[np.ndarray] = None
+
+    def existe(self) -> bool:
+        return self.ruta_meta.exists() and self.ruta_matriz.exists() and self.ruta_ids.exists()
+
+    @staticmethod
+    def _temporal(ruta: Path) -> Path:
+        # np.save agrega '.npy' si la ruta no termina así
+        return ruta.with_name(ruta.name[:-len('.npy')] + '.tmp.npy')
+
+    def _confirmar(self, etiquetas: List[str], filas: int, dtype):
+        """Reemplaza los archivos definitivos (la meta al final)."""
+        os.replace(self._temporal(self.ruta_matriz), self.ruta_matriz)
+        os.replace(self._temporal(self.ruta_ids), self.ruta_ids)
+        temporal = self.ruta_meta.with_name(self.ruta_meta.name + '.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'etiquetas': list(etiquetas), 'filas': int(filas), 'dtype': np.dtype(dtype).name},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta_meta)
+
+    def guardar(self, etiquetas: List[str], scores: np.ndarray, ids=None, conservar: bool = False):
+        """
+        Guarda la matriz completa.
+
+        Args:
+            etiquetas: Nombre de cada columna
+            scores: Matriz (n, n_etiquetas)
+            ids: Posición en el dataset de cada fila (por defecto 0..n-1)
+            conservar: Si es True, conserva las filas existentes cuyos ids no
+                       estén en `ids` (modo incremental)
+        """
+        dtype = np.dtype(ConfigAlmacenamiento.DTYPE_SCORES)
+        scores = np.asarray(scores)
+        ids = np.arange(len(scores), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+
+        if conservar and self.existe():
+            anterior = self.leer()
+            if list(anterior.etiquetas) != list(etiquetas):
+                raise ValueError(
+                    f"Las etiquetas de {self.ruta_matriz} no coinciden con las del modelo; "
+                    "vuelve a ejecutar la fase completa"
+                )
+            mantener = ~np.isin(anterior.ids, ids)
+            ids = np.concatenate([anterior.ids[mantener], ids])
+            scores = np.concatenate([np.asarray(anterior.matriz[mantener]), scores])
+            anterior.cerrar()
+            orden = np.argsort(ids, kind='stable')
+            ids, scores = ids[orden], scores[orden]
+
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        np.save(self._temporal(self.ruta_matriz), scores.astype(dtype, copy=False))
+        np.save(self._temporal(self.ruta_ids), ids)
+        self._confirmar(etiquetas, len(ids), dtype)
+
+    @contextmanager
+    def escritor(self, etiquetas: List[str], filas: int, conservar: bool = False):
+        """
+        Escribe la matriz por partes (modo por lotes) directamente en un
+        archivo mapeado en memoria, sin mantenerla completa en RAM.
+
+        Args:
+            etiquetas: Nombre de cada columna
+            filas: Filas del dataset
+            conservar: Si es True, las filas que no se escriban conservan los
+                       scores existentes (modo incremental)
+
+        Yields:
+            Función escribir(ids, scores) con las posiciones (0..filas-1) de cada fila
+        """
+        dtype = np.dtype(ConfigAlmacenamiento.DTYPE_SCORES)
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        matriz = open_memmap(self._temporal(self.ruta_matriz), mode='w+', dtype=dtype,
+                             shape=(filas, len(etiquetas)))
+        matriz[:] = np.nan
+        if conservar and self.existe():
+            anterior = MatrizScores(self.base).leer()
+            if list(anterior.etiquetas) == list(etiquetas):
+                dentro = anterior.ids < filas
+                matriz[anterior.ids[dentro]] = anterior.matriz[dentro]
+            anterior.cerrar()
+
+        def escribir(ids, scores):
+            matriz[np.asarray(ids, dtype=np.int64)] = np.asarray(scores, dtype=dtype)
+
+        try:
+            yield escribir
+            matriz.flush()
+        finally:
+            del matriz
+        np.save(self._temporal(self.ruta_ids), np.arange(filas, dtype=np.int64))
+        self._confirmar(etiquetas, filas, dtype)
+
+    def leer(self) -> 'MatrizScores':
+        """
+        Abre la matriz en modo lectura con memory-mapping (sin copiarla).
+
+        Returns:
+            self, con etiquetas, ids y matriz cargados
+        """
+        with open(self.ruta_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.etiquetas = meta['etiquetas']
+        self.ids = np.load(self.ruta_ids, mmap_mode='r')
+        self.matriz = np.load(self.ruta_matriz, mmap_mode='r')
+        if self.matriz.shape != (meta['filas'], len(self.etiquetas)) or len(self.ids) != meta['filas']:
+            raise ValueError(f"Matriz de scores inconsistente: {self.ruta_matriz}")
+        return self
+
+    def cerrar(self):
+        """Libera el mapeo en memoria."""
+        self.ids = None
+        self.matriz = None
+
+    def columna(self, etiqueta: str) -> pd.Series:
+        """Scores de una etiqueta, indexados por la posición en el dataset."""
+        return pd.Series(self.matriz[:, self.etiquetas.index(etiqueta)], index=self.ids)
+
+    def confianza(self) -> pd.Series:
+        """
+        Score de la etiqueta dominante de cada fila (confianza del modelo),
+        indexado por la posición en el dataset (las filas sin scores se omiten).
+        """
+        validas = ~np.isnan(self.matriz).any(axis=1)
+        return pd.Series(np.max(self.matriz[validas], axis=1).astype(np.float32), index=self.ids[validas])
+
+    def etiqueta_dominante(self) -> pd.Series:
+        """
+        Etiqueta con mayor score de cada fila, indexada por la posición en el
+        dataset (las filas sin scores se omiten).
+        """
+        validas = ~np.isnan(self.matriz).any(axis=1)
+        indices = np.argmax(self.matriz[validas], axis=1)
+        return pd.Series(np.asarray(self.etiquetas, dtype=object)[indices], index=self.ids[validas])
+
+
+def convertir_json(ruta_json, base) -> MatrizScores:
+    """
+    Convierte un archivo de scores en el formato JSON anterior
+    ({posición: {etiqueta: score}}) a una MatrizScores.
+    """
+    with open(ruta_json, 'r', encoding='utf-8') as f:
+        scores = json.load(f)
+    matriz = MatrizScores(base)
+    if not scores:
+        raise ValueError(f"Archivo de scores vacío: {ruta_json}")
+    etiquetas = list(next(iter(scores.values())))
+    ids = np.array([int(idx) for idx in scores], dtype=np.int64)
+    valores = np.array([[fila[e] for e in etiquetas] for fila in scores.values()], dtype=np.float32)
+    orden = np.argsort(ids, kind='stable')
+    matriz.guardar(etiquetas, valores[orden], ids[orden])
+    return matriz
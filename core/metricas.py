@@ -0,0 +1,287 @@
+"""
+Métricas de Ejecución
+=====================
+Registro de tiempos, rendimiento y memoria de cada fase del pipeline.
+
+Por cada fase (y por cada paso dentro de ella: carga, carga del modelo,
+tokenización, inferencia, escritura, llamadas al LLM...) se registra:
+- tiempo_s: Tiempo real transcurrido
+- cpu_s: Tiempo de CPU del proceso
+- filas / filas_por_s: Filas procesadas y rendimiento
+- pico_rss_mb: Memoria residente máxima del proceso desde el inicio de la fase
+- llamadas_llm: Número de llamadas al LLM
+
+Una fase puede agregar además un 'detalle' propio con registrar_detalle()
+(por ejemplo, la Fase 05 registra por categoría el tamaño de la muestra de
+entrenamiento y los tiempos de ajuste y de asignación).
+
+El orquestador guarda el resultado en data/visualizaciones/run_report.json.
+Las fases usan medir_paso() y registrar_filas(); fuera de una fase medida
+(por ejemplo, al ejecutar una fase de forma aislada) no registran nada.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+RUTA_REPORTE = Path('data/visualizaciones') / 'run_report.json'
+
+
+def _pico_rss_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso (MB), o None si no se puede medir."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for linea in f:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB; macOS, bytes
+        return maxrss / (1024 * 1024) if os.uname().sysname == 'Darwin' else maxrss / 1024
+    return None
+
+
+def _reiniciar_pico_rss():
+    """Reinicia el máximo de memoria del proceso (solo Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class _Medicion:
+    """Acumulador de una fase o de un paso."""
+
+    def __init__(self):
+        self.veces = 0
+        self.tiempo_s = 0.0
+        self.cpu_s = 0.0
+        self.filas = 0
+        self.llamadas_llm = 0
+        self.pico_rss_mb = None
+
+    def sumar(self, tiempo_s: float, cpu_s: float, filas: int = 0, llamadas_llm: int = 0):
+        self.veces += 1
+        self.tiempo_s += tiempo_s
+        self.cpu_s += cpu_s
+        self.filas += filas
+        self.llamadas_llm += llamadas_llm
+        self.actualizar_pico()
+
+    def actualizar_pico(self):
+        pico = _pico_rss_mb()
+        if pico is not None:
+            self.pico_rss_mb = max(self.pico_rss_mb or 0.0, pico)
+
+    def como_dict(self) -> Dict:
+        return {
+            'veces': self.veces,
+            'tiempo_s': round(self.tiempo_s, 3),
+            'cpu_s': round(self.cpu_s, 3),
+            'filas': self.filas,
+            'filas_por_s': round(self.filas / self.tiempo_s, 2) if self.filas and self.tiempo_s else None,
+            'pico_rss_mb': round(self.pico_rss_mb, 1) if self.pico_rss_mb is not None else None,
+            'llamadas_llm': self.llamadas_llm,
+        }
+
+
+class RegistroMetricas:
+    """
+    Métricas de las fases ejecutadas en este proceso.
+
+    Las fases ejecutadas en procesos separados se miden en su proceso y el
+    resultado se agrega al registro del proceso principal (agregar_fase).
+    """
+
+    def __init__(self):
+        self.inicio = None
+        self.fases: Dict[str, Dict] = {}
+        self.orquestador: Dict[str, _Medicion] = {}
+        self._fase = None
+        self._pasos: Dict[str, _Medicion] = {}
+        self._detalle: Dict[str, Dict] = {}
+
+    def reiniciar(self):
+        """Descarta las métricas anteriores (inicio de una ejecución)."""
+        self.inicio = datetime.now()
+        self.fases = {}
+        self.orquestador = {}
+        self._fase = None
+        self._pasos = {}
+        self._detalle = {}
+
+    @contextmanager
+    def medir_fase(self, clave: str, proceso: str = 'principal'):
+        """
+        Mide una fase completa. Si la fase lanza una excepción se registra con
+        estado 'error' y la excepción se propaga.
+        """
+        _reiniciar_pico_rss()
+        self._fase = _Medicion()
+        self._pasos = {}
+        self._detalle = {}
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        estado = 'error'
+        try:
+            yield
+            estado = 'ejecutada'
+        finally:
+            fase = self._fase
+            llamadas_llm = sum(paso.llamadas_llm for paso in self._pasos.values())
+            fase.sumar(time.perf_counter() - inicio, time.process_time() - inicio_cpu,
+                       llamadas_llm=llamadas_llm)
+            metricas = fase.como_dict()
+            del metricas['veces']
+            self.fases[clave] = {
+                'estado': estado,
+                'proceso': proceso,
+                **metricas,
+                'pasos': {nombre: paso.como_dict() for nombre, paso in self._pasos.items()},
+            }
+            if self._detalle:
+                self.fases[clave]['detalle'] = dict(sorted(self._detalle.items()))
+            self._fase = None
+            self._pasos = {}
+            self._detalle = {}
+
+    def registrar_omitida(self, clave: str):
+        """Registra una fase omitida (ya ejecutada previamente)."""
+        self.fases[clave] = {'estado': 'omitida'}
+
+    def agregar_fase(self, clave: str, metricas: Optional[Dict]):
+        """Agrega las métricas de una fase medida en otro proceso."""
+        if metricas is not None:
+            self.fases[clave] = metricas
+
+    def agregar_pasos(self, pasos: Dict[str, Dict], detalle: Optional[Dict[str, Dict]] = None):
+        """
+        Acumula en la fase en curso los pasos (y el detalle) medidos en otro
+        proceso (por ejemplo, las categorías de la Fase 05 analizadas en paralelo).
+        """
+        if self._fase is None:
+            return
+        self._detalle.update(detalle or {})
+        for nombre, datos in pasos.items():
+            medicion = self._pasos.setdefault(nombre, _Medicion())
+            medicion.veces += datos['veces']
+            medicion.tiempo_s += datos['tiempo_s']
+            medicion.cpu_s += datos['cpu_s']
+            medicion.filas += datos['filas']
+            medicion.llamadas_llm += datos['llamadas_llm']
+            if datos.get('pico_rss_mb') is not None:
+                medicion.pico_rss_mb = max(medicion.pico_rss_mb or 0.0, datos['pico_rss_mb'])
+
+    @contextmanager
+    def medir_paso(self, nombre: str, filas: int = 0, llamadas_llm: int = 0):
+        """Mide un paso de la fase en curso (se acumula si se repite)."""
+        if self._fase is None:
+            yield
+            return
+        with self._medir(self._pasos, nombre, filas, llamadas_llm):
+            yield
+
+    @contextmanager
+    def medir_orquestador(self, nombre: str):
+        """Mide un paso del orquestador fuera de las fases (carga, puntos de control)."""
+        with self._medir(self.orquestador, nombre):
+            yield
+
+    @staticmethod
+    @contextmanager
+    def _medir(destino: Dict[str, _Medicion], nombre: str, filas: int = 0, llamadas_llm: int = 0):
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            medicion = destino.setdefault(nombre, _Medicion())
+            medicion.sumar(time.perf_counter() - inicio, time.process_time() - inicio_cpu,
+                           filas, llamadas_llm)
+
+    def registrar_filas(self, filas: int):
+        """Suma filas procesadas a la fase en curso."""
+        if self._fase is not None:
+            self._fase.filas += int(filas)
+
+    def registrar_detalle(self, nombre: str, datos: Dict):
+        """Guarda datos propios de la fase en curso (ej. tiempos por categoría)."""
+        if self._fase is not None:
+            self._detalle[nombre] = datos
+
+    def como_dict(self) -> Dict:
+        fin = datetime.now()
+        return {
+            'inicio': self.inicio.isoformat(timespec='seconds') if self.inicio else None,
+            'fin': fin.isoformat(timespec='seconds'),
+            'duracion_s': round((fin - self.inicio).total_seconds(), 3) if self.inicio else None,
+            'pico_rss_mb': max(
+                (f['pico_rss_mb'] for f in self.fases.values() if f.get('pico_rss_mb') is not None),
+                default=None
+            ),
+            'llamadas_llm': sum(f.get('llamadas_llm', 0) for f in self.fases.values()),
+            'fases': dict(sorted(self.fases.items())),
+            'orquestador': {nombre: m.como_dict() for nombre, m in self.orquestador.items()},
+        }
+
+    def guardar(self, ruta=None, contexto: Optional[Dict] = None) -> Path:
+        """
+        Guarda el reporte de la ejecución en JSON.
+
+        Args:
+            ruta: Archivo de salida. Por defecto data/visualizaciones/run_report.json
+            contexto: Datos adicionales de la ejecución (modo, procesos...)
+        """
+        ruta = Path(ruta or RUTA_REPORTE)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        reporte = self.como_dict()
+        if contexto:
+            reporte['configuracion'] = contexto
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        return ruta
+
+
+# Registro del proceso actual
+REGISTRO = RegistroMetricas()
+
+
+def medir_paso(nombre: str, filas: int = 0, llamadas_llm: int = 0):
+    """Mide un paso de la fase en curso (ver RegistroMetricas.medir_paso)."""
+    return REGISTRO.medir_paso(nombre, filas, llamadas_llm)
+
+
+def medir_iteracion(iterable: Iterable, nombre: str):
+    """
+    Recorre un iterable midiendo el tiempo de obtener cada elemento como un
+    paso (por ejemplo, la tokenización de cada batch de un DataLoader).
+    """
+    iterador = iter(iterable)
+    while True:
+        with medir_paso(nombre):
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+        yield elemento
+
+
+def registrar_filas(filas: int):
+    """Suma filas procesadas a la fase en curso."""
+    REGISTRO.registrar_filas(filas)
+
+
+def registrar_detalle(nombre: str, datos: Dict):
+    """Guarda datos propios de la fase en curso (ver RegistroMetricas.registrar_detalle)."""
+    REGISTRO.registrar_detalle(nombre, datos)
@@ -0,0 +1,415 @@
+"""
+Orquestador del Pipeline
+========================
+Ejecuta las fases 01-07 como un grafo de dependencias.
+
+Cada fase declara sus columnas de entrada y de salida (COLUMNAS_ENTRADA /
+COLUMNAS_SALIDA); las dependencias se derivan de ellas: una fase depende de
+las fases que producen sus columnas de entrada. Las fases cuyas dependencias
+ya terminaron se pueden ejecutar en paralelo en procesos separados (por
+ejemplo, las fases 02, 03 y 04 solo leen 'TituloReview').
+
+En modo en memoria el dataset se carga una sola vez y el mismo DataFrame
+tipado se pasa entre fases. Solo se persiste en los puntos de control
+configurados y siempre al final.
+
+Las métricas de cada fase (tiempos, filas/s, memoria, llamadas al LLM) se
+guardan en data/visualizaciones/run_report.json (ver core/metricas.py).
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config import ConfigAlmacenamiento
+from .almacen_dataset import AlmacenDataset
+from .fase_01_procesamiento_basico import ProcesadorBasico
+from .fase_02_analisis_sentimientos import AnalizadorSentimientos
+from .fase_03_analisis_subjetividad import AnalizadorSubjetividad
+from .fase_04_clasificacion_categorias import ClasificadorCategorias
+from .fase_05_analisis_jerarquico_topicos import AnalizadorJerarquicoTopicos
+from .fase_06_resumen_inteligente import ResumidorInteligente
+from .fase_07_visualizaciones import GeneradorVisualizaciones
+from .metricas import REGISTRO
+
+
+# Grafo de fases (en orden de declaración):
+# - clase: Clase de la fase (declara COLUMNAS_ENTRADA / COLUMNAS_SALIDA)
+# - proceso_separado: Puede ejecutarse en un proceso aparte y devolver sus columnas
+GRAFO_FASES = {
+    'fase_01': {
+        'titulo': '[Fase 01] Procesamiento Básico de Datos',
+        'clase': ProcesadorBasico,
+        'proceso_separado': False
+    },
+    'fase_02': {
+        'titulo': '[Fase 02] Análisis de Sentimientos',
+        'clase': AnalizadorSentimientos,
+        'proceso_separado': True
+    },
+    'fase_03': {
+        'titulo': '[Fase 03] Análisis de Subjetividad',
+        'clase': AnalizadorSubjetividad,
+        'proceso_separado': True
+    },
+    'fase_04': {
+        'titulo': '[Fase 04] Clasificación de Categorías',
+        'clase': ClasificadorCategorias,
+        'proceso_separado': True
+    },
+    'fase_05': {
+        'titulo': '[Fase 05] Análisis Jerárquico de Tópicos',
+        'clase': AnalizadorJerarquicoTopicos,
+        'proceso_separado': False
+    },
+    'fase_06': {
+        'titulo': '[Fase 06] Resumen Inteligente de Reseñas',
+        'clase': ResumidorInteligente,
+        'proceso_separado': False
+    },
+    'fase_07': {
+        'titulo': '[Fase 07] Generación de Visualizaciones',
+        'clase': GeneradorVisualizaciones,
+        'proceso_separado': False
+    },
+}
+
+
+def columnas_entrada(clave: str) -> List[str]:
+    """Columnas que lee una fase."""
+    return list(getattr(GRAFO_FASES[clave]['clase'], 'COLUMNAS_ENTRADA', []))
+
+
+def columnas_salida(clave: str) -> List[str]:
+    """Columnas que escribe una fase."""
+    return list(getattr(GRAFO_FASES[clave]['clase'], 'COLUMNAS_SALIDA', []))
+
+
+def calcular_dependencias() -> Dict[str, List[str]]:
+    """
+    Deriva las dependencias del grafo a partir de entradas y salidas.
+
+    Returns:
+        {clave_fase: [fases que producen sus columnas de entrada]}
+    """
+    productor = {}
+    for clave in GRAFO_FASES:
+        for columna in columnas_salida(clave):
+            productor[columna] = clave
+
+    dependencias = {}
+    for clave in GRAFO_FASES:
+        deps = {productor[c] for c in columnas_entrada(clave) if c in productor}
+        deps.discard(clave)
+        dependencias[clave] = sorted(deps)
+
+    return dependencias
+
+
+def fases_dependientes(clave: str) -> List[str]:
+    """
+    Fases que dependen (directa o indirectamente) de las salidas de una fase.
+
+    Returns:
+        Claves de las fases afectadas, en orden de declaración
+    """
+    dependencias = calcular_dependencias()
+    afectadas = {clave}
+    for otra in GRAFO_FASES:
+        if any(dep in afectadas for dep in dependencias[otra]):
+            afectadas.add(otra)
+    afectadas.discard(clave)
+    return [otra for otra in GRAFO_FASES if otra in afectadas]
+
+
+def crear_fase(clave: str, opciones_resumen: Optional[Dict] = None):
+    """Instancia la clase de una fase."""
+    clase = GRAFO_FASES[clave]['clase']
+    if clase is ResumidorInteligente:
+        opciones_resumen = opciones_resumen or {}
+        return ResumidorInteligente(
+            top_n_subtopicos=opciones_resumen.get('top_n_subtopicos', 3),
+            incluir_neutros=opciones_resumen.get('incluir_neutros', False),
+            min_confianza_sentimiento=opciones_resumen.get('min_confianza_sentimiento', 0.0)
+        )
+    return clase()
+
+
+def invocar_procesar(clave: str, fase, df, guardar: bool, opciones_resumen: Optional[Dict] = None):
+    """Invoca procesar() con los argumentos propios de cada fase."""
+    if clave == 'fase_01':
+        return fase.procesar(forzar=True, guardar=guardar)
+    if clave == 'fase_06':
+        return fase.procesar(
+            tipos_resumen=(opciones_resumen or {}).get('tipos_resumen'),
+            forzar=True, df=df, guardar=guardar
+        )
+    return fase.procesar(forzar=True, df=df, guardar=guardar)
+
+
+def _inicializar_proceso(hilos: int):
+    """Limita los hilos de cada proceso para no sobre-suscribir la CPU."""
+    os.environ['OMP_NUM_THREADS'] = str(hilos)
+    os.environ['MKL_NUM_THREADS'] = str(hilos)
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+
+
+def _ejecutar_en_proceso(clave: str, df_entrada: Optional[pd.DataFrame], opciones_resumen: Dict):
+    """
+    Ejecuta una fase en un proceso separado.
+
+    En modo en memoria (df_entrada recibido) no escribe en el almacén:
+    retorna solo sus columnas de salida para que el proceso principal las
+    combine y persista. Si no recibe datos, la fase lee y guarda por su
+    cuenta (también por lotes) y no retorna columnas.
+
+    Returns:
+        Tupla (columnas de salida o None, métricas de la fase)
+    """
+    fase = crear_fase(clave, opciones_resumen)
+    resultado = None
+    with REGISTRO.medir_fase(clave, proceso='separado'):
+        if df_entrada is None:
+            invocar_procesar(clave, fase, None, guardar=True, opciones_resumen=opciones_resumen)
+        else:
+            df = invocar_procesar(clave, fase, df_entrada, guardar=False, opciones_resumen=opciones_resumen)
+            resultado = df[columnas_salida(clave)]
+    return resultado, REGISTRO.fases[clave]
+
+
+class OrquestadorPipeline:
+    """
+    Ejecuta el pipeline completo según el grafo de fases.
+
+    - Una fase queda lista cuando sus dependencias terminaron (o se omitieron).
+    - Con max_procesos > 1, las fases listas marcadas como proceso_separado
+      se ejecutan en paralelo en procesos aparte. En modo en memoria sus
+      columnas de salida se combinan en el proceso principal; si no, cada
+      proceso guarda sus propias columnas.
+    - En modo en memoria, en cada punto de control se escriben las columnas
+      pendientes y se registran en el manifiesto las fases ejecutadas.
+    """
+
+    def __init__(
+        self,
+        config_fases: Dict[str, bool],
+        en_memoria: bool = True,
+        puntos_control: Optional[List[str]] = None,
+        opciones_resumen: Optional[Dict] = None,
+        max_procesos: int = 1
+    ):
+        """
+        Inicializa el orquestador.
+
+        Args:
+            config_fases: {clave_fase: forzar} como CONFIG_FASES en main.py
+            en_memoria: Si True, pasa un único DataFrame entre fases
+            puntos_control: Fases tras las cuales se persiste el dataset
+                            (además de al final del pipeline)
+            opciones_resumen: Parámetros de la Fase 06 (top_n_subtopicos,
+                              incluir_neutros, min_confianza_sentimiento,
+                              tipos_resumen)
+            max_procesos: Fases que pueden ejecutarse simultáneamente en
+                          procesos separados (1 = secuencial)
+        """
+        self.config_fases = config_fases
+        self.en_memoria = en_memoria
+        if en_memoria and ConfigAlmacenamiento.TAMANO_LOTE:
+            print("   • Modo por lotes activo (DATASET_TAMANO_LOTE): el dataset no se carga en memoria")
+            self.en_memoria = False
+        self.puntos_control = set(puntos_control or [])
+        self.opciones_resumen = opciones_resumen or {}
+        self.max_procesos = max(1, int(max_procesos))
+        self.dependencias = calcular_dependencias()
+
+        self.almacen = AlmacenDataset()
+        self.df: Optional[pd.DataFrame] = None
+        self.ejecutadas = set()
+
+        # Estado pendiente de persistir (solo en memoria)
+        self._base_pendiente = None  # Instancia de la Fase 01 si debe guardarse
+        self._columnas_pendientes: List[str] = []
+        self._fases_pendientes: List = []
+
+    def _debe_forzar(self, clave: str) -> bool:
+        """Fuerza la fase si así se configuró o si cambió alguna dependencia."""
+        if self.config_fases.get(clave, True):
+            return True
+        return any(dep in self.ejecutadas for dep in self.dependencias[clave])
+
+    def ejecutar(self):
+        """Ejecuta todas las fases respetando el grafo de dependencias."""
+        REGISTRO.reiniciar()
+        try:
+            if self.max_procesos > 1:
+                hilos = max(1, (os.cpu_count() or 1) // self.max_procesos)
+                with ProcessPoolExecutor(
+                    max_workers=self.max_procesos,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inicializar_proceso,
+                    initargs=(hilos,)
+                ) as pool:
+                    self._planificar(pool)
+            else:
+                self._planificar(None)
+
+            if self.en_memoria:
+                self._persistir()
+        finally:
+            self._guardar_reporte()
+
+    def _guardar_reporte(self):
+        """Guarda las métricas de la ejecución (también si una fase falló)."""
+        ruta = REGISTRO.guardar(contexto={
+            'en_memoria': self.en_memoria,
+            'max_procesos': self.max_procesos,
+            'puntos_control': sorted(self.puntos_control),
+            'tamano_lote': ConfigAlmacenamiento.TAMANO_LOTE,
+            'incremental': ConfigAlmacenamiento.INCREMENTAL,
+        })
+        print(f"\n   📈 Métricas de ejecución: {ruta}")
+
+    def _planificar(self, pool: Optional[ProcessPoolExecutor]):
+        """Lanza cada fase en cuanto sus dependencias terminan."""
+        pendientes = list(GRAFO_FASES)
+        terminadas = set()
+        en_curso = {}
+
+        while pendientes or en_curso:
+            progreso = False
+
+            for clave in list(pendientes):
+                if not set(self.dependencias[clave]).issubset(terminadas):
+                    continue
+
+                en_pool = pool is not None and GRAFO_FASES[clave]['proceso_separado']
+                if en_pool and len(en_curso) >= self.max_procesos:
+                    continue
+
+                pendientes.remove(clave)
+                progreso = True
+
+                print(f"\n{GRAFO_FASES[clave]['titulo']}")
+                fase = crear_fase(clave, self.opciones_resumen)
+
+                # Una fase omitida no cuenta como ejecutada
+                if not self._debe_forzar(clave) and fase.ya_procesado():
+                    print("   ⏭️  Fase ya ejecutada previamente (omitiendo)")
+                    REGISTRO.registrar_omitida(clave)
+                    terminadas.add(clave)
+                    continue
+
+                if en_pool:
+                    print("   🚀 Ejecutando en proceso separado")
+                    futuro = pool.submit(
+                        _ejecutar_en_proceso, clave,
+                        self._entrada_proceso(clave), self.opciones_resumen
+                    )
+                    en_curso[futuro] = (clave, fase)
+                    continue
+
+                with REGISTRO.medir_fase(clave):
+                    self._ejecutar_local(clave, fase)
+                self._finalizar(clave)
+                terminadas.add(clave)
+                break  # Re-evaluar en orden las fases que quedaron listas
+
+            if progreso:
+                continue
+
+            if not en_curso:
+                raise RuntimeError(f"Dependencias sin resolver en el grafo de fases: {pendientes}")
+
+            completados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+            for futuro in completados:
+                clave, fase = en_curso.pop(futuro)
+                print(f"\n   ✓ {GRAFO_FASES[clave]['titulo']} completada (proceso separado)")
+                resultado, metricas = futuro.result()
+                REGISTRO.agregar_fase(clave, metricas)
+                self._combinar_resultado(clave, fase, resultado)
+                self._finalizar(clave)
+                terminadas.add(clave)
+
+    def _cargar_df(self):
+        """Carga el dataset completo la primera vez que se necesita."""
+        if self.df is None:
+            with REGISTRO.medir_orquestador('carga_dataset'):
+                self.df = self.almacen.leer()
+            print(f"   • Dataset cargado en memoria: {len(self.df)} filas")
+
+    def _entrada_proceso(self, clave: str) -> Optional[pd.DataFrame]:
+        """Columnas de entrada que se envían al proceso de una fase."""
+        if not self.en_memoria:
+            return None  # El proceso lee del almacén
+        self._cargar_df()
+        # Incluye resultados previos para que el proceso analice solo las filas pendientes
+        columnas = columnas_entrada(clave) + [c for c in columnas_salida(clave) if c in self.df.columns]
+        return self.df[columnas].copy()
+
+    def _ejecutar_local(self, clave: str, fase):
+        """Ejecuta una fase en el proceso principal."""
+        if not self.en_memoria:
+            invocar_procesar(clave, fase, None, guardar=True, opciones_resumen=self.opciones_resumen)
+            return
+
+        if clave == 'fase_01':
+            self.df = invocar_procesar(clave, fase, None, guardar=False)
+            self._base_pendiente = fase
+            self._columnas_pendientes = []
+        else:
+            self._cargar_df()
+            self.df = invocar_procesar(
+                clave, fase, self.df, guardar=False, opciones_resumen=self.opciones_resumen
+            )
+            self._columnas_pendientes.extend(columnas_salida(clave))
+
+        self._fases_pendientes.append(fase)
+
+    def _combinar_resultado(self, clave: str, fase, resultado: pd.DataFrame):
+        """Combina las columnas devueltas por un proceso separado."""
+        if resultado is None:
+            return  # La fase ya guardó sus columnas y su registro
+
+        for columna in resultado.columns:
+            self.df[columna] = resultado[columna].values
+        self._columnas_pendientes.extend(resultado.columns)
+        self._fases_pendientes.append(fase)
+
+    def _finalizar(self, clave: str):
+        """Marca la fase como ejecutada y persiste si es punto de control."""
+        self.ejecutadas.add(clave)
+        if self.en_memoria and clave in self.puntos_control:
+            self._persistir()
+
+    def _persistir(self):
+        """Escribe las columnas pendientes y registra las fases ejecutadas."""
+        if not self._fases_pendientes:
+            return
+
+        print("   💾 Punto de control: guardando dataset...")
+
+        with REGISTRO.medir_orquestador('persistencia'):
+            if self._base_pendiente is not None:
+                # Reescribe el dataset completo (incluye los resultados conservados
+                # en modo incremental y las columnas ya calculadas)
+                self._base_pendiente.persistir(self.df)
+                self._base_pendiente = None
+                self._columnas_pendientes = []
+
+            columnas = list(dict.fromkeys(self._columnas_pendientes))
+            if columnas:
+                self.almacen.escribir_columnas(self.df[columnas])
+
+            # Registrar en orden, una vez que las entradas ya están persistidas
+            for fase in self._fases_pendientes:
+                fase._registrar_manifiesto()
+
+        self._columnas_pendientes = []
+        self._fases_pendientes = []
@@ -0,0 +1,337 @@
+"""
+Reanudación de Fases Largas
+===========================
+Guarda periódicamente el progreso parcial de las fases de inferencia para
+que una ejecución interrumpida continúe donde quedó.
+
+- ProgresoInferencia (fases 02, 03 y 04): salidas del modelo de los textos
+  ya analizados, guardadas cada N lotes o N segundos.
+- ProgresoLotes (fases 02, 03 y 04 en modo por lotes): resultados de cada
+  lote del dataset terminado.
+- ProgresoCategorias (fase 05): tópicos de cada categoría ya analizada.
+
+El progreso se identifica por una firma de las entradas (modelo y textos):
+si cambian, el progreso anterior se descarta. Al terminar la fase se elimina.
+
+Se configura con ConfigReanudacion (REANUDACION_* en .env).
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import ConfigReanudacion
+
+
+def _escribir_json(ruta: Path, datos: Dict):
+    """Escribe un JSON de forma atómica (archivo temporal + reemplazo)."""
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _leer_json(ruta: Path) -> Optional[Dict]:
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ProgresoInferencia:
+    """
+    Progreso de la inferencia de una fase sobre una lista de textos.
+
+    Las salidas se agregan a un archivo binario (float32) y el número de
+    filas confirmadas se guarda en un JSON aparte; si el proceso se interrumpe
+    a mitad de una escritura, las filas no confirmadas se ignoran.
+
+    Uso:
+        progreso = ProgresoInferencia('fase_03', modelo, max_length, textos)
+        for salida_lote in inferir(textos[progreso.filas:]):
+            progreso.agregar(salida_lote)
+        salidas = progreso.completar(nuevas)
+    """
+
+    def __init__(self, fase: str, modelo: str, max_length: int, textos: List[str]):
+        """
+        Args:
+            fase: Identificador de la fase (ej. 'fase_02')
+            modelo: Identificador del modelo
+            max_length: Longitud máxima usada al tokenizar (o truncar) los textos
+            textos: Textos que se van a analizar, en orden
+        """
+        self.habilitado = ConfigReanudacion.HABILITADA and len(textos) > 0
+        self.filas = 0
+        self._previas = None
+        self._pendientes: List[np.ndarray] = []
+        self._lotes_sin_guardar = 0
+        self._ultimo_guardado = time.monotonic()
+
+        if not self.habilitado:
+            return
+
+        directorio = Path(ConfigReanudacion.DIRECTORIO)
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.ruta_datos = directorio / f'{fase}.bin'
+        self.ruta_meta = directorio / f'{fase}.json'
+        self.firma = self._firma(modelo, max_length, textos)
+        self._cargar(len(textos))
+
+    @staticmethod
+    def _firma(modelo: str, max_length: int, textos: List[str]) -> str:
+        h = hashlib.sha256(f'{modelo}|{max_length}|{len(textos)}'.encode('utf-8'))
+        for texto in textos:
+            h.update(str(texto).encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def _cargar(self, total: int):
+        """Recupera las salidas guardadas si la firma coincide."""
+        meta = _leer_json(self.ruta_meta)
+        if meta is None or meta.get('firma') != self.firma or not self.ruta_datos.exists():
+            self.eliminar()
+            return
+
+        filas, columnas = int(meta['filas']), int(meta['columnas'])
+        datos = np.fromfile(self.ruta_datos, dtype=np.float32, count=filas * columnas)
+        if filas == 0 or len(datos) < filas * columnas or filas > total:
+            self.eliminar()
+            return
+
+        self._previas = datos.reshape(filas, columnas)
+        self.filas = filas
+        # Descartar escrituras no confirmadas
+        with open(self.ruta_datos, 'r+b') as f:
+            f.truncate(filas * columnas * 4)
+        print(f"   ↻ Reanudando desde el progreso guardado: {filas} de {total} textos ya analizados")
+
+    def agregar(self, salidas: np.ndarray):
+        """
+        Agrega las salidas de un lote. Se guardan en disco cada
+        ConfigReanudacion.CADA_LOTES lotes o CADA_SEGUNDOS segundos.
+        """
+        if not self.habilitado:
+            return
+        self._pendientes.append(np.asarray(salidas, dtype=np.float32))
+        self._lotes_sin_guardar += 1
+
+        if (self._lotes_sin_guardar >= ConfigReanudacion.CADA_LOTES or
+                time.monotonic() - self._ultimo_guardado >= ConfigReanudacion.CADA_SEGUNDOS):
+            self.guardar()
+
+    def guardar(self):
+        """Escribe en disco las salidas pendientes y confirma las filas."""
+        if not self.habilitado or not self._pendientes:
+            return
+        nuevas = np.concatenate([p.reshape(len(p), -1) for p in self._pendientes])
+        with open(self.ruta_datos, 'ab') as f:
+            nuevas.tofile(f)
+        self.filas += len(nuevas)
+        _escribir_json(self.ruta_meta, {'firma': self.firma, 'filas': self.filas, 'columnas': nuevas.shape[1]})
+
+        self._pendientes = []
+        self._lotes_sin_guardar = 0
+        self._ultimo_guardado = time.monotonic()
+
+    def completar(self, nuevas: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Combina las salidas recuperadas con las nuevas y elimina el progreso.
+
+        Args:
+            nuevas: Salidas de los textos analizados en esta ejecución
+                    (textos[filas:]), o None si no quedaba ninguno
+
+        Returns:
+            Salidas de todos los textos, en orden
+        """
+        partes = [p for p in (self._previas, nuevas) if p is not None and len(p)]
+        self.eliminar()
+        if not partes:
+            return np.asarray(nuevas if nuevas is not None else [], dtype=np.float32)
+        return np.concatenate([np.asarray(p, dtype=np.float32) for p in partes])
+
+    def eliminar(self):
+        """Elimina el progreso guardado."""
+        self._previas = None
+        self._pendientes = []
+        if self.habilitado:
+            for ruta in (self.ruta_datos, self.ruta_meta):
+                ruta.unlink(missing_ok=True)
+
+
+class ProgresoLotes:
+    """
+    Progreso del modo por lotes: columnas de salida y scores de cada lote del
+    dataset ya terminado, y el número de filas confirmadas.
+
+    El escritor del almacén solo incorpora los lotes al cerrarse, por lo que
+    una interrupción descarta todo lo escrito. Con este progreso los lotes
+    terminados se recuperan del disco (sin depender de la caché de
+    inferencia) y solo se analizan los restantes; el lote interrumpido
+    continúa con ProgresoInferencia.
+
+    Uso:
+        progreso = ProgresoLotes('fase_03', modelo, almacen.huella(columnas), tamano_lote)
+        for lote in almacen.iterar_lotes(columnas):
+            guardado = progreso.leer(lote)
+            if guardado is None:
+                salida, ids, scores = analizar(lote)
+                progreso.registrar(lote, salida, ids, scores)
+            else:
+                salida, ids, scores = guardado
+        progreso.eliminar()
+    """
+
+    def __init__(self, fase: str, modelo: str, huella_datos: Optional[str], tamano_lote: int):
+        """
+        Args:
+            fase: Identificador de la fase (ej. 'fase_02')
+            modelo: Identificador del modelo
+            huella_datos: Huella de las columnas que lee la fase (None si no
+                          se puede calcular: el progreso se desactiva)
+            tamano_lote: Filas por lote del dataset
+        """
+        self.habilitado = ConfigReanudacion.HABILITADA and huella_datos is not None
+        self.filas = 0
+        if not self.habilitado:
+            return
+
+        directorio = Path(ConfigReanudacion.DIRECTORIO)
+        self.directorio = directorio / f'{fase}_lotes'
+        self.ruta_meta = directorio / f'{fase}_lotes.json'
+        self.firma = hashlib.sha256(
+            f'{modelo}|{huella_datos}|{int(tamano_lote)}'.encode('utf-8')
+        ).hexdigest()
+
+        meta = _leer_json(self.ruta_meta)
+        if meta is None or meta.get('firma') != self.firma:
+            self.eliminar()
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            return
+        self.filas = int(meta['filas'])
+        print(f"   ↻ Reanudando desde el progreso guardado: {self.filas} filas "
+              f"del dataset ya procesadas")
+
+    def _rutas(self, inicio: int) -> Tuple[Path, Path]:
+        base = self.directorio / f'{inicio:012d}'
+        return base.with_suffix('.parquet'), base.with_suffix('.npz')
+
+    def leer(self, lote: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, np.ndarray, np.ndarray]]:
+        """
+        Resultados guardados de un lote, o None si aún no se terminó.
+
+        Returns:
+            (columnas de salida del lote, posiciones de las filas analizadas,
+             scores de esas filas)
+        """
+        if not self.habilitado or not len(lote) or lote.index[-1] >= self.filas:
+            return None
+        ruta_salida, ruta_scores = self._rutas(int(lote.index[0]))
+        try:
+            salida = pd.read_parquet(ruta_salida)
+            with np.load(ruta_scores) as datos:
+                ids, scores = datos['ids'], datos['scores']
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(salida) != len(lote):
+            return None
+        salida.index = lote.index
+        return salida, ids, scores
+
+    def registrar(self, lote: pd.DataFrame, salida: pd.DataFrame, ids, scores):
+        """
+        Guarda los resultados de un lote terminado y confirma sus filas.
+
+        Args:
+            lote: Lote leído del dataset
+            salida: Columnas de salida del lote
+            ids: Posiciones en el dataset de las filas analizadas
+            scores: Scores de esas filas
+        """
+        if not self.habilitado or not len(lote):
+            return
+        ruta_salida, ruta_scores = self._rutas(int(lote.index[0]))
+        temporal = ruta_salida.with_name(ruta_salida.name + '.tmp')
+        salida.reset_index(drop=True).to_parquet(temporal, index=False)
+        os.replace(temporal, ruta_salida)
+        temporal = ruta_scores.with_name(ruta_scores.stem + '.tmp.npz')
+        np.savez(temporal, ids=np.asarray(ids, dtype=np.int64),
+                 scores=np.asarray(scores, dtype=np.float32))
+        os.replace(temporal, ruta_scores)
+
+        self.filas = int(lote.index[-1]) + 1
+        _escribir_json(self.ruta_meta, {'firma': self.firma, 'filas': self.filas})
+
+    def eliminar(self):
+        """Elimina el progreso guardado."""
+        if not self.habilitado:
+            return
+        self.ruta_meta.unlink(missing_ok=True)
+        if self.directorio.exists():
+            for ruta in self.directorio.iterdir():
+                ruta.unlink()
+            self.directorio.rmdir()
+
+
+class ProgresoCategorias:
+    """
+    Progreso de la Fase 05: tópicos asignados en cada categoría ya analizada.
+    Se guarda al terminar cada categoría.
+    """
+
+    def __init__(self, fase: str, modelo: str, df: pd.DataFrame):
+        """
+        Args:
+            fase: Identificador de la fase
+            modelo: Identificador del modelo (embeddings, LLM y parámetros)
+            df: Columnas de entrada de la fase (determinan la firma)
+        """
+        self.habilitado = ConfigReanudacion.HABILITADA
+        self.categorias: Dict[str, Dict] = {}
+        if not self.habilitado:
+            return
+
+        directorio = Path(ConfigReanudacion.DIRECTORIO)
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.ruta = directorio / f'{fase}.json'
+
+        h = hashlib.sha256(modelo.encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+        self.firma = h.hexdigest()
+
+        guardado = _leer_json(self.ruta)
+        if guardado is not None and guardado.get('firma') == self.firma:
+            # Las claves JSON son texto: restaurar los índices del DataFrame
+            tipo_indice = type(df.index[0]) if len(df.index) else str
+            self.categorias = {
+                categoria: {tipo_indice(idx): valor for idx, valor in mapeo.items()}
+                for categoria, mapeo in guardado['categorias'].items()
+            }
+            print(f"   ↻ Reanudando desde el progreso guardado: "
+                  f"{len(self.categorias)} categorías ya analizadas")
+
+    def registrar(self, categoria: str, mapeo: Dict):
+        """Guarda el resultado de una categoría."""
+        if not self.habilitado:
+            return
+        self.categorias[categoria] = mapeo
+        _escribir_json(self.ruta, {
+            'firma': self.firma,
+            'categorias': {
+                cat: {str(idx): valor for idx, valor in m.items()}
+                for cat, m in self.categorias.items()
+            },
+        })
+
+    def eliminar(self):
+        """Elimina el progreso guardado."""
+        if self.habilitado:
+            self.ruta.unlink(missing_ok=True)
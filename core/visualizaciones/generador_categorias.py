@@ -7,9 +7,9 @@ Sección 3: Categorías (visualizaciones esenciales)
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from collections import defaultdict
 from pathlib import Path
 from typing import List
+from .. import categorias as cats
 from .utils import COLORES, COLORES_SENTIMIENTO, PALETA_CATEGORIAS, ESTILOS, guardar_figura
 
 
@@ -46,40 +46,18 @@ class GeneradorCategorias:
     
     def _extraer_categorias_sentimientos(self):
         """Extrae categorías con sus sentimientos asociados."""
-        cat_sentimientos = defaultdict(lambda: {'Positivo': 0, 'Neutro': 0, 'Negativo': 0})
-        
-        for idx, row in self.df.iterrows():
-            try:
-                cats_str = str(row['Categorias']).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',') if c.strip()]
-                sentimiento = str(row['Sentimiento'])
-                
-                for cat in cats_list:
-                    if sentimiento in cat_sentimientos[cat]:
-                        cat_sentimientos[cat][sentimiento] += 1
-            except:
-                continue
-        
-        return cat_sentimientos
+        tabla = cats.tabla_por_categoria(self.df, 'Sentimiento', ['Positivo', 'Neutro', 'Negativo'])
+        return {categoria: fila.to_dict() for categoria, fila in tabla.iterrows()}
     
     def _generar_top_categorias(self):
         """3.1 Top Categorías Mencionadas."""
-        cats_counter = {}
-        for cats in self.df['Categorias'].dropna():
-            try:
-                cats_str = str(cats).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',') if c.strip()]
-                for cat in cats_list:
-                    cats_counter[cat] = cats_counter.get(cat, 0) + 1
-            except:
-                continue
+        # Ordenadas por frecuencia
+        cats_counter = cats.conteos(cats.mascaras(self.df))
         
-        if not cats_counter:
+        if cats_counter.empty:
             return
         
-        # Ordenar por frecuencia
-        cats_ordenadas = sorted(cats_counter.items(), key=lambda x: x[1], reverse=True)
-        categorias, valores = zip(*cats_ordenadas)
+        categorias, valores = tuple(cats_counter.index), tuple(int(v) for v in cats_counter.values)
         
         fig, ax = plt.subplots(figsize=(12, 8), facecolor='white')
         
@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from pathlib import Path
 from typing import Dict, List
+from .. import categorias as cats
 from .utils import COLORES, COLORES_SENTIMIENTO, ESTILOS, guardar_figura
 
 
@@ -149,22 +150,14 @@ class GeneradorDashboard:
     
     def _plot_top_categorias(self, ax):
         """Top 5 categorías más mencionadas."""
-        cats_counter = {}
-        for cats in self.df['Categorias'].dropna():
-            try:
-                cats_str = str(cats).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',') if c.strip()]
-                for cat in cats_list:
-                    cats_counter[cat] = cats_counter.get(cat, 0) + 1
-            except:
-                continue
+        cats_counter = cats.conteos(cats.mascaras(self.df))
         
-        if not cats_counter:
+        if cats_counter.empty:
             ax.text(0.5, 0.5, 'Sin datos de categorías', ha='center', va='center')
             ax.axis('off')
             return
         
-        top_cats = sorted(cats_counter.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_cats = [(cat, int(n)) for cat, n in cats_counter.head(5).items()]
         categorias, valores = zip(*top_cats)
         
         y_pos = range(len(categorias))
@@ -216,20 +209,8 @@ class GeneradorDashboard:
     
     def _calcular_fortalezas_debilidades(self) -> Dict:
         """Calcula fortalezas y debilidades por categoría."""
-        from collections import defaultdict
-        
-        cat_sentimientos = defaultdict(lambda: {'Positivo': 0, 'Neutro': 0, 'Negativo': 0})
-        
-        for idx, row in self.df.iterrows():
-            try:
-                cats_str = str(row['Categorias']).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',') if c.strip()]
-                sentimiento = row['Sentimiento']
-                
-                for cat in cats_list:
-                    cat_sentimientos[cat][sentimiento] += 1
-            except:
-                continue
+        tabla = cats.tabla_por_categoria(self.df, 'Sentimiento', ['Positivo', 'Neutro', 'Negativo'])
+        cat_sentimientos = {categoria: fila.to_dict() for categoria, fila in tabla.iterrows()}
         
         # Calcular porcentajes
         fortalezas = []
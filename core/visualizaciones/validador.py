@@ -9,6 +9,8 @@ import pandas as pd
 from typing import Dict, Tuple
 from datetime import datetime, timedelta
 
+from .. import categorias as cats
+
 
 class ValidadorVisualizaciones:
     """
@@ -45,19 +47,10 @@ class ValidadorVisualizaciones:
     
     def _validar_categorias(self) -> int:
         """Cuenta categorías válidas."""
-        if 'Categorias' not in self.df.columns:
+        if cats.COLUMNA_MASCARA not in self.df.columns and cats.COLUMNA_TEXTO not in self.df.columns:
             return 0
         
-        todas_cats = set()
-        for cats in self.df['Categorias'].dropna():
-            try:
-                cats_str = str(cats).strip("[]'\"").replace("'", "").replace('"', '')
-                cats_list = [c.strip() for c in cats_str.split(',')]
-                todas_cats.update([c for c in cats_list if c])
-            except:
-                continue
-        
-        return len(todas_cats)
+        return len(cats.presentes(cats.mascaras(self.df)))
     
     def _calcular_rango_temporal(self) -> int:
         """Calcula rango temporal en días."""
@@ -5,15 +5,11 @@ Ejecuta todas las fases de procesamiento en orden.
 """
 
 from core import (
-    ProcesadorBasico,
-    AnalizadorSentimientos,
-    AnalizadorSubjetividad,
-    ClasificadorCategorias,
-    AnalizadorJerarquicoTopicos,
-    ResumidorInteligente,
-    GeneradorVisualizaciones,
-    LLMProvider
+    LLMProvider,
+    AlmacenDataset,
+    OrquestadorPipeline
 )
+from config import ConfigAlmacenamiento
 
 
 # ============================================================
@@ -37,6 +33,40 @@ CONFIG_FASES = {
 }
 
 
+# ============================================================
+# MODO DE EJECUCIÓN
+# ============================================================
+# True  = El dataset se carga una sola vez y el mismo DataFrame
+#         se pasa entre fases; solo se guarda en los puntos de
+#         control indicados y siempre al final del pipeline.
+# False = Cada fase lee y guarda el dataset por su cuenta.
+# ============================================================
+
+MODO_EN_MEMORIA = True
+
+# Fases tras las cuales se guarda el dataset (modo en memoria).
+# Guardar tras las fases costosas evita repetirlas si algo falla después.
+PUNTOS_CONTROL = ['fase_04', 'fase_05']
+
+# Fases que pueden ejecutarse a la vez en procesos separados.
+# Las fases 02, 03 y 04 solo dependen de la Fase 01 y corren en paralelo;
+# los hilos de CPU se reparten entre los procesos. 1 = ejecución secuencial.
+FASES_EN_PARALELO = 3
+
+# Parámetros de la Fase 06 (Resumen Inteligente):
+# - top_n_subtopicos=3: Solo los 3 subtópicos más frecuentes por categoría
+# - incluir_neutros=False: Excluir sentimientos neutros (solo Positivo y Negativo)
+# - min_confianza_sentimiento=0.0: Probabilidad mínima del modelo de sentimientos
+#   para usar una reseña (ej. 0.6 descarta sentimientos ambiguos; 0 = sin filtro)
+# - tipos_resumen: Se generan los 3 tipos de resumen por defecto
+OPCIONES_RESUMEN = {
+    'top_n_subtopicos': 3,
+    'incluir_neutros': False,
+    'min_confianza_sentimiento': 0.0,
+    'tipos_resumen': ['descriptivo', 'estructurado', 'insights'],
+}
+
+
 def main():
     """Ejecuta el pipeline completo de procesamiento."""
     print("="*60)
@@ -59,44 +89,22 @@ def main():
         print(f"   💡 Revisa el archivo .env o consulta LLM_SETUP.md")
         return
     
-    # Fase 01: Procesamiento Básico
-    print("\n[Fase 01] Procesamiento Básico de Datos")
-    procesador_basico = ProcesadorBasico()
-    procesador_basico.procesar(forzar=CONFIG_FASES['fase_01'])
-    
-    # Fase 02: Análisis de Sentimientos
-    print("\n[Fase 02] Análisis de Sentimientos")
-    analizador_sentimientos = AnalizadorSentimientos()
-    analizador_sentimientos.procesar(forzar=CONFIG_FASES['fase_02'])
-    
-    # Fase 03: Análisis de Subjetividad
-    print("\n[Fase 03] Análisis de Subjetividad")
-    analizador_subjetividad = AnalizadorSubjetividad()
-    analizador_subjetividad.procesar(forzar=CONFIG_FASES['fase_03'])
-    
-    # Fase 04: Clasificación de Categorías Multi-etiqueta
-    print("\n[Fase 04] Clasificación de Categorías")
-    clasificador_categorias = ClasificadorCategorias()
-    clasificador_categorias.procesar(forzar=CONFIG_FASES['fase_04'])
-    
-    # Fase 05: Análisis Jerárquico de Tópicos
-    print("\n[Fase 05] Análisis Jerárquico de Tópicos")
-    analizador_topicos = AnalizadorJerarquicoTopicos()
-    analizador_topicos.procesar(forzar=CONFIG_FASES['fase_05'])
-    
-    # Fase 06: Resumen Inteligente de Reseñas
-    print("\n[Fase 06] Resumen Inteligente de Reseñas")
-    # Parámetros optimizados por defecto:
-    # - top_n_subtopicos=3: Solo los 3 subtópicos más frecuentes por categoría
-    # - incluir_neutros=False: Excluir sentimientos neutros (solo Positivo y Negativo)
-    resumidor = ResumidorInteligente(top_n_subtopicos=3, incluir_neutros=False)
-    # Generar los 3 tipos de resumen por defecto
-    resumidor.procesar(tipos_resumen=['descriptivo', 'estructurado', 'insights'], forzar=CONFIG_FASES['fase_06'])
+    # Ejecutar fases 01-07
+    orquestador = OrquestadorPipeline(
+        CONFIG_FASES,
+        en_memoria=MODO_EN_MEMORIA,
+        puntos_control=PUNTOS_CONTROL,
+        opciones_resumen=OPCIONES_RESUMEN,
+        max_procesos=FASES_EN_PARALELO
+    )
+    orquestador.ejecutar()
     
-    # Fase 07: Generación de Visualizaciones
-    print("\n[Fase 07] Generación de Visualizaciones")
-    generador_viz = GeneradorVisualizaciones()
-    generador_viz.procesar(forzar=CONFIG_FASES['fase_07'])
+    # Exportar dataset final a CSV (una sola escritura completa por ejecución)
+    almacen = AlmacenDataset()
+    if almacen.es_columnar and ConfigAlmacenamiento.EXPORTAR_CSV:
+        print("\n[Exportación] Dataset final a CSV")
+        almacen.exportar_csv()
+        print(f"   ✓ Exportado a: {almacen.ruta_csv}")
     
     print("\n" + "="*60)
     print("✅ Pipeline completado exitosamente")
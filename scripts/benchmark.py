@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Pipeline
+======================
+Mide el rendimiento de cada fase sin dataset real ni descargas:
+
+- Dataset sintético reproducible (scripts/generar_resenas_sinteticas.py)
+  en las escalas indicadas (1k, 10k, 100k, 1m filas...)
+- Modelos BERT mínimos inicializados localmente (pesos aleatorios, misma
+  arquitectura y etiquetas que los modelos reales)
+- LLM falso con latencia configurable (sin Ollama ni OpenAI)
+
+Cada escala se ejecuta con el orquestador en un directorio de trabajo
+aislado (no toca data/ ni models/ del proyecto). Las métricas por fase y
+por paso (ver core/metricas.py) se agregan, junto con el commit actual, a
+data/benchmarks/resultados.jsonl para comparar entre commits.
+
+Uso:
+    python scripts/benchmark.py --escalas 1k 10k
+    python scripts/benchmark.py --escalas 100k --fases fase_01 fase_02 fase_03 fase_04 --procesos 3
+    python scripts/benchmark.py --escalas 10k --fases fase_01 fase_02 fase_03 fase_04 --backend onnx
+    python scripts/benchmark.py --comparar
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).parent.parent
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from generar_resenas_sinteticas import FRASES_CATEGORIAS, generar_resenas, vocabulario
+
+
+RESULTADOS_DEFAULT = RAIZ / 'data' / 'benchmarks' / 'resultados.jsonl'
+
+SUFIJOS = {'k': 1_000, 'm': 1_000_000}
+
+# Arquitectura de los modelos mínimos
+HIDDEN_SIZE = 64
+CAPAS = 2
+CABEZAS = 2
+
+
+def parsear_escala(escala: str) -> int:
+    """Convierte '10k', '1m' o '2500' en número de filas."""
+    escala = escala.strip().lower()
+    if escala[-1:] in SUFIJOS:
+        return int(float(escala[:-1]) * SUFIJOS[escala[-1]])
+    return int(escala)
+
+
+# ============================================================
+# MODELOS MÍNIMOS
+# ============================================================
+
+def _sin_acentos(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def crear_modelos_minimos(directorio: Path, semilla: int) -> dict:
+    """
+    Crea modelos BERT diminutos con pesos aleatorios para las fases 02-05.
+
+    Returns:
+        Variables de entorno de ConfigModelos que apuntan a los modelos
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertModel, BertTokenizerFast
+
+    torch.manual_seed(semilla)
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    # Vocabulario del generador (el tokenizador elimina acentos y pasa a minúsculas)
+    especiales = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    palabras = sorted({_sin_acentos(p).strip('.,') for p in vocabulario()} - {''})
+    signos = list('.,;:!?¡¿()"\'-') + [str(d) for d in range(10)]
+    ruta_vocab = directorio / 'vocab.txt'
+    ruta_vocab.write_text('\n'.join(especiales + signos + palabras), encoding='utf-8')
+    tokenizer = BertTokenizerFast(vocab_file=str(ruta_vocab), do_lower_case=True)
+
+    def configuracion(etiquetas=None, problema=None):
+        extra = {}
+        if etiquetas:
+            extra = {
+                'num_labels': len(etiquetas),
+                'id2label': dict(enumerate(etiquetas)),
+                'label2id': {e: i for i, e in enumerate(etiquetas)},
+                'problem_type': problema,
+            }
+        return BertConfig(
+            vocab_size=tokenizer.vocab_size, hidden_size=HIDDEN_SIZE, num_hidden_layers=CAPAS,
+            num_attention_heads=CABEZAS, intermediate_size=HIDDEN_SIZE * 4,
+            max_position_embeddings=512, **extra
+        )
+
+    clasificadores = {
+        'MODELO_SENTIMIENTOS': ('sentimientos', ['1 star', '2 stars', '3 stars', '4 stars', '5 stars'], None),
+        'MODELO_SUBJETIVIDAD': ('subjectivity_task/best_model', ['Subjetiva', 'Mixta'], None),
+        'MODELO_CATEGORIAS': ('multilabel_task/best_model', list(FRASES_CATEGORIAS), 'multi_label_classification'),
+    }
+
+    rutas = {}
+    for variable, (nombre, etiquetas, problema) in clasificadores.items():
+        ruta = directorio / nombre
+        BertForSequenceClassification(configuracion(etiquetas, problema)).save_pretrained(ruta)
+        tokenizer.save_pretrained(ruta)
+        rutas[variable] = str(ruta)
+
+    # Embeddings para BERTopic: BERT mínimo + mean pooling
+    from sentence_transformers import SentenceTransformer, models
+
+    ruta_base = directorio / 'embeddings_base'
+    BertModel(configuracion()).save_pretrained(ruta_base)
+    tokenizer.save_pretrained(ruta_base)
+    transformer = models.Transformer(str(ruta_base), max_seq_length=128)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension())
+    ruta_embeddings = directorio / 'embeddings'
+    SentenceTransformer(modules=[transformer, pooling]).save(str(ruta_embeddings))
+    rutas['MODELO_EMBEDDINGS'] = str(ruta_embeddings)
+
+    return rutas
+
+
+# ============================================================
+# LLM FALSO
+# ============================================================
+
+def instalar_llm_falso(latencia: float):
+    """
+    Reemplaza el LLM del proveedor por uno falso: etiqueta cada tópico que
+    recibe (Fase 05) y devuelve un texto fijo como resumen (Fase 06).
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    from core.llm_provider import LLMProvider
+
+    class LLMFalso(BaseChatModel):
+        latencia: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return 'falso'
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latencia)
+            prompt = str(messages[-1].content)
+            ids = re.findall(r'Tópico (-?\d+):', prompt)
+            if ids:
+                contenido = json.dumps(
+                    {'topics': [{'topic_id': int(i), 'label': f'Subtópico {i}'} for i in ids]},
+                    ensure_ascii=False
+                )
+            else:
+                contenido = 'Resumen sintético generado por el LLM falso del benchmark.'
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=contenido))])
+
+    LLMProvider._instance = None
+    LLMProvider._llm = LLMFalso(latencia=latencia)
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+def _git(*argumentos) -> str:
+    try:
+        return subprocess.run(
+            ['git', *argumentos], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _entorno() -> dict:
+    entorno = {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+    for paquete in ['torch', 'transformers', 'pandas', 'pyarrow']:
+        try:
+            entorno[paquete] = __import__(paquete).__version__
+        except ImportError:
+            entorno[paquete] = None
+    return entorno
+
+
+def seleccionar_fases(fases: list):
+    """Limita el grafo del orquestador a las fases indicadas."""
+    from core.pipeline import GRAFO_FASES, calcular_dependencias
+
+    desconocidas = set(fases) - set(GRAFO_FASES)
+    if desconocidas:
+        raise ValueError(f"Fases desconocidas: {sorted(desconocidas)}")
+
+    for clave, dependencias in calcular_dependencias().items():
+        faltantes = set(dependencias) - set(fases)
+        if clave in fases and faltantes:
+            raise ValueError(f"{clave} requiere también: {sorted(faltantes)}")
+
+    for clave in list(GRAFO_FASES):
+        if clave not in fases:
+            del GRAFO_FASES[clave]
+
+
+def ejecutar_escala(filas: int, args) -> dict:
+    """Genera el dataset de una escala y ejecuta el pipeline sobre él."""
+    from core import OrquestadorPipeline
+    from core.fase_01_procesamiento_basico import ProcesadorBasico
+    from core.metricas import REGISTRO
+    from core.pipeline import GRAFO_FASES
+
+    # Datos de la escala anterior fuera (los modelos se conservan)
+    shutil.rmtree('data', ignore_errors=True)
+    Path('data').mkdir()
+    ProcesadorBasico.DATASET_PATH = Path('data') / 'dataset.csv'
+
+    print(f"\n[Benchmark] Generando {filas} reseñas sintéticas...")
+    inicio = time.perf_counter()
+    generar_resenas(filas, args.semilla).to_csv(ProcesadorBasico.DATASET_PATH, index=False)
+    generacion_s = time.perf_counter() - inicio
+
+    orquestador = OrquestadorPipeline(
+        {clave: True for clave in GRAFO_FASES},
+        en_memoria=not args.modo_disco,
+        max_procesos=args.procesos
+    )
+    orquestador.ejecutar()
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'cambios_sin_commit': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'filas': filas,
+        'semilla': args.semilla,
+        'fases': list(GRAFO_FASES),
+        'procesos': args.procesos,
+        'en_memoria': not args.modo_disco,
+        'latencia_llm': args.latencia_llm,
+        'cache_inferencia': args.con_cache,
+        'backend': args.backend,
+        'generacion_s': round(generacion_s, 3),
+        'entorno': _entorno(),
+        'reporte': REGISTRO.como_dict(),
+    }
+
+
+def imprimir_resumen(resultado: dict):
+    """Tabla de tiempos por fase de una ejecución."""
+    print(f"\n[Benchmark] {resultado['filas']} filas | commit {resultado['commit'] or '?'}")
+    print(f"   {'Fase':<10}{'Tiempo (s)':>12}{'CPU (s)':>10}{'Filas/s':>12}{'RSS (MB)':>10}")
+    for clave, fase in resultado['reporte']['fases'].items():
+        if fase.get('estado') != 'ejecutada':
+            print(f"   {clave:<10}{fase.get('estado', '-'):>12}")
+            continue
+        print(f"   {clave:<10}{fase['tiempo_s']:>12.2f}{fase['cpu_s']:>10.2f}"
+              f"{fase['filas_por_s'] or 0:>12.0f}{fase['pico_rss_mb'] or 0:>10.0f}")
+    print(f"   {'Total':<10}{resultado['reporte']['duracion_s']:>12.2f}")
+
+
+def comparar(ruta: Path, ultimos: int):
+    """Muestra el tiempo por fase de las últimas ejecuciones de cada escala."""
+    if not ruta.exists():
+        print(f"⚠️  No hay resultados en: {ruta}")
+        return
+
+    with open(ruta, 'r', encoding='utf-8') as f:
+        resultados = [json.loads(linea) for linea in f if linea.strip()]
+
+    for filas in sorted({r['filas'] for r in resultados}):
+        de_escala = [r for r in resultados if r['filas'] == filas][-ultimos:]
+        fases = list(dict.fromkeys(c for r in de_escala for c in r['reporte']['fases']))
+
+        print(f"\n[{filas} filas]")
+        print(f"   {'Fecha':<20}{'Commit':<10}" + ''.join(f"{c:>10}" for c in fases) + f"{'Total':>10}")
+        for r in de_escala:
+            commit = (r['commit'] or '?') + ('*' if r.get('cambios_sin_commit') else '')
+            tiempos = [r['reporte']['fases'].get(c, {}).get('tiempo_s') for c in fases]
+            print(f"   {r['fecha']:<20}{commit:<10}"
+                  + ''.join(f"{t:>10.2f}" if t is not None else f"{'-':>10}" for t in tiempos)
+                  + f"{r['reporte']['duracion_s']:>10.2f}")
+    print("\n   * = ejecutado con cambios sin commit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline con datos y modelos sintéticos')
+    parser.add_argument('--escalas', nargs='+', default=['1k', '10k'],
+                        help='Filas por ejecución (ej. 1k 10k 100k 1m)')
+    parser.add_argument('--fases', nargs='+', default=None,
+                        help='Fases a ejecutar (por defecto todas)')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Fases en paralelo en procesos separados')
+    parser.add_argument('--modo-disco', action='store_true',
+                        help='Cada fase lee y guarda por su cuenta (sin modo en memoria)')
+    parser.add_argument('--latencia-llm', type=float, default=0.0,
+                        help='Segundos de espera por llamada al LLM falso')
+    parser.add_argument('--backend', choices=['pytorch', 'onnx'], default='pytorch',
+                        help='Backend de inferencia de las fases 02-04')
+    parser.add_argument('--con-cache', action='store_true',
+                        help='Usa la caché de inferencia (por defecto se desactiva)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--directorio', default=None,
+                        help='Directorio de trabajo (por defecto uno temporal que se elimina)')
+    parser.add_argument('--resultados', default=str(RESULTADOS_DEFAULT),
+                        help='Archivo JSONL donde se agregan los resultados')
+    parser.add_argument('--comparar', action='store_true',
+                        help='Solo muestra la comparación de resultados anteriores')
+    parser.add_argument('--ultimos', type=int, default=10,
+                        help='Ejecuciones por escala en la comparación')
+    args = parser.parse_args()
+
+    ruta_resultados = Path(args.resultados).resolve()
+    if args.comparar:
+        comparar(ruta_resultados, args.ultimos)
+        return 0
+
+    escalas = [parsear_escala(e) for e in args.escalas]
+    temporal = args.directorio is None
+    trabajo = Path(args.directorio or tempfile.mkdtemp(prefix='benchmark_pipeline_')).resolve()
+    trabajo.mkdir(parents=True, exist_ok=True)
+
+    print("="*60)
+    print("BENCHMARK DEL PIPELINE")
+    print("="*60)
+    print(f"   • Escalas: {', '.join(str(e) for e in escalas)}")
+    print(f"   • Directorio de trabajo: {trabajo}")
+
+    try:
+        # La configuración se lee al importar core: preparar el entorno antes
+        print("\n[Benchmark] Creando modelos mínimos...")
+        os.environ.update(crear_modelos_minimos(trabajo / 'models', args.semilla))
+        os.environ['CACHE_INFERENCIA'] = 'true' if args.con_cache else 'false'
+        os.environ['INFERENCIA_BACKEND'] = args.backend
+        os.chdir(trabajo)
+
+        if args.fases:
+            seleccionar_fases(args.fases)
+        instalar_llm_falso(args.latencia_llm)
+
+        ruta_resultados.parent.mkdir(parents=True, exist_ok=True)
+        for filas in escalas:
+            resultado = ejecutar_escala(filas, args)
+            with open(ruta_resultados, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+            imprimir_resumen(resultado)
+    finally:
+        os.chdir(RAIZ)
+        if temporal:
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+    print(f"\n✅ Resultados agregados a: {ruta_resultados}")
+    print("   💡 Compara entre commits con: python scripts/benchmark.py --comparar")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
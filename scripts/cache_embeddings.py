@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Caché de Embeddings (Fase 05)
+=============================
+Muestra el tamaño de la caché de embeddings por modelo y la compacta.
+
+Al compactar se eliminan las filas sin referencia de los archivos de
+vectores y se expulsan las entradas menos usadas hasta quedar bajo el tamaño
+máximo (CACHE_EMBEDDINGS_MAX_MB o --max-mb).
+
+Uso:
+    python scripts/cache_embeddings.py
+    python scripts/cache_embeddings.py --compactar
+    python scripts/cache_embeddings.py --compactar --max-mb 512 --dias-sin-uso 90
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import ConfigCacheEmbeddings
+from core.cache_embeddings import compactar, informe, tamano_total
+
+
+def mostrar_informe():
+    """Imprime el tamaño y los aciertos de la caché por modelo."""
+    directorio = ConfigCacheEmbeddings.DIRECTORIO
+    modelos = informe(directorio)
+    print(f"\nCaché de embeddings: {directorio}")
+    if not modelos:
+        print("   • Vacía")
+        return
+
+    for datos in modelos:
+        consultas = datos['aciertos'] + datos['fallos']
+        tasa = datos['aciertos'] / consultas if consultas else 0.0
+        print(f"\n   {datos['modelo']} (dimensión {datos['dimension']})")
+        print(f"   • Entradas: {datos['entradas']:,} | "
+              f"sin referencia: {datos['sin_referencia']:,}")
+        print(f"   • Tamaño: {datos['tamano_mb']:.1f} MB")
+        print(f"   • Aciertos: {datos['aciertos']:,} | fallos: {datos['fallos']:,} ({tasa:.0%})")
+
+    total_mb = tamano_total(directorio) / (1024 * 1024)
+    print(f"\n   Total: {total_mb:.1f} MB (máximo {ConfigCacheEmbeddings.MAX_MB:.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Informe y compactación de la caché de embeddings')
+    parser.add_argument('--compactar', action='store_true',
+                        help='Reescribir los archivos de vectores solo con las entradas vigentes')
+    parser.add_argument('--max-mb', type=float, metavar='MB',
+                        help='Tamaño máximo al compactar (por defecto CACHE_EMBEDDINGS_MAX_MB)')
+    parser.add_argument('--dias-sin-uso', type=float, metavar='DIAS',
+                        help='Al compactar, expulsar las entradas no usadas en estos días')
+    args = parser.parse_args()
+
+    if args.compactar:
+        resultado = compactar(max_mb=args.max_mb, dias_sin_uso=args.dias_sin_uso)
+        print(f"✅ Caché compactada: {resultado['mb_antes']:.1f} MB → "
+              f"{resultado['mb_despues']:.1f} MB "
+              f"({resultado['entradas_expulsadas']:,} entradas expulsadas)")
+
+    mostrar_informe()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Generador de Reseñas Sintéticas
+===============================
+Genera un dataset de opiniones turísticas sintéticas con las columnas de
+entrada del pipeline (Titulo, Review, FechaEstadia, Calificacion).
+
+- Calificaciones sesgadas hacia valores altos, como en los portales de reseñas
+- El tono de título y texto sigue a la calificación
+- Longitud de las reseñas con distribución log-normal (muchas cortas, pocas muy largas)
+- Fechas de estadía con crecimiento anual y temporada alta en verano y diciembre
+- Un pequeño porcentaje de reseñas duplicadas (la Fase 01 las elimina)
+
+El resultado es reproducible: la misma semilla genera el mismo dataset.
+
+Uso:
+    python scripts/generar_resenas_sinteticas.py --filas 10000 --salida data/dataset.csv
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Frases por categoría: (positivas, negativas)
+FRASES_CATEGORIAS = {
+    'Alojamiento': (
+        ['la habitación era amplia y muy limpia', 'el hotel tiene una ubicación estratégica',
+         'las camas son cómodas y se descansa muy bien', 'la vista desde el balcón es espectacular'],
+        ['la habitación olía a humedad', 'el aire acondicionado no funcionaba',
+         'el hotel está lejos de todo', 'las toallas estaban sucias']
+    ),
+    'Gastronomía': (
+        ['la comida es deliciosa y con sabor local', 'los mariscos estaban frescos',
+         'el desayuno buffet tiene mucha variedad', 'probamos tacos y postres típicos muy ricos'],
+        ['la comida llegó fría', 'los precios del restaurante son excesivos',
+         'el menú tenía muy pocas opciones', 'nos cobraron platillos que no pedimos']
+    ),
+    'Transporte': (
+        ['el ferry fue puntual y cómodo', 'es fácil llegar en autobús desde el centro',
+         'el traslado desde el aeropuerto fue rápido', 'hay estacionamiento amplio'],
+        ['el taxi nos cobró de más', 'esperamos más de una hora el transporte',
+         'el camino de acceso está en malas condiciones', 'no hay estacionamiento cerca']
+    ),
+    'Eventos y festivales': (
+        ['coincidimos con el festival y fue una gran experiencia', 'el espectáculo nocturno es imperdible',
+         'la celebración tradicional fue muy colorida'],
+        ['el evento estaba mal organizado', 'cancelaron el espectáculo sin avisar',
+         'había demasiada gente en el festival']
+    ),
+    'Historia y cultura': (
+        ['las ruinas arqueológicas son impresionantes', 'el museo explica muy bien la historia maya',
+         'la arquitectura colonial es muy bonita', 'el guía nos contó leyendas muy interesantes'],
+        ['las ruinas están descuidadas', 'el museo tiene poca información',
+         'no permiten acercarse a las pirámides']
+    ),
+    'Compras': (
+        ['encontramos artesanías locales de buena calidad', 'el mercado tradicional es muy pintoresco',
+         'hay tiendas de plata con buenos precios'],
+        ['los vendedores son muy insistentes', 'los souvenirs son caros y de mala calidad',
+         'en las tiendas no aceptan tarjeta']
+    ),
+    'Deportes y aventura': (
+        ['el snorkel en el arrecife fue increíble', 'la tirolesa es emocionante y segura',
+         'rentamos kayaks y recorrimos la laguna', 'bucear en el cenote fue lo mejor del viaje'],
+        ['el equipo de buceo estaba en mal estado', 'la actividad fue muy corta para lo que cuesta',
+         'no nos dieron instrucciones de seguridad']
+    ),
+    'Vida nocturna': (
+        ['los bares tienen muy buen ambiente', 'la música en vivo de la terraza es excelente',
+         'salimos a bailar y la pasamos muy bien'],
+        ['la música estaba demasiado fuerte', 'las bebidas en el bar eran muy caras',
+         'la discoteca estaba sobrevendida']
+    ),
+    'Naturaleza': (
+        ['la playa tiene arena blanca y agua cristalina', 'los cenotes son un paraíso natural',
+         'la reserva ecológica está muy bien cuidada', 'el atardecer en la laguna es precioso'],
+        ['la playa estaba llena de sargazo', 'había mucha basura en el sendero',
+         'el agua del cenote estaba turbia']
+    ),
+    'Personal y servicio': (
+        ['el personal es amable y atento', 'la recepcionista nos ayudó con todo',
+         'el servicio fue rápido y eficiente', 'los meseros siempre estuvieron pendientes'],
+        ['el personal fue grosero', 'tardaron mucho en atendernos',
+         'nadie supo resolver nuestro problema', 'el check in fue muy lento']
+    ),
+    'Seguridad': (
+        ['nos sentimos seguros en todo momento', 'hay salvavidas en toda la playa',
+         'el lugar cuenta con vigilancia las veinticuatro horas'],
+        ['la zona se siente insegura de noche', 'no había salvavidas',
+         'nos advirtieron que no camináramos solos']
+    ),
+    'Fauna y vida animal': (
+        ['nadamos con tortugas marinas', 'vimos delfines y muchas aves',
+         'el santuario cuida muy bien a los animales'],
+        ['los animales se veían maltratados', 'no vimos ninguna tortuga',
+         'los delfines están en espacios muy pequeños']
+    ),
+}
+
+FRASES_NEUTRAS = [
+    'fuimos en familia durante las vacaciones', 'llegamos temprano por la mañana',
+    'es un lugar concurrido los fines de semana', 'recomiendo llevar bloqueador y agua',
+    'estuvimos tres noches', 'lo visitamos por recomendación de unos amigos',
+    'conviene reservar con anticipación', 'el clima fue caluroso',
+]
+
+TITULOS = {
+    'positivo': ['Excelente experiencia', 'Muy recomendable', 'Un lugar mágico', 'Volveríamos sin dudar',
+                 'Increíble', 'Superó nuestras expectativas', 'Hermoso lugar', 'Todo perfecto'],
+    'neutro': ['Está bien', 'Regular', 'Bonito pero caro', 'Cumple', 'Experiencia aceptable',
+               'Nada fuera de lo común'],
+    'negativo': ['No lo recomiendo', 'Muy decepcionante', 'Pésimo servicio', 'No vale la pena',
+                 'Mala experiencia', 'Nunca más'],
+}
+
+# Distribución de calificaciones (1 a 5 estrellas)
+PROBABILIDAD_CALIFICACION = [0.05, 0.05, 0.10, 0.25, 0.55]
+
+# Frases por reseña: log-normal con mediana ~5 (unas 30 palabras)
+FRASES_MEDIANA = 5
+FRASES_SIGMA = 0.7
+FRASES_MAXIMO = 80
+
+PORCENTAJE_DUPLICADOS = 0.01
+PORCENTAJE_SIN_TITULO = 0.05
+
+
+def vocabulario() -> list:
+    """Palabras usadas por el generador (para construir tokenizadores de prueba)."""
+    textos = list(FRASES_NEUTRAS)
+    for positivas, negativas in FRASES_CATEGORIAS.values():
+        textos.extend(positivas + negativas)
+    for titulos in TITULOS.values():
+        textos.extend(titulos)
+    return sorted({palabra for texto in textos for palabra in texto.lower().split()})
+
+
+def _fechas(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Fechas de estadía entre 2015 y 2024, con crecimiento anual y estacionalidad."""
+    anios = np.arange(2015, 2025)
+    peso_anio = np.linspace(1, 4, len(anios))
+    peso_mes = np.array([1.0, 0.9, 1.1, 1.2, 0.9, 1.1, 1.6, 1.7, 0.8, 0.8, 1.0, 1.6])
+
+    anio = rng.choice(anios, size=n, p=peso_anio / peso_anio.sum())
+    mes = rng.choice(np.arange(1, 13), size=n, p=peso_mes / peso_mes.sum())
+    dia = rng.integers(1, 29, size=n)
+    return pd.to_datetime({'year': anio, 'month': mes, 'day': dia}).dt.strftime('%Y-%m-%d').values
+
+
+def _bancos_frases():
+    """
+    Todas las frases en un solo array, con el inicio y el tamaño del bloque de
+    cada (categoría, tono). La última fila corresponde a las frases neutras.
+    """
+    bloques = [(positivas, negativas) for positivas, negativas in FRASES_CATEGORIAS.values()]
+    bloques.append((FRASES_NEUTRAS, FRASES_NEUTRAS))
+
+    frases = []
+    inicio = np.zeros((len(bloques), 2), dtype=np.int64)
+    tamano = np.zeros((len(bloques), 2), dtype=np.int64)
+    for i, bloque in enumerate(bloques):
+        for tono, lista in enumerate(bloque):
+            inicio[i, tono] = len(frases)
+            tamano[i, tono] = len(lista)
+            frases.extend(f[0].upper() + f[1:] for f in lista)
+    return np.array(frases, dtype=object), inicio, tamano
+
+
+def _textos(calificaciones: np.ndarray, num_frases: np.ndarray, rng: np.random.Generator) -> list:
+    """Compone las reseñas con frases acordes a su calificación (vectorizado)."""
+    frases, inicio, tamano = _bancos_frases()
+    neutra = len(FRASES_CATEGORIAS)
+
+    # Cada reseña habla de 1 a 3 categorías
+    n = len(calificaciones)
+    categorias = rng.integers(0, neutra, size=(n, 3))
+    num_categorias = rng.integers(1, 4, size=n)
+
+    # Una entrada por frase: reseña a la que pertenece, categoría y tono
+    resena = np.repeat(np.arange(n), num_frases)
+    categoria = categorias[resena, rng.integers(0, num_categorias[resena])]
+    categoria[rng.random(len(resena)) < 0.25] = neutra
+
+    # Probabilidad de que cada frase sea positiva según la calificación
+    prob_positiva = np.array([0.0, 0.1, 0.25, 0.5, 0.8, 0.95])[calificaciones[resena]]
+    tono = (rng.random(len(resena)) >= prob_positiva).astype(np.int64)
+
+    elegidas = frases[inicio[categoria, tono] +
+                      (rng.random(len(resena)) * tamano[categoria, tono]).astype(np.int64)]
+
+    limites = np.concatenate([[0], np.cumsum(num_frases)])
+    return ['. '.join(elegidas[a:b]) + '.' for a, b in zip(limites[:-1], limites[1:])]
+
+
+def generar_resenas(filas: int, semilla: int = 42) -> pd.DataFrame:
+    """
+    Genera reseñas turísticas sintéticas.
+
+    Args:
+        filas: Número de reseñas (incluye los duplicados)
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        DataFrame con Titulo, Review, FechaEstadia y Calificacion
+    """
+    rng = np.random.default_rng(semilla)
+
+    unicas = max(1, int(round(filas * (1 - PORCENTAJE_DUPLICADOS))))
+    calificaciones = rng.choice(np.arange(1, 6), size=unicas, p=PROBABILIDAD_CALIFICACION)
+    num_frases = np.clip(
+        np.round(rng.lognormal(np.log(FRASES_MEDIANA), FRASES_SIGMA, size=unicas)), 1, FRASES_MAXIMO
+    ).astype(int)
+
+    # Título acorde a la calificación (algunas reseñas sin título)
+    titulos = np.empty(unicas, dtype=object)
+    for tono, mascara in [('positivo', calificaciones >= 4), ('neutro', calificaciones == 3),
+                          ('negativo', calificaciones <= 2)]:
+        opciones = np.array(TITULOS[tono], dtype=object)
+        titulos[mascara] = opciones[rng.integers(0, len(opciones), size=int(mascara.sum()))]
+    titulos[rng.random(unicas) < PORCENTAJE_SIN_TITULO] = 'Sin titulo'
+
+    df = pd.DataFrame({
+        'Titulo': titulos,
+        'Review': _textos(calificaciones, num_frases, rng),
+        'FechaEstadia': _fechas(unicas, rng),
+        'Calificacion': calificaciones,
+    })
+
+    # Duplicados exactos (reseñas publicadas dos veces)
+    if filas > unicas:
+        duplicados = df.iloc[rng.integers(0, unicas, size=filas - unicas)]
+        df = pd.concat([df, duplicados], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera reseñas turísticas sintéticas')
+    parser.add_argument('--filas', type=int, default=1000, help='Número de reseñas')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria')
+    parser.add_argument('--salida', default='data/dataset.csv', help='CSV de salida')
+    args = parser.parse_args()
+
+    df = generar_resenas(args.filas, args.semilla)
+    salida = Path(args.salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(salida, index=False)
+
+    palabras = df['Review'].str.split().str.len()
+    print(f"✅ {len(df)} reseñas generadas en: {salida}")
+    print(f"   • Palabras por reseña: mediana {palabras.median():.0f} | "
+          f"p95 {palabras.quantile(0.95):.0f} | máximo {palabras.max()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Recalibración de Thresholds (Fase 04)
+=====================================
+Vuelve a aplicar los thresholds de categorías sobre las probabilidades que
+la Fase 04 guardó en data/shared/categorias_scores.npy, sin ejecutar el
+modelo BERT. Solo se reescribe la columna 'Categorias'; las fases que
+dependen de ella (05, 06 y 07) quedan marcadas como obsoletas en el
+manifiesto y se vuelven a ejecutar en la siguiente corrida del pipeline.
+
+Con --what-if no se modifica nada: se muestra cuántas opiniones recibe cada
+categoría con los thresholds actuales y con cada alternativa indicada.
+
+Uso:
+    python scripts/recalibrar_thresholds.py
+    python scripts/recalibrar_thresholds.py --thresholds nuevos_thresholds.json
+    python scripts/recalibrar_thresholds.py --what-if 0.3 0.5 nuevos_thresholds.json
+"""
+
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.fase_04_clasificacion_categorias import ClasificadorCategorias
+from core.pipeline import fases_dependientes
+
+
+def escenarios_what_if(clasificador: ClasificadorCategorias, valores: list) -> dict:
+    """
+    Convierte los argumentos de --what-if en {nombre: thresholds}.
+    Cada valor es un número (threshold único) o un archivo JSON de thresholds.
+    """
+    clasificador._cargar_thresholds()
+    escenarios = {'actual': clasificador.optimal_thresholds}
+    for valor in valores:
+        try:
+            escenarios[f"t={float(valor):g}"] = float(valor)
+        except ValueError:
+            escenarios[Path(valor).stem] = clasificador.leer_thresholds(valor)
+    return escenarios
+
+
+def instalar_thresholds(clasificador: ClasificadorCategorias, ruta: str):
+    """Reemplaza optimal_thresholds.json (el anterior se conserva como respaldo)."""
+    thresholds = clasificador.leer_thresholds(ruta)
+    destino = Path(clasificador.thresholds_path)
+    if destino.exists():
+        respaldo = destino.with_name(destino.stem + '.anterior.json')
+        shutil.copyfile(destino, respaldo)
+        print(f"   • Thresholds anteriores respaldados en: {respaldo}")
+    with open(destino, 'w', encoding='utf-8') as f:
+        json.dump(dict(zip(clasificador.label_names, thresholds.tolist())), f,
+                  ensure_ascii=False, indent=2)
+    print(f"   • Thresholds instalados en: {destino}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Recalibra las categorías de la Fase 04 con las probabilidades guardadas'
+    )
+    parser.add_argument('--thresholds', metavar='ARCHIVO',
+                        help='JSON {categoría: threshold} que reemplaza a optimal_thresholds.json')
+    parser.add_argument('--what-if', nargs='+', metavar='VALOR',
+                        help='Solo mostrar el conteo de categorías con cada threshold '
+                             '(número o archivo JSON), sin modificar el dataset')
+    args = parser.parse_args()
+
+    clasificador = ClasificadorCategorias()
+
+    try:
+        if args.what_if:
+            reporte = clasificador.reporte_thresholds(escenarios_what_if(clasificador, args.what_if))
+            print("\nOpiniones por categoría según el threshold:\n")
+            print(reporte.to_string())
+            return 0
+
+        if args.thresholds:
+            instalar_thresholds(clasificador, args.thresholds)
+
+        clasificador.recalibrar()
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    dependientes = fases_dependientes(clasificador.NOMBRE_FASE)
+    clasificador.manifiesto.invalidar(dependientes)
+    print(f"   • Fases a re-ejecutar: {', '.join(dependientes)} (python main.py)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Reentrenamiento de Tópicos (Fase 05)
+====================================
+Vuelve a entrenar los modelos BERTopic guardados en models/topicos/ y
+reasigna los tópicos de todas las opiniones de las categorías indicadas.
+Las fases que dependen de 'Topico' (06 y 07) quedan marcadas como obsoletas
+en el manifiesto y se vuelven a ejecutar en la siguiente corrida del pipeline.
+
+Sin este comando, el pipeline asigna las opiniones nuevas a los tópicos
+existentes y solo reentrena una categoría cuando detecta deriva.
+
+Uso:
+    python scripts/reentrenar_topicos.py
+    python scripts/reentrenar_topicos.py --categorias Gastronomía Transporte
+    python scripts/reentrenar_topicos.py --listar
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import categorias as cats
+from core.fase_05_analisis_jerarquico_topicos import AnalizadorJerarquicoTopicos
+from core.pipeline import fases_dependientes
+
+
+def listar_modelos(analizador: AnalizadorJerarquicoTopicos):
+    """Imprime los modelos guardados de cada categoría."""
+    print(f"\nModelos de tópicos: {analizador.directorio_modelos}\n")
+    for categoria in cats.CATEGORIAS:
+        meta = analizador._leer_meta_modelo(categoria)
+        if meta is None:
+            print(f"   • {categoria}: sin modelo")
+            continue
+        print(f"   • {categoria}: {len(meta['etiquetas']) - 1} tópicos | "
+              f"{meta['opiniones_entrenamiento']} opiniones | "
+              f"outliers {meta['proporcion_outliers']:.0%} | {meta['fecha']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Reentrena los modelos de tópicos de la Fase 05'
+    )
+    parser.add_argument('--categorias', nargs='+', metavar='CATEGORIA',
+                        help='Categorías a reentrenar (por defecto todas)')
+    parser.add_argument('--listar', action='store_true',
+                        help='Solo mostrar los modelos guardados')
+    args = parser.parse_args()
+
+    analizador = AnalizadorJerarquicoTopicos()
+
+    if args.listar:
+        listar_modelos(analizador)
+        return 0
+
+    desconocidas = [c for c in args.categorias or [] if c not in cats.CATEGORIAS]
+    if desconocidas:
+        print(f"❌ Categorías desconocidas: {', '.join(desconocidas)}")
+        return 1
+
+    analizador.reentrenar = list(args.categorias) if args.categorias else True
+    try:
+        analizador.procesar(forzar=True)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    dependientes = fases_dependientes(analizador.NOMBRE_FASE)
+    analizador.manifiesto.invalidar(dependientes)
+    print(f"   • Fases a re-ejecutar: {', '.join(dependientes)} (python main.py)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Test Rápido - Categorías
+========================
+Verifica la máscara de categorías (core/categorias.py).
+
+Ejecutar con pytest:
+    python -m pytest -q scripts/test_categorias.py
+
+Requiere las dependencias del pipeline: importar el paquete core carga
+core/__init__.py, que importa el proveedor LLM (langchain).
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import categorias as cats
+
+
+def test_ida_y_vuelta_texto():
+    """str(lista) -> máscara -> texto devuelve la misma lista."""
+    listas = [
+        ['Alojamiento', 'Gastronomía'],
+        ['Fauna y vida animal'],
+        [],
+        ['Transporte', 'Historia y cultura', 'Seguridad'],
+    ]
+    textos = [str(lista) for lista in listas]
+    mascaras = cats.desde_texto(textos)
+
+    assert mascaras.dtype == np.uint16
+    assert mascaras[2] == 0
+    assert mascaras[0] == cats.bit('Alojamiento') | cats.bit('Gastronomía')
+    assert list(cats.a_texto(mascaras)) == textos
+    assert list(cats.desde_texto(cats.a_texto(mascaras))) == list(mascaras)
+
+
+def test_texto_heredado():
+    """Valores antiguos: nombre suelto, lista separada por comas y nulos."""
+    mascaras = cats.desde_texto(['Gastronomía', 'Compras, Vida nocturna', None, '', 'Desconocida'])
+
+    assert mascaras[0] == cats.bit('Gastronomía')
+    assert mascaras[1] == cats.bit('Compras') | cats.bit('Vida nocturna')
+    assert list(mascaras[2:]) == [0, 0, 0]
+
+
+def test_mascaras_completa_faltantes_desde_texto():
+    """Filas sin máscara se obtienen del texto de 'Categorias'."""
+    df = pd.DataFrame({
+        cats.COLUMNA_TEXTO: ["['Naturaleza']", "['Compras']"],
+        cats.COLUMNA_MASCARA: [cats.bit('Seguridad'), None],
+    })
+
+    assert list(cats.mascaras(df)) == [cats.bit('Seguridad'), cats.bit('Compras')]
+
+
+def test_conteos_y_explotar():
+    """Conteos por categoría y una fila por par (opinión, categoría)."""
+    df = pd.DataFrame({
+        'Opinion': ['a', 'b', 'c'],
+        cats.COLUMNA_TEXTO: ["['Alojamiento', 'Gastronomía']", "['Gastronomía']", '[]'],
+    })
+    mascaras = cats.mascaras(df)
+
+    assert cats.conteos(mascaras).to_dict() == {'Gastronomía': 2, 'Alojamiento': 1}
+    explotado = cats.explotar(df, ['Opinion'])
+    assert list(explotado.index) == [0, 0, 1]
+    assert list(explotado['Categoria']) == ['Alojamiento', 'Gastronomía', 'Gastronomía']
+    posiciones = cats.posiciones_por_categoria(mascaras)
+    assert list(posiciones) == ['Alojamiento', 'Gastronomía']
+    assert list(posiciones['Gastronomía']) == [0, 1]
+
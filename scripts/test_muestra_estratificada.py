@@ -0,0 +1,52 @@
+"""
+Test Rápido - Muestra Estratificada
+===================================
+Verifica la muestra estratificada con la que la Fase 05 entrena las
+categorías grandes.
+
+Ejecutar con pytest:
+    python -m pytest -q scripts/test_muestra_estratificada.py
+
+Requiere las dependencias del pipeline: importar el paquete core carga
+core/__init__.py, que importa el proveedor LLM (langchain), y la Fase 05
+importa BERTopic, UMAP y HDBSCAN.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.fase_05_analisis_jerarquico_topicos import muestra_estratificada
+
+
+def test_muestra_estratificada_proporcional():
+    """La muestra mide exactamente el tope y cada estrato aporta su cuota."""
+    estratos = np.repeat(np.array([1, 2, 4, 8], dtype=np.uint16), [500, 300, 150, 50])
+    np.random.default_rng(0).shuffle(estratos)
+
+    muestra = muestra_estratificada(estratos, 100)
+
+    assert len(muestra) == 100
+    assert len(np.unique(muestra)) == 100
+    assert np.all(np.diff(muestra) > 0)
+    elegidos = pd.Series(estratos[muestra]).value_counts().to_dict()
+    assert elegidos == {1: 50, 2: 30, 4: 15, 8: 5}
+    assert np.array_equal(muestra, muestra_estratificada(estratos, 100))
+
+
+def test_muestra_estratificada_restos():
+    """Los restos de las cuotas fraccionarias completan el tope."""
+    estratos = np.repeat(np.array([1, 2, 3]), [5, 3, 2])
+
+    muestra = muestra_estratificada(estratos, 5)
+
+    assert len(muestra) == 5
+    # Cuotas 2.5, 1.5 y 1.0: el resto va a la mayor fracción (primer empate)
+    assert pd.Series(estratos[muestra]).value_counts().to_dict() == {1: 3, 2: 1, 3: 1}
+    assert len(muestra_estratificada(estratos, 20)) == 10
+
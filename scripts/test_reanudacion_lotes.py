@@ -0,0 +1,89 @@
+"""
+Test Rápido - Reanudación en Modo por Lotes
+===========================================
+Interrumpe la Fase 03 a mitad del dataset en modo por lotes y verifica que
+la ejecución siguiente analice solo los lotes restantes, con la caché de
+inferencia desactivada (el modelo se reemplaza por una función de prueba).
+
+Ejecutar con pytest:
+    python -m pytest -q scripts/test_reanudacion_lotes.py
+
+Requiere las dependencias del pipeline: importar el paquete core carga
+core/__init__.py, que importa el proveedor LLM (langchain), y la Fase 03
+importa transformers.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import ConfigAlmacenamiento, ConfigCacheInferencia, ConfigReanudacion
+from core.almacen_dataset import AlmacenDataset
+from core.fase_03_analisis_subjetividad import AnalizadorSubjetividad
+
+
+FILAS = 50
+TAMANO_LOTE = 10
+
+
+class Interrupcion(Exception):
+    """Simula un corte a mitad de la fase."""
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConfigAlmacenamiento, 'FORMATO', 'parquet')
+    monkeypatch.setattr(ConfigAlmacenamiento, 'TAMANO_LOTE', TAMANO_LOTE)
+    monkeypatch.setattr(ConfigCacheInferencia, 'HABILITADA', False)
+    monkeypatch.setattr(ConfigReanudacion, 'HABILITADA', True)
+    monkeypatch.setattr(ConfigReanudacion, 'DIRECTORIO', str(tmp_path / 'reanudacion'))
+    monkeypatch.setattr(AnalizadorSubjetividad, 'DATASET_PATH', str(tmp_path / 'dataset.csv'))
+
+    textos = [f'opinión {i} ' + 'x' * (i % 7) for i in range(FILAS)]
+    AlmacenDataset(tmp_path / 'dataset.csv').escribir(pd.DataFrame({'TituloReview': textos}))
+    return textos
+
+
+def _analizador(analizados, interrumpir_en=None):
+    """Fase 03 con un modelo de prueba que registra los textos analizados."""
+    analizador = AnalizadorSubjetividad()
+    analizador._identificador_modelo = lambda: 'modelo-prueba'
+    analizador._identificador_inferencia = analizador._identificador_modelo
+
+    def inferir(textos):
+        if interrumpir_en is not None and len(analizados) >= interrumpir_en:
+            raise Interrupcion()
+        analizados.extend(textos)
+        return np.array([[len(t) % 3, 1.0] for t in textos], dtype=np.float32)
+
+    analizador._inferir_logits = inferir
+    return analizador
+
+
+def test_reanuda_lotes_terminados_sin_cache(dataset, tmp_path):
+    """Tras una interrupción solo se analizan los lotes no terminados."""
+    analizados = []
+    with pytest.raises(Interrupcion):
+        _analizador(analizados, interrumpir_en=3 * TAMANO_LOTE).procesar(forzar=True)
+    assert analizados == dataset[:3 * TAMANO_LOTE]
+    assert 'Subjetividad' not in AlmacenDataset(tmp_path / 'dataset.csv').columnas()
+
+    reanudados = []
+    _analizador(reanudados).procesar(forzar=True)
+    assert reanudados == dataset[3 * TAMANO_LOTE:]
+
+    # Mismo resultado que una ejecución sin interrupciones
+    analizador = _analizador([])
+    etiquetas, probabilidades = analizador.clasificar_textos(dataset)
+    resultado = AlmacenDataset(tmp_path / 'dataset.csv').leer(['Subjetividad'])['Subjetividad']
+    assert resultado.tolist() == etiquetas
+    matriz = analizador._matriz_scores().leer()
+    np.testing.assert_allclose(matriz.matriz, probabilidades, rtol=1e-3)
+    matriz.cerrar()
+    assert not (tmp_path / 'reanudacion' / 'fase_03_lotes.json').exists()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Verificación del Backend ONNX
+=============================
+Exporta a ONNX los modelos de las fases 02, 03 y 04 (si no se exportaron
+antes) y compara sus salidas con las de PyTorch sobre reseñas reales del
+dataset: diferencia máxima de los logits, coincidencia de las etiquetas
+predichas y tiempo de inferencia de cada backend.
+
+Uso:
+    python scripts/verificar_onnx.py
+    python scripts/verificar_onnx.py --muestras 2000 --batch 32
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Agregar directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from transformers import AutoTokenizer
+
+from config import ConfigModelos
+from core import AlmacenDataset
+from core.backend_inferencia import (
+    ONNXRUNTIME_AVAILABLE, TEXTOS_PARIDAD, ClasificadorONNX, ClasificadorPyTorch, exportar_onnx
+)
+from core.batches_longitud import inferir_por_longitud
+
+
+# (fase, modelo, longitud máxima, multi-etiqueta)
+MODELOS = [
+    ('fase_02', ConfigModelos.SENTIMIENTOS, 512, False),
+    ('fase_03', ConfigModelos.SUBJETIVIDAD, 128, False),
+    ('fase_04', ConfigModelos.CATEGORIAS, 128, True),
+]
+
+
+def cargar_textos(muestras: int) -> list:
+    """Títulos de reseñas del dataset (o los textos de ejemplo si no hay dataset)."""
+    try:
+        df = AlmacenDataset('data/dataset.csv').leer(['TituloReview'])
+    except Exception:
+        print("⚠️  No se pudo leer el dataset: se usan los textos de ejemplo")
+        return list(TEXTOS_PARIDAD)
+    textos = df['TituloReview'].dropna().astype(str)
+    return textos[textos.str.strip() != ''].head(muestras).tolist()
+
+
+def comparar(modelo: str, max_length: int, multietiqueta: bool, textos: list, batch: int):
+    tokenizer = AutoTokenizer.from_pretrained(modelo)
+    ruta = exportar_onnx(modelo, tokenizer)
+
+    resultados = {}
+    for nombre, clasificador in (('pytorch', ClasificadorPyTorch(modelo)),
+                                 ('onnx', ClasificadorONNX(modelo, ruta))):
+        inicio = time.perf_counter()
+        logits = inferir_por_longitud(
+            textos, tokenizer, max_length, batch, clasificador.logits, mostrar_progreso=False
+        )
+        resultados[nombre] = (logits, time.perf_counter() - inicio)
+
+    (esperado, tiempo_pt), (obtenido, tiempo_onnx) = resultados['pytorch'], resultados['onnx']
+    if multietiqueta:
+        coincidencia = np.mean((esperado > 0) == (obtenido > 0))
+    else:
+        coincidencia = np.mean(esperado.argmax(axis=1) == obtenido.argmax(axis=1))
+
+    print(f"   • Diferencia máxima de logits: {np.max(np.abs(esperado - obtenido)):.2e}")
+    print(f"   • Etiquetas coincidentes: {coincidencia:.2%}")
+    print(f"   • Tiempo PyTorch: {tiempo_pt:.2f}s | ONNX: {tiempo_onnx:.2f}s "
+          f"({tiempo_pt / tiempo_onnx:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica la paridad del backend ONNX con PyTorch')
+    parser.add_argument('--muestras', type=int, default=500,
+                        help='Reseñas del dataset usadas en la comparación')
+    parser.add_argument('--batch', type=int, default=32)
+    args = parser.parse_args()
+
+    if not ONNXRUNTIME_AVAILABLE:
+        print("❌ onnxruntime no está instalado. Instala con: pip install onnxruntime")
+        return 1
+
+    textos = cargar_textos(args.muestras)
+    print(f"Comparando PyTorch y ONNX Runtime sobre {len(textos)} textos...")
+
+    for fase, modelo, max_length, multietiqueta in MODELOS:
+        print(f"\n[{fase}] {modelo}")
+        try:
+            comparar(modelo, max_length, multietiqueta, textos, args.batch)
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())